@@ -1,17 +1,40 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
 import os
 import asyncio
 from datetime import datetime, date
 
 from src.scraper import fetch_fund_info, fetch_fund_holdings, fetch_fund_nav, batch_fetch_holdings, fetch_fund_estimation_batch
-from src.analyzer import analyze_position_changes, search_funds_by_stocks, search_funds_by_stocks_async, check_cache_coverage, query_reverse_index_direct, load_reverse_index
+from src.analyzer import compute_change_success_rate, analyze_position_changes, search_funds_by_stocks, check_cache_coverage, load_reverse_index, query_basket, get_equity_scope_bitmap, find_funds_by_change
 from src.translations import get_text, translate_df_columns, translate_change_types
-from src.data_manager import FUNDS_LIST_PATH, HOLDINGS_DIR, fetch_and_save_fund_list, load_favorites, add_favorite, remove_favorites
-from src.utils import get_latest_report_quarter, run_async_loop
+from src.data_manager import FUNDS_LIST_PATH, fetch_and_save_fund_list, load_favorites, add_favorite, remove_favorites
+from src.utils import get_latest_report_quarter, shift_quarter, quarter_end_date
 from src.stocks.stocks import get_limit_up_model, get_stocks_by_gain
-from src.lhb import get_daily_lhb, get_lhb_hot_money
+from src.bitset import bitmap_to_ids
+from src.stocks.concept_index import get_concept_index, rows_bitmap, concept_facet_counts, filter_by_concepts
+from src.spot_poller import start_spot_poller, get_spot_poller, stop_spot_poller
+from src.stocks.limit_up import add_ladder_context, backfill_limit_up_pools, update_limit_up_ladder, get_promotion_rates, get_sector_rotation
+from src.lhb import get_hot_money_sector_counts
+from src.trade_calendar import previous_trading_day
+from src.fund_heat import get_fund_heat
+from src.lhb_store import load_lhb_partition, stream_lhb_date, backfill_lhb, get_stored_lhb_dates, query_stock_lhb, query_department_lhb
+from src.hot_money import find_departments, get_department_profile, get_stock_departments, rank_departments
+from src.similarity import get_similar_funds
+from src.holdings_matrix import get_store_quarters
+from src.ownership import rank_most_crowded, rank_institutional_flows, get_stock_ownership
+from src.index_worker import get_index_worker, JOB_PAUSED, JOB_FAILED, FINISHED_STATES
+from src.metrics import compute_fund_metrics
+from src.rolling import get_rolling_analytics, ROLLING_WINDOWS
+from src.screener import get_screener_table, screen_funds, NUMERIC_COLUMNS as SCREENER_NUMERIC_COLUMNS
+from src.correlation import compute_correlation_matrix, cluster_funds, get_correlated_funds
+from src.estimator import estimate_fund_changes, record_estimate_snapshot, build_estimation_error_report, update_estimation_accuracy, get_estimation_accuracy
+from src.price_store import backfill_price_history, backfill_benchmark_history
+from src.backtest import run_backtest, weight_grid
+from src.exposure import get_fund_exposure, compute_style_drift
+from src.attribution import get_attribution_summary, get_fund_attribution
+from src.stocks.classification import update_stock_classification, UNCLASSIFIED
 
 st.set_page_config(page_title=get_text('app_title'), layout="wide")
 
@@ -39,6 +62,21 @@ def get_quarter_date_range(year, quarter):
         return None, None # Invalid quarter
     return start_date, end_date
 
+# --- Helper for Basket Query Arguments ---
+BASKET_MODE_OR = "任意 (OR)"
+BASKET_MODE_AND = "全部 (AND)"
+BASKET_MODE_AT_LEAST = "至少 k 只 / At least k"
+
+def build_basket_query(inputs, exclude, mode, k):
+    """Maps the search form to query_basket keyword arguments."""
+    inputs = [s.strip() for s in inputs if s.strip()]
+    exclude = [s.strip() for s in exclude if s.strip()]
+    if mode == BASKET_MODE_AND:
+        return {'all_of': inputs, 'none_of': exclude}
+    if mode == BASKET_MODE_AT_LEAST:
+        return {'at_least': (int(k), inputs), 'none_of': exclude}
+    return {'any_of': inputs, 'none_of': exclude}
+
 # --- Load Fund List for Selection ---
 # We force reload if '基金类型' is missing to support the new feature
 funds_df = pd.DataFrame()
@@ -142,22 +180,45 @@ with tab_overview:
                 st.session_state.selected_fund_type = selected_type
                 st.rerun() # Force rerun to ensure list updates immediately
             
-            # --- Filter and Display Fund List ---
-            
-            if st.session_state.selected_fund_type == "全部 / All":
-                filtered_funds = funds_df
-            else:
-                filtered_funds = funds_df[funds_df['基金类型'] == st.session_state.selected_fund_type]
-            
-            st.write(f"基金清单 ({len(filtered_funds)}):")
-            
+            # --- Screener (columnar table of per-fund metrics and holdings summary) ---
+            screener_table = get_screener_table()
+            with st.expander(get_text('header_screener'), expanded=False):
+                if st.button(get_text('btn_refresh_screener')):
+                    with st.spinner(get_text('msg_fetching')):
+                        screener_table = get_screener_table(refresh=True)
+
+                sc1, sc2, sc3, sc4 = st.columns(4)
+                min_ann_ret = sc1.number_input("年化收益率 ≥ (%)", value=None, step=1.0)
+                max_dd = sc2.number_input("最大回撤 ≤ (%)", value=None, min_value=0.0, max_value=100.0, step=5.0)
+                min_sharpe = sc3.number_input("夏普比率 ≥", value=None, step=0.1)
+                min_size = sc4.number_input("估算规模 ≥ (亿)", value=None, min_value=0.0, step=1.0)
+                sc5, sc6, sc7 = st.columns([2, 1, 1])
+                holding_kw = sc5.text_input("前五大重仓包含 (股票名称)")
+                sort_by = sc6.selectbox("排序字段 / Sort By", ['(默认)'] + SCREENER_NUMERIC_COLUMNS)
+                sort_asc = sc7.checkbox("升序 / Ascending", value=False)
+
+            filters = []
+            if st.session_state.selected_fund_type != "全部 / All":
+                filters.append(('基金类型', '==', st.session_state.selected_fund_type))
+            if min_ann_ret is not None:
+                filters.append(('年化收益率', '>=', min_ann_ret / 100))
+            if max_dd is not None:
+                filters.append(('最大回撤', '>=', -max_dd / 100))
+            if min_sharpe is not None:
+                filters.append(('夏普比率', '>=', min_sharpe))
+            if min_size is not None:
+                filters.append(('估算规模(亿)', '>=', min_size))
+            if holding_kw.strip():
+                filters.append(('前五大重仓', 'contains', holding_kw.strip()))
+
             # --- Pagination Controls ---
             col_p1, col_p2, col_p3 = st.columns([1, 1, 3])
             
             with col_p1:
                 page_size = st.selectbox("每页显示 / Per Page", [20, 50, 100], index=0)
-            
-            total_rows = len(filtered_funds)
+
+            # Total count first (no rows materialized), then the requested page
+            _, total_rows = screen_funds(filters, limit=0, columns=['基金代码'], table=screener_table)
             total_pages = (total_rows // page_size) + (1 if total_rows % page_size > 0 else 0)
             
             with col_p2:
@@ -166,15 +227,34 @@ with tab_overview:
             # Calculate Slice
             start_idx = (page_number - 1) * page_size
             end_idx = min(start_idx + page_size, total_rows)
-            
+
+            current_page_df, _ = screen_funds(
+                filters,
+                sort_by=None if sort_by == '(默认)' else sort_by,
+                ascending=sort_asc,
+                offset=start_idx,
+                limit=page_size,
+                table=screener_table
+            )
+
+            st.write(f"基金清单 ({total_rows}):")
             # Display Slice
-            st.caption(f"显示第 {start_idx + 1} 到 {end_idx} 条，共 {total_rows} 条")
-            
-            current_page_df = filtered_funds.iloc[start_idx:end_idx]
+            st.caption(f"显示第 {min(start_idx + 1, total_rows)} 到 {end_idx} 条，共 {total_rows} 条")
             
             st.dataframe(
-                current_page_df[['基金代码', '基金简称', '基金类型']], 
-                hide_index=True
+                current_page_df,
+                hide_index=True,
+                column_config={
+                    "年化收益率": st.column_config.NumberColumn(format="percent"),
+                    "近1年收益": st.column_config.NumberColumn(format="percent"),
+                    "年化波动率": st.column_config.NumberColumn(format="percent"),
+                    "最大回撤": st.column_config.NumberColumn(format="percent"),
+                    "夏普比率": st.column_config.NumberColumn(format="%.2f"),
+                    "卡玛比率": st.column_config.NumberColumn(format="%.2f"),
+                    "披露仓位": st.column_config.NumberColumn(format="%.2f%%"),
+                    "前十大集中度": st.column_config.NumberColumn(format="%.2f%%"),
+                    "估算规模(亿)": st.column_config.NumberColumn(format="%.2f"),
+                }
             )
             
         else:
@@ -196,7 +276,7 @@ with tab_analysis:
             fav_df = load_favorites()
             if not fav_df.empty:
                 # Control Bar
-                c_fav_1, c_fav_2, c_fav_dummy = st.columns([1, 1, 4])
+                c_fav_1, c_fav_2, c_fav_3, c_fav_dummy = st.columns([1, 1, 1, 3])
                 
                 if c_fav_1.button("🔄 刷新估值 / Refresh Est."):
                     with st.spinner("Fetching real-time data..."):
@@ -205,6 +285,16 @@ with tab_analysis:
                             st.session_state['fav_estimation'] = est_df
                         else:
                             st.warning("Failed to fetch estimation.")
+
+                if c_fav_3.button(get_text('btn_lookthrough_est')):
+                    with st.spinner(get_text('msg_lookthrough_est')):
+                        # One spot snapshot prices every fund; keep the full result for the error report
+                        lt_df = estimate_fund_changes()
+                        if not lt_df.empty:
+                            record_estimate_snapshot(lt_df)
+                            st.session_state['fav_lookthrough'] = lt_df[lt_df['基金代码'].isin(fav_df['基金代码'].astype(str))]
+                        else:
+                            st.warning("Failed to fetch spot snapshot.")
                 
                 # Data Preparation
                 fav_display = fav_df.copy()
@@ -215,6 +305,9 @@ with tab_analysis:
                     est_data = st.session_state['fav_estimation']
                     est_data['基金代码'] = est_data['基金代码'].astype(str)
                     fav_display = pd.merge(fav_display, est_data, on='基金代码', how='left')
+                if 'fav_lookthrough' in st.session_state:
+                    lt_data = st.session_state['fav_lookthrough'][['基金代码', '穿透估算涨幅', '覆盖率']]
+                    fav_display = pd.merge(fav_display, lt_data, on='基金代码', how='left')
                 
                 # Links
                 def get_fund_url(code):
@@ -224,7 +317,7 @@ with tab_analysis:
                 fav_display['名称_URL'] = fav_display.apply(lambda x: f"{x['代码_URL']}#{x['基金名称']}", axis=1)
                 
                 # Columns
-                cols = ['代码_URL', '名称_URL', '基金类型', '估算净值', '估算涨幅', '估算时间', '加入时间']
+                cols = ['代码_URL', '名称_URL', '基金类型', '估算净值', '估算涨幅', '估算时间', '穿透估算涨幅', '覆盖率', '加入时间']
                 cols = [c for c in cols if c in fav_display.columns]
                 
                 # Display
@@ -235,6 +328,8 @@ with tab_analysis:
                         "名称_URL": st.column_config.LinkColumn("基金名称", display_text=r".*#(.*)"),
                         "估算涨幅": st.column_config.TextColumn("估算涨幅"),
                         "估算时间": st.column_config.TextColumn("估算时间"),
+                        "穿透估算涨幅": st.column_config.NumberColumn("穿透估算涨幅", format="%.2f%%"),
+                        "覆盖率": st.column_config.NumberColumn("持仓覆盖率", format="percent"),
                     },
                     hide_index=True,
                     selection_mode="multi-row",
@@ -248,6 +343,94 @@ with tab_analysis:
                         codes_to_remove = fav_display.iloc[event_fav.selection.rows]['基金代码'].tolist()
                         remove_favorites(codes_to_remove)
                         st.rerun()
+
+                # Accuracy of recorded estimates (EastMoney and look-through) vs the actual NAV change
+                if st.checkbox(get_text('label_estimation_report'), key='fav_est_report'):
+                    if st.button(get_text('btn_update_estimation_accuracy')):
+                        with st.spinner(get_text('msg_update_estimation_accuracy')):
+                            update_estimation_accuracy()
+                    fav_accuracy = get_estimation_accuracy(fav_display['基金代码'].tolist())
+                    if not fav_accuracy.empty:
+                        st.caption(get_text('text_estimation_accuracy'))
+                        st.dataframe(
+                            fav_accuracy,
+                            column_config={
+                                "平均误差": st.column_config.NumberColumn(format="%.3f%%"),
+                                "平均绝对误差": st.column_config.NumberColumn(format="%.3f%%"),
+                                "均方根误差": st.column_config.NumberColumn(format="%.3f%%"),
+                                "近期绝对误差": st.column_config.NumberColumn(format="%.3f%%"),
+                                "方向一致率": st.column_config.NumberColumn(format="percent"),
+                            },
+                            hide_index=True
+                        )
+                    est_summary, est_detail = build_estimation_error_report()
+                    if not est_summary.empty:
+                        st.dataframe(
+                            est_summary,
+                            column_config={
+                                "平均绝对误差": st.column_config.NumberColumn(format="%.3f%%"),
+                                "均方根误差": st.column_config.NumberColumn(format="%.3f%%"),
+                                "方向一致率": st.column_config.NumberColumn(format="percent"),
+                            },
+                            hide_index=True
+                        )
+                        fav_detail = est_detail[est_detail['基金代码'].isin(fav_display['基金代码'])]
+                        if not fav_detail.empty:
+                            st.dataframe(fav_detail, hide_index=True)
+                    else:
+                        st.info(get_text('info_no_estimation_report'))
+
+                # Weighted portfolio backtest over favorites
+                if len(fav_display) >= 1 and st.checkbox(get_text('label_fav_backtest'), key='fav_backtest'):
+                    bt_names = fav_display.set_index('基金代码')['基金名称'].to_dict()
+                    bt_codes = st.multiselect(get_text('label_backtest_funds'), list(bt_names.keys()),
+                                              default=list(bt_names.keys())[:5], format_func=lambda c: f"{bt_names.get(c, c)} ({c})")
+                    if bt_codes:
+                        c_bt_1, c_bt_2, c_bt_3 = st.columns(3)
+                        bt_rebalance = c_bt_1.selectbox(get_text('label_rebalance'), ['Q', 'M', 'Y', 'none'], format_func=lambda r: get_text(f'rebalance_{r}'))
+                        bt_contribution = c_bt_2.number_input(get_text('label_contribution'), value=0.0, min_value=0.0, step=0.01)
+                        bt_fee = c_bt_3.number_input(get_text('label_fee_rate'), value=0.0, min_value=0.0, step=0.05) / 100
+                        weight_df = st.data_editor(
+                            pd.DataFrame({'基金代码': bt_codes, '基金名称': [bt_names.get(c, c) for c in bt_codes], '权重': [1.0] * len(bt_codes)}),
+                            disabled=['基金代码', '基金名称'], hide_index=True, key='bt_weights'
+                        )
+                        try:
+                            bt = run_backtest(bt_codes, weight_df['权重'].to_numpy(), bt_rebalance, contribution=bt_contribution, fee_rate=bt_fee)
+                            bt_chart = pd.DataFrame({'日期': bt['dates'], '组合净值': bt['nav'][0], '回撤': bt['drawdown'][0]})
+                            st.plotly_chart(px.line(bt_chart, x='日期', y='组合净值', title=get_text('label_fav_backtest')), use_container_width=True)
+                            st.plotly_chart(px.area(bt_chart, x='日期', y='回撤'), use_container_width=True)
+                            st.dataframe(bt['metrics'].drop(columns=['组合']), hide_index=True)
+
+                            # Grid search: every weight combination evaluated in one batch
+                            if 2 <= len(bt_codes) <= 5 and st.button(get_text('btn_weight_grid')):
+                                grid = weight_grid(len(bt_codes), step=0.1 if len(bt_codes) <= 4 else 0.2)
+                                grid_bt = run_backtest(bt_codes, grid, bt_rebalance, contribution=bt_contribution, fee_rate=bt_fee)
+                                grid_df = pd.concat([pd.DataFrame(grid, columns=[bt_names.get(c, c) for c in bt_codes]),
+                                                     grid_bt['metrics'][['年化收益率', '年化波动率', '最大回撤', '夏普比率', '卡玛比率']]], axis=1)
+                                st.dataframe(grid_df.sort_values('夏普比率', ascending=False).head(10), hide_index=True)
+                        except ValueError as e:
+                            st.warning(str(e))
+
+                # Return correlation among favorites (redundant holdings)
+                if len(fav_display) >= 2 and st.checkbox(get_text('label_fav_correlation'), key='fav_corr'):
+                    with st.spinner(get_text('msg_computing_correlation')):
+                        corr_df = compute_correlation_matrix(fav_display['基金代码'].tolist())
+                    if corr_df.shape[0] >= 2:
+                        names = fav_display.set_index('基金代码')['基金名称'].to_dict()
+                        clusters = cluster_funds(corr_df.index.tolist(), n_clusters=max(2, len(corr_df) // 3), method='hierarchical')
+                        order = clusters.sort_values('簇')['基金代码'].tolist()
+                        corr_df = corr_df.loc[order, order]
+                        labels = [f"{names.get(c, c)} ({c})" for c in order]
+                        fig_corr = px.imshow(corr_df.values, x=labels, y=labels, zmin=-1, zmax=1,
+                                             color_continuous_scale='RdBu_r', text_auto='.2f')
+                        st.plotly_chart(fig_corr, use_container_width=True)
+
+                        pairs = corr_df.where(pd.DataFrame(np.triu(np.ones(corr_df.shape, dtype=bool), k=1), index=corr_df.index, columns=corr_df.columns)).stack().dropna()
+                        redundant = pairs[pairs >= 0.9].sort_values(ascending=False)
+                        for (a, b), v in redundant.items():
+                            st.caption(get_text('text_redundant_pair', a=names.get(a, a), b=names.get(b, b), corr=f"{v:.2f}"))
+                    else:
+                        st.info(get_text('info_no_correlation'))
             else:
                 st.info("暂无收藏基金。请在分析或搜索结果中添加。/ No favorites yet.")
         except Exception as e:
@@ -368,7 +551,20 @@ with tab_analysis:
                 # Highlight current selected quarter
                 start_date_highlight, end_date_highlight = get_quarter_date_range(y, q)
                 
-                fig = px.line(nav_df, x='净值日期', y='单位净值', title=get_text('chart_nav_title'))
+                # Chart view: unit NAV or rolling analytics (streamed from the NAV cache)
+                nav_views = ['view_unit_nav', 'view_rolling_return', 'view_rolling_vol', 'view_rolling_dd']
+                nav_view = st.radio(get_text('label_nav_view'), nav_views, format_func=get_text, horizontal=True, key='nav_chart_view')
+                if nav_view == 'view_unit_nav':
+                    fig = px.line(nav_df, x='净值日期', y='单位净值', title=get_text('chart_nav_title'))
+                else:
+                    rolling_df = get_rolling_analytics(f_code)
+                    if rolling_df.empty:
+                        rolling_df = get_rolling_analytics(f_code, nav_df)
+                    rolling_df = rolling_df[rolling_df['净值日期'] >= nav_df['净值日期'].min()]
+                    prefix = {'view_rolling_return': '收益', 'view_rolling_vol': '波动率', 'view_rolling_dd': '回撤'}[nav_view]
+                    cols = [f'{prefix}_{key}' for key in ROLLING_WINDOWS]
+                    fig = px.line(rolling_df, x='净值日期', y=cols, title=get_text(nav_view))
+                    fig.update_layout(yaxis_tickformat='.1%', legend_title_text='')
                 
                 if start_date_highlight and end_date_highlight:
                     fig.add_vrect(x0=start_date_highlight, x1=end_date_highlight, 
@@ -376,6 +572,44 @@ with tab_analysis:
                                   annotation_text=f"{y} Q{q}", annotation_position="top left")
                 
                 st.plotly_chart(fig, use_container_width=True)
+
+                # Performance Metrics (dividend-adjusted, full history)
+                perf = compute_fund_metrics(nav_df)
+                if perf:
+                    st.subheader(get_text('header_perf'))
+                    def fmt_pct(v):
+                        return f"{v:.2%}" if pd.notna(v) else "-"
+                    def fmt_ratio(v):
+                        return f"{v:.2f}" if pd.notna(v) else "-"
+                    m1, m2, m3, m4, m5, m6 = st.columns(6)
+                    m1.metric(get_text('metric_ann_ret'), fmt_pct(perf['年化收益率']))
+                    m2.metric(get_text('metric_max_dd'), fmt_pct(perf['最大回撤']))
+                    m3.metric(get_text('metric_volatility'), fmt_pct(perf['年化波动率']))
+                    m4.metric(get_text('metric_sharpe'), fmt_ratio(perf['夏普比率']))
+                    m5.metric(get_text('metric_sortino'), fmt_ratio(perf['索提诺比率']))
+                    m6.metric(get_text('metric_calmar'), fmt_ratio(perf['卡玛比率']))
+                    if pd.notna(perf['回撤峰值日期']):
+                        st.caption(get_text('text_drawdown_range',
+                                            peak=pd.Timestamp(perf['回撤峰值日期']).date(),
+                                            trough=pd.Timestamp(perf['回撤谷底日期']).date()))
+
+                # Funds moving most closely with this one (daily-return correlation, last 250 days)
+                if st.checkbox(get_text('header_correlated_funds'), key='show_correlated'):
+                    with st.spinner(get_text('msg_computing_correlation')):
+                        correlated_df = get_correlated_funds(f_code, k=10)
+                    if not correlated_df.empty:
+                        if not funds_df.empty and '基金类型' in funds_df.columns:
+                            correlated_df = pd.merge(correlated_df, funds_df[['基金代码', '基金简称', '基金类型']], on='基金代码', how='left')
+                            correlated_df = correlated_df[['基金代码', '基金简称', '基金类型', '相关系数', '共同交易日']]
+                        st.dataframe(
+                            correlated_df,
+                            column_config={
+                                "相关系数": st.column_config.ProgressColumn("相关系数", min_value=-1.0, max_value=1.0, format="%.3f"),
+                            },
+                            hide_index=True
+                        )
+                    else:
+                        st.info(get_text('info_no_correlation'))
             else:
                 st.warning(get_text('warn_no_nav'))
                 
@@ -426,11 +660,92 @@ with tab_analysis:
                         display_changes['change_type'] = translate_change_types(display_changes['change_type'])
                         display_changes = translate_df_columns(display_changes)
                         st.dataframe(display_changes)
+
+                        # Success rate of this quarter's buys over the following quarter (local price store)
+                        success_df, _ = compute_change_success_rate(f"{y}Q{q}", [f_code])
+                        c_sr_1, c_sr_2 = st.columns([1, 3])
+                        if not success_df.empty:
+                            sr = success_df.iloc[0]
+                            c_sr_1.metric(get_text('metric_success_rate'), f"{sr['成功率']:.1%}", help=get_text('help_success_rate'))
+                            c_sr_2.caption(get_text('text_success_rate_detail', n=int(sr['评估数']), excess=f"{sr['平均超额收益']:.2%}"))
+                        else:
+                            c_sr_1.metric(get_text('metric_success_rate'), "-", help=get_text('help_success_rate'))
+                            buy_codes = changes.loc[changes['change_type'].isin(['NEW', 'INCREASE']), '股票代码'].astype(str).tolist()
+                            if buy_codes and c_sr_2.button(get_text('btn_backfill_prices')):
+                                next_end = quarter_end_date(shift_quarter(f"{y}Q{q}", 1))
+                                with st.spinner(get_text('msg_backfill_prices')):
+                                    backfill_price_history(buy_codes, f"{y}{q * 3 - 2:02d}01", next_end.strftime("%Y%m%d"))
+                                    backfill_benchmark_history(f"{y}{q * 3 - 2:02d}01", next_end.strftime("%Y%m%d"))
+                                st.rerun()
                     else:
                         st.info(get_text('info_no_changes')) 
                     
                 else:
                     st.warning(get_text('warn_no_data_prev', year=prev_year, quarter=f"Q{prev_q}"))
+                
+                # 4. Similar Funds (portfolio overlap in the selected quarter)
+                st.write(f"### {get_text('header_similar_funds')}")
+                with st.spinner(get_text('msg_computing_similarity')):
+                    similar_df = get_similar_funds(f_code, f"{y}Q{q}", k=10)
+                if not similar_df.empty:
+                    if not funds_df.empty and '基金类型' in funds_df.columns:
+                        similar_df = pd.merge(similar_df, funds_df[['基金代码', '基金简称', '基金类型']], on='基金代码', how='left')
+                        similar_df = similar_df[['基金代码', '基金简称', '基金类型', '相似度', '共同持仓数', '重叠比例']]
+                    st.dataframe(
+                        similar_df,
+                        column_config={
+                            "相似度": st.column_config.ProgressColumn("相似度 (余弦)", min_value=0.0, max_value=1.0, format="%.3f"),
+                            "重叠比例": st.column_config.NumberColumn("重叠比例 (占净值%)", format="%.2f"),
+                        },
+                        hide_index=True
+                    )
+                else:
+                    st.info(get_text('info_no_similar_funds'))
+
+                # 5. Industry Exposure over time (share of disclosed stock holdings)
+                st.write(f"### {get_text('header_industry_exposure')}")
+                with st.spinner(get_text('msg_computing_exposure')):
+                    exposure_df = get_fund_exposure(f_code)
+                if not exposure_df.empty and list(exposure_df.columns) != [UNCLASSIFIED]:
+                    exposure_long = exposure_df.reset_index().melt(id_vars='报告期', var_name='行业', value_name='占股票持仓比例')
+                    fig_exp = px.area(exposure_long, x='报告期', y='占股票持仓比例', color='行业')
+                    fig_exp.update_layout(yaxis_title=get_text('label_exposure_share'), xaxis_title=None)
+                    st.plotly_chart(fig_exp, use_container_width=True)
+                    drift_df = compute_style_drift(f"{y}Q{q}")
+                    drift_row = drift_df[drift_df['基金代码'] == f_code]
+                    if not drift_row.empty:
+                        c_dr_1, c_dr_2 = st.columns(2)
+                        c_dr_1.metric(get_text('metric_style_drift'), f"{drift_row.iloc[0]['风格漂移']:.1%}", help=get_text('help_style_drift'))
+                        c_dr_2.metric(get_text('metric_top_industry'), drift_row.iloc[0]['主要行业'], f"{drift_row.iloc[0]['主要行业占比']:.1f}%", delta_color="off")
+                else:
+                    st.info(get_text('info_no_exposure'))
+                fund_stocks = h_curr['股票代码'].astype(str).tolist() if '股票代码' in h_curr.columns else []
+                if fund_stocks and st.button(get_text('btn_update_classification')):
+                    with st.spinner(get_text('msg_update_classification')):
+                        update_stock_classification(fund_stocks)
+                    st.rerun()
+
+                # 6. Brinson attribution by industry vs. the equity-fund aggregate portfolio
+                if st.checkbox(get_text('label_attribution'), key='show_attribution'):
+                    with st.spinner(get_text('msg_computing_attribution')):
+                        attr_summary = get_attribution_summary(f"{y}Q{q}", [f_code])
+                    if not attr_summary.empty and pd.notna(attr_summary.iloc[0]['超额收益']):
+                        attr = attr_summary.iloc[0]
+                        c_at = st.columns(4)
+                        c_at[0].metric(get_text('metric_excess_return'), f"{attr['超额收益']:.2%}", help=get_text('help_attribution'))
+                        c_at[1].metric(get_text('metric_allocation'), f"{attr['配置效应']:.2%}")
+                        c_at[2].metric(get_text('metric_selection'), f"{attr['选股效应']:.2%}")
+                        c_at[3].metric(get_text('metric_interaction'), f"{attr['交互效应']:.2%}")
+                        st.caption(get_text('text_attribution_detail', fund=f"{attr['组合收益']:.2%}", bench=f"{attr['基准收益']:.2%}", coverage=f"{attr['覆盖率']:.0%}"))
+                        attr_df = get_fund_attribution(f_code, f"{y}Q{q}")
+                        attr_df = attr_df[attr_df['基金权重'] > 0]
+                        st.dataframe(
+                            attr_df,
+                            column_config={c: st.column_config.NumberColumn(c, format="percent") for c in attr_df.columns[1:]},
+                            hide_index=True
+                        )
+                    else:
+                        st.info(get_text('info_no_attribution'))
             else:
                 st.warning(get_text('warn_no_data_current', year=y, quarter=f"Q{q}"))
                 if not df_curr_year.empty and '季度' in df_curr_year.columns:
@@ -467,6 +782,68 @@ with tab_search:
                  except Exception as e:
                      st.error(f"获取失败 / Failed: {e}")
         
+        # Limit-up ladder over the stored daily pools
+        if st.checkbox(get_text('label_limit_up_ladder'), key='show_ladder'):
+            if st.button(get_text('btn_update_ladder')):
+                with st.spinner(get_text('msg_update_ladder')):
+                    backfill_limit_up_pools((date.today() - pd.Timedelta(days=45)).strftime("%Y%m%d"))
+                    update_limit_up_ladder()
+            ladder_state = update_limit_up_ladder()
+            if not ladder_state['daily'].empty:
+                c_lad_1, c_lad_2 = st.columns([3, 2])
+                c_lad_1.write(get_text('text_ladder_daily'))
+                c_lad_1.dataframe(ladder_state['daily'].tail(10).iloc[::-1], hide_index=True, use_container_width=True,
+                                  column_config={"封板率": st.column_config.NumberColumn(format="percent"),
+                                                 "晋级率": st.column_config.NumberColumn(format="percent")})
+                c_lad_2.write(get_text('text_ladder_promotion'))
+                c_lad_2.dataframe(get_promotion_rates(), hide_index=True, use_container_width=True,
+                                  column_config={"晋级率": st.column_config.NumberColumn(format="percent")})
+                st.write(get_text('text_sector_rotation'))
+                st.dataframe(get_sector_rotation(5).head(15), use_container_width=True)
+            else:
+                st.info(get_text('info_no_ladder'))
+
+        # Intraday polling (process-wide; also refreshes the shared spot snapshot)
+        if st.checkbox(get_text('label_spot_poller'), key='show_spot_poller'):
+            poll_interval = st.number_input(get_text('label_poll_interval'), min_value=5, max_value=600, value=30, step=5)
+            # Shared by all sessions: started and stopped only by these buttons, not by rendering this section
+            spot_poller = get_spot_poller()
+            if spot_poller is None:
+                st.info(get_text('info_poller_stopped'))
+                if st.button(get_text('btn_start_poller')):
+                    start_spot_poller(poll_interval)
+                    st.rerun()
+            else:
+                spot_poller.set_interval(poll_interval)
+                poller_status = spot_poller.status()
+                if poller_status['frames']:
+                    st.caption(get_text('text_poller_status').format(frames=poller_status['frames'], stocks=poller_status['stocks'],
+                                                                     mb=poller_status['bytes'] / 1e6, last=f"{poller_status['last']:%H:%M:%S}"))
+                    st.write(get_text('text_price_speed'))
+                    st.dataframe(spot_poller.price_speed(5).head(20), hide_index=True, use_container_width=True)
+                else:
+                    st.info(get_text('info_poller_waiting'))
+                if st.button(get_text('btn_stop_poller')):
+                    stop_spot_poller()
+                    st.rerun()
+
+        # Funds most exposed to today's strong stocks (latest holdings x strong list / LHB)
+        if st.checkbox(get_text('label_fund_heat'), key='show_fund_heat', help=get_text('help_fund_heat')):
+            heat_live = st.checkbox(get_text('label_heat_live'), key='heat_live')
+            heat_strong = None if heat_live else st.session_state.get('limit_up_df')
+            heat_lhb = st.session_state.get('lhb_daily_df')
+            if heat_lhb is None:
+                heat_lhb = load_lhb_partition('detail', previous_trading_day().strftime("%Y%m%d"))
+            if heat_live or (heat_strong is not None and not heat_strong.empty):
+                heat_df = get_fund_heat(heat_strong, heat_lhb, min_gain=min_gain)
+            else:
+                heat_df = pd.DataFrame()
+            if not heat_df.empty:
+                st.dataframe(heat_df.head(50), hide_index=True, use_container_width=True,
+                             column_config={c: st.column_config.NumberColumn(format="%.2f%%") for c in ['热度', '强势股占比', '龙虎榜占比']})
+            else:
+                st.info(get_text('info_no_fund_heat'))
+
         if 'limit_up_df' in st.session_state and not st.session_state['limit_up_df'].empty:
              try:
                  st.caption("👇 勾选下方股票，可一键复制或填入搜索框 / Select stocks below to copy or auto-fill:")
@@ -474,12 +851,16 @@ with tab_search:
                  
                  # Access Session State Data
                  limit_df_raw = st.session_state['limit_up_df']
-                 df_display = limit_df_raw.copy()
+                 # Multi-day context from the stored limit-up ladder (local, no fetch)
+                 df_display = add_ladder_context(limit_df_raw, as_of=str(limit_df_raw['日期'].iloc[0]) if '日期' in limit_df_raw.columns else None)
                  
                  # Rename '所属行业' to '所属板块'
                  if '所属行业' in df_display.columns:
                      df_display = df_display.rename(columns={'所属行业': '所属板块'})
                  
+                 # Rows kept by the filters, as a bitmap over the loaded list
+                 visible_rows = rows_bitmap(n_rows=len(df_display))
+
                  # --- 1. Block Filter (Industry) ---
                  if '所属板块' in df_display.columns:
                      # Calculate counts
@@ -498,22 +879,16 @@ with tab_search:
                      )
                      
                      if selected_blocks:
-                         df_display = df_display[df_display['所属板块'].isin(selected_blocks)]
+                         visible_rows = rows_bitmap(df_display['所属板块'].isin(selected_blocks).to_numpy())
                 
                  # --- 2. Concept Filter (Dynamic) ---
                  if '所属概念' in df_display.columns:
-                     # Generate concepts from currently visible data (Faceted Search)
-                     current_concepts_raw = df_display['所属概念'].fillna("").astype(str)
+                     # Concept -> row bitmaps, built once per loaded list; counts are faceted on the block filter
+                     concept_index = get_concept_index(limit_df_raw)
+                     concept_counts = concept_facet_counts(concept_index, visible_rows)
                      
-                     # Count concepts
-                     concept_list = []
-                     for s in current_concepts_raw:
-                         if s:
-                             concept_list.extend(s.split(";"))
-                     
-                     if concept_list:
-                         concept_counts = pd.Series(concept_list).value_counts()
-                         all_concepts = concept_counts.sort_values(ascending=False).index.tolist()
+                     if not concept_counts.empty:
+                         all_concepts = concept_counts.index.tolist()
                          
                          def format_concept_label(option):
                              return f"{option} ({concept_counts.get(option, 0)})"
@@ -526,14 +901,10 @@ with tab_search:
                              key="pills_concept"
                          )
                          
-                         if selected_concepts:
-                             # Filter: Match ANY selected concept
-                             def match_concepts(row_concepts):
-                                 if not row_concepts: return False
-                                 rc = str(row_concepts)
-                                 return any(sc in rc for sc in selected_concepts)
-                                 
-                             df_display = df_display[df_display['所属概念'].apply(match_concepts)]
+                         # Filter: Match ANY selected concept (exact concept names)
+                         visible_rows = filter_by_concepts(concept_index, visible_rows, selected_concepts)
+
+                 df_display = df_display.iloc[bitmap_to_ids(visible_rows, len(df_display))]
 
                  # --- Prepare Display Data ---
                  def get_em_url(code):
@@ -555,7 +926,7 @@ with tab_search:
                  
                  # Columns to show
                  # Added '涨跌幅'
-                 cols = ['日期', '代码_URL', '名称_URL', '所属板块', '所属概念', '最新价', '涨跌幅', '换手率', '最后封板时间', '连板数']
+                 cols = ['日期', '代码_URL', '名称_URL', '所属板块', '所属概念', '最新价', '涨跌幅', '换手率', '最后封板时间', '连板数', '近10日涨停', '晋级率(历史)']
                  # Filter cols just in case
                  cols_to_show = [c for c in cols if c in df_display.columns]
 
@@ -577,6 +948,7 @@ with tab_search:
                          "最新价": st.column_config.NumberColumn("最新价", format="%.2f"),
                          "涨跌幅": st.column_config.NumberColumn("涨跌幅", format="%.2f%%"),
                          "换手率": st.column_config.NumberColumn("换手率", format="%.2f%%"),
+                         "晋级率(历史)": st.column_config.NumberColumn("晋级率(历史)", format="percent"),
                      }
                  )
                  
@@ -603,6 +975,70 @@ with tab_search:
              except Exception as e:
                  st.error(f"Error in Stocks Helper: {e}")
     
+    # --- Market-wide Position Changes Lookup ---
+    with st.expander("🔄 全市场调仓查询 / Market-wide Position Changes", expanded=False):
+        store_quarters = get_store_quarters()
+        if len(store_quarters) < 2:
+            st.info("本地持仓缓存不足两个季度，无法计算调仓。")
+        else:
+            c_chg_stock, c_chg_q, c_chg_type = st.columns([2, 1, 2])
+            chg_stock = c_chg_stock.text_input("股票名称或代码 / Stock", placeholder="例如: 宁德时代", key="chg_stock_input")
+            chg_quarter = c_chg_q.selectbox("报告期 / Quarter", store_quarters[1:][::-1], key="chg_quarter")
+            change_type_options = {translate_change_types(pd.Series([t])).iloc[0]: t for t in ['NEW', 'INCREASE', 'DECREASE', 'DELETE']}
+            chg_types = c_chg_type.multiselect("变动类型 / Change Type", list(change_type_options.keys()), default=[list(change_type_options.keys())[0]], key="chg_types")
+            
+            if chg_stock:
+                with st.spinner("正在查询调仓表 (首次计算本季度需要一些时间)..."):
+                    chg_df = find_funds_by_change(chg_stock, chg_quarter, [change_type_options[t] for t in chg_types])
+                if not chg_df.empty:
+                    if not funds_df.empty:
+                        chg_df = pd.merge(chg_df, funds_df[['基金代码', '基金简称']], on='基金代码', how='left')
+                    chg_df['change_type'] = translate_change_types(chg_df['change_type'])
+                    chg_cols = [c for c in ['基金代码', '基金简称', '股票代码', '股票名称', 'mv_prev', 'mv_curr', 'change_type', 'diff'] if c in chg_df.columns]
+                    st.caption(f"共 {chg_df['基金代码'].nunique()} 只基金")
+                    st.dataframe(translate_df_columns(chg_df[chg_cols]), hide_index=True)
+                else:
+                    st.info("未找到匹配的调仓记录。")
+    
+    # --- Institutional Ownership Rankings ---
+    with st.expander("📊 机构持仓排行 / Institutional Ownership", expanded=False):
+        own_quarters = get_store_quarters()
+        if not own_quarters:
+            st.info("暂无本地持仓缓存。")
+        else:
+            c_own_view, c_own_q, c_own_n = st.columns([3, 1, 1])
+            own_views = ["最拥挤个股 (持有基金数)", "最拥挤个股 (持仓市值)", "机构增持最多 (持股数)", "机构减持最多 (持股数)"]
+            own_view = c_own_view.radio("视图 / View", own_views, horizontal=True, key="own_view")
+            own_quarter = c_own_q.selectbox("报告期 / Quarter", own_quarters[::-1], key="own_quarter")
+            own_top_n = c_own_n.number_input("Top N", min_value=10, max_value=500, value=50, step=10, key="own_top_n")
+            
+            if own_view == own_views[0]:
+                own_df = rank_most_crowded(own_quarter, own_top_n, by='持有基金数')
+            elif own_view == own_views[1]:
+                own_df = rank_most_crowded(own_quarter, own_top_n, by='持仓市值合计')
+            else:
+                own_df = rank_institutional_flows(own_quarter, own_top_n, inflow=(own_view == own_views[2]))
+            
+            own_stock = st.text_input("单只股票持仓历史 / Single Stock History", placeholder="例如: 宁德时代", key="own_stock")
+            if own_stock:
+                own_df = get_stock_ownership(own_stock)
+            
+            if not own_df.empty:
+                st.caption("持仓市值单位: 万元; 持股数单位: 万股。季度变化基于上一报告期 (一/三季报仅披露前十大重仓股)。")
+                st.dataframe(
+                    own_df,
+                    column_config={
+                        "持仓市值合计": st.column_config.NumberColumn("持仓市值合计", format="%.2f"),
+                        "持股数合计": st.column_config.NumberColumn("持股数合计", format="%.2f"),
+                        "平均占净值比例": st.column_config.NumberColumn("平均占净值比例", format="%.2f%%"),
+                        "持仓市值变化": st.column_config.NumberColumn("持仓市值变化", format="%.2f"),
+                        "持股数变化": st.column_config.NumberColumn("持股数变化", format="%.2f"),
+                    },
+                    hide_index=True
+                )
+            else:
+                st.info("暂无数据。")
+    
     # Calculate latest available quarter for default
     latest_year, latest_q = get_latest_report_quarter()
     
@@ -616,6 +1052,20 @@ with tab_search:
         key="search_stocks_input"
     )
     
+    # Basket Query Mode (AND / OR / NOT / at least k)
+    c_mode, c_k, c_not = st.columns([3, 1, 3])
+    with c_mode:
+        basket_mode = st.radio(
+            "匹配模式 / Match Mode",
+            [BASKET_MODE_OR, BASKET_MODE_AND, BASKET_MODE_AT_LEAST],
+            horizontal=True,
+            key="search_basket_mode"
+        )
+    with c_k:
+        basket_k = st.number_input("k", min_value=1, value=2, step=1, key="search_basket_k", disabled=(basket_mode != BASKET_MODE_AT_LEAST))
+    with c_not:
+        exclude_input = st.text_input("排除股票 (NOT, 逗号分隔) / Exclude", placeholder="例如: 腾讯控股", key="search_exclude_input")
+    
     # We use latest_year as the fixed year for search
     year = latest_year
     
@@ -632,6 +1082,7 @@ with tab_search:
     # --- Search Execution Logic (Smart Resume) ---
     if (search_clicked or auto_trigger) and stock_input:
         inputs = stock_input.split(',')
+        basket = build_basket_query(inputs, exclude_input.split(','), basket_mode, basket_k)
         
         # 1. Filter Scope
         filter_codes = []
@@ -657,7 +1108,11 @@ with tab_search:
             # 3. Retrieve Cached Results Immediately
             accumulated_results = []
             if cached_codes:
-                cached_df = query_reverse_index_direct(inputs, cached_codes)
+                # Equity scope is a precomputed bitmap; fall back to explicit codes without type info
+                if '基金类型' in funds_df.columns:
+                    cached_df = query_basket(scope=get_equity_scope_bitmap(), **basket)
+                else:
+                    cached_df = query_basket(filter_fund_codes=cached_codes, **basket)
                 if not cached_df.empty:
                     accumulated_results = cached_df.to_dict('records')
                     
@@ -694,14 +1149,14 @@ with tab_search:
             # 4. Init Search Loop for Pending
             st.session_state.search_results_accumulated = accumulated_results
             st.session_state.search_inputs = inputs
+            st.session_state.search_basket = basket
             st.session_state.search_year = year
             
             if pending_codes:
+                # Scanning runs in the background index worker; this session only polls progress
                 st.session_state.search_running = True
-                st.session_state.search_paused = False
-                st.session_state.search_queue = pending_codes
+                st.session_state.search_job_id = get_index_worker().submit(pending_codes, year)
                 st.session_state.search_all_codes = filter_codes
-                st.session_state.search_total = len(pending_codes) # Track progress of NEW work
                 st.rerun()
             else:
                 st.session_state.search_running = False
@@ -710,56 +1165,62 @@ with tab_search:
                      st.session_state['search_results_df'] = pd.DataFrame()
                      st.info("未找到匹配结果")
 
-    # --- Running Loop ---
-    if st.session_state.get('search_running'):
-        total = st.session_state.search_total
-        remaining = len(st.session_state.search_queue)
-        done = total - remaining
+    def finalize_basket_results():
+        """Re-evaluates the basket query over the whole search scope once scanning ends."""
+        final_df = query_basket(filter_fund_codes=st.session_state.search_all_codes, **st.session_state.search_basket)
+        st.session_state.search_results_accumulated = final_df.to_dict('records') if not final_df.empty else []
+        st.session_state['search_results_df'] = pd.DataFrame()
+
+    # --- Progress Polling (background index worker) ---
+    @st.fragment(run_every=1.0)
+    def render_search_progress():
+        worker = get_index_worker()
+        job = worker.progress(st.session_state.search_job_id)
+        if job is None:
+            st.session_state.search_running = False
+            st.rerun()
         
-        # Progress
-        st.progress(done / total, text=f"正在搜索... {done}/{total} (已找到 {len(st.session_state.search_results_accumulated)} 个匹配)")
+        # Matches among funds indexed so far (index is saved once per worker batch)
+        partial_df = query_basket(filter_fund_codes=st.session_state.search_all_codes, **st.session_state.search_basket)
+        total = max(job['total'], 1)
+        st.progress(job['done'] / total, text=f"正在搜索... {job['done']}/{job['total']} (已找到 {len(partial_df)} 个匹配)")
+        if job['status'] == JOB_PAUSED:
+            st.caption("⏸️ 已暂停 (当前批次完成后生效) / Paused")
         
         # Controls
         c1, c2 = st.columns([1, 4])
         stop = c1.button("停止 / Stop ⏹️")
-        pause = c2.button("暂停 / Pause ⏸️" if not st.session_state.search_paused else "继续 / Resume ▶️")
+        pause = c2.button("暂停 / Pause ⏸️" if job['status'] != JOB_PAUSED else "继续 / Resume ▶️")
         
         if stop:
+            worker.cancel(job['id'])
             st.session_state.search_running = False
+            finalize_basket_results()
             st.warning("搜索已停止。显示部分结果。")
             st.rerun()
             
         if pause:
-            st.session_state.search_paused = not st.session_state.search_paused
-            st.rerun()
-            
-        # Process Chunk
-        if not st.session_state.search_paused and st.session_state.search_queue:
-            chunk_size = 20
-            chunk = st.session_state.search_queue[:chunk_size]
-            st.session_state.search_queue = st.session_state.search_queue[chunk_size:]
-            
-            try:
-                partial_results = run_async_loop(search_funds_by_stocks_async(
-                    st.session_state.search_inputs,
-                    HOLDINGS_DIR,
-                    st.session_state.search_year,
-                    filter_fund_codes=chunk
-                ))
-                
-                if not partial_results.empty:
-                    st.session_state.search_results_accumulated.extend(partial_results.to_dict('records'))
-            except Exception as e:
-                st.error(f"Error in chunk: {e}")
-                
-            st.rerun()
-            
-        elif not st.session_state.search_queue:
+            if job['status'] == JOB_PAUSED:
+                worker.resume(job['id'])
+            else:
+                worker.pause(job['id'])
+            st.rerun(scope="fragment")
+        
+        if job['status'] in FINISHED_STATES:
             # Finished
             st.session_state.search_running = False
-            st.success("搜索完成！")
+            finalize_basket_results()
+            if job['status'] == JOB_FAILED:
+                st.error(f"索引任务失败 / Index job failed: {job['error']}")
             st.rerun()
 
+    if st.session_state.get('search_running'):
+        render_search_progress()
+    else:
+        # Jobs keep running after a page reload / closed tab; show them so users know
+        for bg_job in get_index_worker().active_jobs():
+            st.caption(f"🔄 后台索引任务 {bg_job['id']}: {bg_job['done']}/{bg_job['total']} ({bg_job['status']})")
+
     # --- Convert Accumulated to Display DF ---
     # We do this if 'search_results_df' is empty AND we have accumulated data
     # OR if we just stopped/finished (detected by running=False but accumulated exists?)
@@ -964,8 +1425,8 @@ with tab_lhb:
     # --- Controls ---
     c_date, c_btn, c_dummy = st.columns([1, 1, 4])
     with c_date:
-        # Default to today, but allow picking past
-        lhb_date = st.date_input("选择日期 / Select Date", value=date.today())
+        # Default to the latest trading day, but allow picking past
+        lhb_date = st.date_input("选择日期 / Select Date", value=previous_trading_day())
     
     with c_btn:
         st.write("") # align
@@ -978,9 +1439,66 @@ with tab_lhb:
         st.session_state['lhb_date'] = date_str
         st.session_state['lhb_data_fetched'] = True
         
+        # Local store first; detail and hot money are fetched concurrently and the
+        # daily list is previewed as soon as it arrives (replaced by the full view below)
+        lhb_preview = st.empty()
         with st.spinner(f"Fetching LHB data for {date_str}..."):
-            st.session_state['lhb_daily_df'] = get_daily_lhb(date_str)
-            st.session_state['lhb_hm_df'] = get_lhb_hot_money(date_str)
+            for lhb_kind, lhb_part in stream_lhb_date(date_str):
+                st.session_state['lhb_daily_df' if lhb_kind == 'detail' else 'lhb_hm_df'] = lhb_part.copy()
+                if lhb_kind == 'detail' and not lhb_part.empty:
+                    preview_cols = [c for c in ['代码', '名称', '所属行业', '所属概念', '收盘价', '涨跌幅', '龙虎榜净买额', '换手率', '上榜原因'] if c in lhb_part.columns]
+                    lhb_preview.dataframe(lhb_part[preview_cols], hide_index=True, use_container_width=True)
+        lhb_preview.empty()
+
+    # --- History (local store) ---
+    with st.expander(get_text('header_lhb_history'), expanded=False):
+        stored_dates = get_stored_lhb_dates()
+        st.caption(get_text('text_lhb_stored', n=len(stored_dates), first=stored_dates[0] if stored_dates else '-', last=stored_dates[-1] if stored_dates else '-'))
+        c_bf_1, c_bf_2 = st.columns([1, 1])
+        bf_start = c_bf_1.date_input(get_text('label_lhb_backfill_start'), value=date.today() - pd.Timedelta(days=30), key='lhb_bf_start')
+        if c_bf_2.button(get_text('btn_lhb_backfill')):
+            bf_progress = st.progress(0)
+            fetched = backfill_lhb(bf_start.strftime("%Y%m%d"), progress_callback=lambda i, n: bf_progress.progress(i / n))
+            st.success(get_text('msg_lhb_backfill_done', n=fetched))
+
+        c_q_1, c_q_2, c_q_3 = st.columns([2, 2, 1])
+        lhb_query_kind = c_q_1.radio(get_text('label_lhb_query_kind'), ['stock', 'department'],
+                                     format_func=lambda k: get_text(f'lhb_query_{k}'), horizontal=True)
+        lhb_query = c_q_2.text_input(get_text('label_lhb_query'), key='lhb_query')
+        lhb_days = c_q_3.number_input(get_text('label_lhb_days'), min_value=1, max_value=250, value=20)
+        if lhb_query:
+            if lhb_query_kind == 'stock':
+                history_df = query_stock_lhb(lhb_query.strip(), last_n=int(lhb_days))
+            else:
+                history_df = query_department_lhb(lhb_query.strip(), last_n=int(lhb_days))
+            if not history_df.empty:
+                st.dataframe(history_df, hide_index=True, use_container_width=True)
+            else:
+                st.info(get_text('info_no_lhb_history'))
+
+            # Department profile from the precomputed history index
+            if lhb_query_kind == 'department':
+                matches = find_departments(lhb_query.strip())
+                if matches:
+                    sel_dept = st.selectbox(get_text('label_lhb_department'), matches)
+                    profile = get_department_profile(sel_dept)
+                    prof = profile['summary']
+                    c_p = st.columns(4)
+                    c_p[0].metric(get_text('metric_dept_events'), f"{int(prof['买入事件数'])}")
+                    c_p[1].metric(get_text('metric_dept_win_rate'), f"{prof['1日胜率']:.1%}" if pd.notna(prof['1日胜率']) else "-", help=get_text('help_dept_win_rate'))
+                    c_p[2].metric(get_text('metric_dept_follow_3d'), f"{prof['3日平均收益']:.2%}" if pd.notna(prof['3日平均收益']) else "-")
+                    c_p[3].metric(get_text('metric_dept_follow_5d'), f"{prof['5日平均收益']:.2%}" if pd.notna(prof['5日平均收益']) else "-")
+                    c_pe, c_pc = st.columns([2, 1])
+                    c_pe.dataframe(profile['events'], hide_index=True, use_container_width=True)
+                    c_pc.dataframe(profile['co_departments'], hide_index=True, use_container_width=True)
+            else:
+                stock_depts = get_stock_departments(lhb_query.strip())
+                if not stock_depts.empty:
+                    st.write(get_text('text_stock_departments'))
+                    st.dataframe(stock_depts.head(20), hide_index=True, use_container_width=True)
+
+        if st.checkbox(get_text('label_dept_ranking'), key='lhb_dept_rank'):
+            st.dataframe(rank_departments(min_events=5), hide_index=True, use_container_width=True)
 
     # --- Display ---
     if st.session_state.get('lhb_data_fetched'):
@@ -1000,58 +1518,13 @@ with tab_lhb:
             # 2. Industry Analysis Section
             st.subheader("🏭 游资进攻方向 / Industry Analysis")
             if hm_df is not None and not hm_df.empty:
-                # Create Stock->Industry Map
-                unique_stocks = daily_df.drop_duplicates(subset=['名称'])
-                # Include more columns for drill-down
-                stock_map = unique_stocks.set_index('名称')[['代码', '所属行业', '所属概念', '龙虎榜净买额', '涨跌幅', '收盘价']].to_dict('index')
-                
-                hm_exploded = []
-                import re
-                for _, row in hm_df.iterrows():
-                    dept = row['营业部名称']
-                    net_buy = row.get('净买入额', 0)
-                    stocks_str = str(row.get('买入相关个股', ''))
-                    stocks = re.split(r'[,，\s]+', stocks_str)
-                    
-                    for s_name in stocks:
-                        if not s_name: continue
-                        # Filter: Only count stocks that actually appeared on the LHB list for this specific date
-                        if s_name not in stock_map:
-                            continue
-                            
-                        info = stock_map.get(s_name)
-                        industry = info.get('所属行业', 'Unknown')
-                        concept = info.get('所属概念', '')
-                        
-                        hm_exploded.append({
-                            '营业部': dept,
-                            '股票名称': s_name,
-                            '行业': industry,
-                            '概念': concept,
-                            '游资净买额': net_buy, # Dept's net buy
-                            '代码': info.get('代码'),
-                            '龙虎榜净买额': info.get('龙虎榜净买额'), # Stock's daily net buy
-                            '涨跌幅': info.get('涨跌幅'),
-                            '收盘价': info.get('收盘价')
-                        })
-                
-                if hm_exploded:
-                    df_analysis = pd.DataFrame(hm_exploded)
-                    
-                    # Deduplicate to count STOCKS, not participation events
-                    df_unique_stocks = df_analysis.drop_duplicates(subset=['股票名称'])
-                    
-                    # 1. Industry Analysis (Count of unique stocks per industry)
-                    ind_counts = df_unique_stocks['行业'].value_counts().reset_index()
-                    ind_counts.columns = ['行业', '上榜个股数']
-                    
-                    # 2. Concept Analysis (Count of unique stocks per concept)
-                    concepts_list = []
-                    for c_str in df_unique_stocks['概念']:
-                        if c_str:
-                            concepts_list.extend(str(c_str).split(';'))
-                    conc_counts = pd.Series(concepts_list).value_counts().reset_index()
-                    conc_counts.columns = ['概念', '上榜个股数']
+                # Memoized per date: chart clicks (reruns) reuse the same counts
+                sectors = get_hot_money_sector_counts(date_str, daily_df, hm_df)
+                df_unique_stocks = sectors['stocks']
+
+                if not df_unique_stocks.empty:
+                    ind_counts = sectors['industry']
+                    conc_counts = sectors['concept']
 
                     # Use Tabs for cleaner layout
                     tab_i, tab_c = st.tabs(["🏭 行业分布 (Industry)", "🏷️ 概念分布 (Concepts)"])
@@ -1095,7 +1568,7 @@ with tab_lhb:
                             sel_conc = event_c.selection["points"][0]["x"]
                             st.write(f"📂 **{sel_conc}** 概念个股明细:")
                             # Filter concept (contains string)
-                            filtered_stocks_c = df_unique_stocks[df_unique_stocks['概念'].astype(str).str.contains(sel_conc, regex=False)]
+                            filtered_stocks_c = sectors['concept_stocks'][sectors['concept_stocks']['概念'] == sel_conc]
                             st.dataframe(
                                 filtered_stocks_c[['代码', '股票名称', '收盘价', '涨跌幅', '龙虎榜净买额']], 
                                 hide_index=True,
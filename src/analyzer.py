@@ -7,9 +7,21 @@ import json
 import hashlib
 import time
 
+from src.bitset import BitsetIndex, bitmap_from_ids, bitmap_from_mask, bitmap_to_ids, full_bitmap
+from src.data_manager import load_holdings_store, save_table_to_cache, load_table_from_cache
+from src.utils import shift_quarter, quarter_end_date
+
 DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
 HOLDINGS_DIR = os.path.join(DATA_DIR, 'holdings')
 REVERSE_INDEX_FILE = os.path.join(DATA_DIR, 'reverse_index.json')
+FUNDS_LIST_PATH = os.path.join(DATA_DIR, 'funds.csv')
+CHANGES_DIR = os.path.join(DATA_DIR, 'changes')
+
+# In-process copies of persisted changes tables: {file_path: (signature, table, {stock name: [codes]})}
+_CHANGES_MEMO = {}
+
+# Fund types considered in scope for stock -> fund searches
+EQUITY_FUND_PATTERN = '股票|偏股|指数'
 
 # --- Reverse Index Cache Logic ---
 
@@ -51,13 +63,28 @@ def save_reverse_index(index_data):
     """Save the reverse index to disk."""
     try:
         index_data['timestamp'] = time.time()
-        with open(REVERSE_INDEX_FILE, 'w', encoding='utf-8') as f:
+        # Temp file + replace, so readers polling the index never see a partial file
+        tmp_path = f"{REVERSE_INDEX_FILE}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
             json.dump(index_data, f, ensure_ascii=False)
+        os.replace(tmp_path, REVERSE_INDEX_FILE)
     except Exception as e:
         print(f"Failed to save reverse index: {e}")
 
 # --- Core Analysis Logic ---
 
+def classify_position_changes(mv_prev: np.ndarray, mv_curr: np.ndarray) -> np.ndarray:
+    """Vectorized NEW / DELETE / INCREASE / DECREASE / UNCHANGED labels from two market-value columns."""
+    mv_prev = np.asarray(mv_prev, dtype=float)
+    mv_curr = np.asarray(mv_curr, dtype=float)
+    conditions = [
+        (mv_prev == 0) & (mv_curr > 0),
+        (mv_prev > 0) & (mv_curr == 0),
+        (mv_prev > 0) & (mv_curr > mv_prev),
+        (mv_prev > 0) & (mv_curr < mv_prev) & (mv_curr > 0),
+    ]
+    return np.select(conditions, ['NEW', 'DELETE', 'INCREASE', 'DECREASE'], default='UNCHANGED').astype(object)
+
 def analyze_position_changes(holdings_prev: pd.DataFrame, holdings_curr: pd.DataFrame) -> pd.DataFrame:
     """Compare two quarters of holdings."""
     if holdings_prev.empty and holdings_curr.empty:
@@ -68,16 +95,150 @@ def analyze_position_changes(holdings_prev: pd.DataFrame, holdings_curr: pd.Data
     
     merged = pd.merge(prev, curr, on=['股票代码', '股票名称'], how='outer').fillna(0)
     
-    merged['change_type'] = 'UNCHANGED'
+    merged['change_type'] = classify_position_changes(merged['mv_prev'], merged['mv_curr'])
     merged['diff'] = merged['mv_curr'] - merged['mv_prev']
     
-    merged.loc[(merged['mv_prev'] == 0) & (merged['mv_curr'] > 0), 'change_type'] = 'NEW'
-    merged.loc[(merged['mv_prev'] > 0) & (merged['mv_curr'] == 0), 'change_type'] = 'DELETE'
-    merged.loc[(merged['mv_prev'] > 0) & (merged['mv_curr'] > merged['mv_prev']), 'change_type'] = 'INCREASE'
-    merged.loc[(merged['mv_prev'] > 0) & (merged['mv_curr'] < merged['mv_prev']) & (merged['mv_curr'] > 0), 'change_type'] = 'DECREASE'
-    
     return merged
 
+# --- Market-wide Position Changes ---
+
+def analyze_position_changes_batch(prev_quarter: str, curr_quarter: str, holdings: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Computes position changes for every fund between two 'YYYYQn' quarters in
+    one vectorized pass over the holdings store (same rules as analyze_position_changes).
+    Only funds that reported in both quarters are compared.
+
+    Returns columns: ['基金代码', '股票代码', '股票名称', 'mv_prev', 'mv_curr', 'change_type', 'diff']
+    """
+    if holdings is None:
+        holdings = load_holdings_store()
+    keys = ['基金代码', '股票代码', '股票名称']
+
+    def _quarter_rows(quarter, value_name):
+        rows = holdings.loc[holdings['报告期'] == quarter, keys + ['持仓市值']]
+        rows = rows.astype({k: str for k in keys})
+        return rows.groupby(keys, as_index=False, sort=False)['持仓市值'].sum().rename(columns={'持仓市值': value_name})
+
+    prev = _quarter_rows(prev_quarter, 'mv_prev')
+    curr = _quarter_rows(curr_quarter, 'mv_curr')
+    both = np.intersect1d(prev['基金代码'].unique(), curr['基金代码'].unique())
+    if both.size == 0:
+        return pd.DataFrame(columns=keys + ['mv_prev', 'mv_curr', 'change_type', 'diff'])
+
+    prev = prev[prev['基金代码'].isin(both)]
+    curr = curr[curr['基金代码'].isin(both)]
+    merged = pd.merge(prev, curr, on=keys, how='outer')
+    merged[['mv_prev', 'mv_curr']] = merged[['mv_prev', 'mv_curr']].fillna(0)
+
+    merged['change_type'] = classify_position_changes(merged['mv_prev'], merged['mv_curr'])
+    merged['diff'] = merged['mv_curr'] - merged['mv_prev']
+    return merged
+
+def _load_position_changes(curr_quarter: str, prev_quarter: str = None) -> tuple:
+    """Returns (table, name_codes) for a quarter pair, see get_position_changes."""
+    from src.holdings_matrix import quarter_signature
+
+    prev_quarter = prev_quarter or shift_quarter(curr_quarter, -1)
+    holdings = load_holdings_store()
+    signature = (quarter_signature(prev_quarter, holdings), quarter_signature(curr_quarter, holdings))
+    file_path = os.path.join(CHANGES_DIR, f'{prev_quarter}_{curr_quarter}.pkl')
+
+    memo = _CHANGES_MEMO.get(file_path)
+    if memo and memo[0] == signature:
+        return memo[1], memo[2]
+
+    cached = load_table_from_cache(file_path)
+    if cached and cached.get('signature') == signature:
+        _CHANGES_MEMO[file_path] = (signature, cached['table'], cached['name_codes'])
+        return cached['table'], cached['name_codes']
+
+    print(f"Computing market-wide position changes {prev_quarter} -> {curr_quarter}...")
+    table = analyze_position_changes_batch(prev_quarter, curr_quarter, holdings)
+    table = table.sort_values(['股票代码', 'change_type', 'diff'], ascending=[True, True, False]).set_index('股票代码', drop=False)
+    table = table.rename_axis(None)
+    pairs = table[['股票名称', '股票代码']].drop_duplicates()
+    name_codes = pairs.groupby('股票名称', sort=False)['股票代码'].agg(list).to_dict()
+    save_table_to_cache({'signature': signature, 'table': table, 'name_codes': name_codes}, file_path)
+    _CHANGES_MEMO[file_path] = (signature, table, name_codes)
+    return table, name_codes
+
+def get_position_changes(curr_quarter: str, prev_quarter: str = None) -> pd.DataFrame:
+    """
+    Returns the persisted market-wide changes table for `curr_quarter` vs
+    `prev_quarter` (defaults to the preceding quarter), rebuilding it when
+    either quarter's holdings changed. The table is indexed and sorted by
+    股票代码 so per-stock lookups are binary searches.
+    """
+    return _load_position_changes(curr_quarter, prev_quarter)[0]
+
+def find_funds_by_change(stock: str, curr_quarter: str, change_types: list[str] = None, prev_quarter: str = None) -> pd.DataFrame:
+    """
+    Funds whose position in `stock` (code or name) changed in `curr_quarter`.
+    Example: find_funds_by_change('宁德时代', '2025Q3', ['NEW']) -> funds that newly bought it in Q3.
+    """
+    table, name_codes = _load_position_changes(curr_quarter, prev_quarter)
+    if table.empty:
+        return pd.DataFrame()
+
+    stock = stock.strip()
+    codes = [stock] if stock in table.index else name_codes.get(stock, [])
+    if not codes:
+        return pd.DataFrame()
+    rows = table.loc[codes]
+
+    if change_types:
+        rows = rows[rows['change_type'].isin(change_types)]
+    return rows.reset_index(drop=True)
+
+# --- Position Change Success Rate ---
+
+def compute_change_success_rate(curr_quarter: str, fund_codes: list[str] = None, change_types: tuple = ('NEW', 'INCREASE'),
+                                prev_quarter: str = None) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Did the stocks a fund bought (NEW / INCREASE in `curr_quarter`) beat the
+    market over the following quarter? Market = the benchmark index (中证全指,
+    price_store.BENCHMARK_CODE) over the same window; nothing is computed until
+    the store covers it. Stocks without full price coverage are not evaluated.
+
+    Runs on the market-wide changes table and one price panel, so a single fund
+    and the whole universe cost the same.
+
+    Returns: (per-fund summary, per-row detail)
+        summary: ['基金代码', '评估数', '成功数', '成功率', '平均超额收益']
+        detail:  changes rows + ['后续季度收益', '超额收益', '成功']
+    """
+    from src.price_store import compute_window_returns, compute_benchmark_return
+
+    summary_cols = ['基金代码', '评估数', '成功数', '成功率', '平均超额收益']
+    table = get_position_changes(curr_quarter, prev_quarter)
+    rows = table[table['change_type'].isin(change_types)]
+    if fund_codes is not None:
+        rows = rows[rows['基金代码'].isin([str(c) for c in fund_codes])]
+    if rows.empty:
+        return pd.DataFrame(columns=summary_cols), pd.DataFrame()
+
+    start = quarter_end_date(curr_quarter)
+    end = quarter_end_date(shift_quarter(curr_quarter, 1))
+    market = compute_benchmark_return(start, end)
+    if np.isnan(market):
+        print(f"Benchmark index not in the price store for {curr_quarter}'s following quarter.")
+        return pd.DataFrame(columns=summary_cols), pd.DataFrame()
+    returns = compute_window_returns(start, end, rows['股票代码'].astype(str).unique().tolist())
+
+    detail = rows.reset_index(drop=True)
+    detail['后续季度收益'] = returns.reindex(detail['股票代码'].astype(str)).to_numpy()
+    detail['超额收益'] = detail['后续季度收益'] - market
+    detail['成功'] = detail['超额收益'] > 0
+
+    evaluated = detail[detail['后续季度收益'].notna()]
+    summary = evaluated.groupby('基金代码', observed=True).agg(
+        评估数=('成功', 'size'),
+        成功数=('成功', 'sum'),
+        平均超额收益=('超额收益', 'mean')
+    ).reset_index()
+    summary['成功率'] = summary['成功数'] / summary['评估数']
+    return summary[summary_cols], detail
+
 async def process_single_fund(fund_code, year, holdings_dir, sem, progress_callback=None):
     """
     Async worker: Check Cache -> Fetch -> Extract ALL Stocks
@@ -130,6 +291,68 @@ async def process_single_fund(fund_code, year, holdings_dir, sem, progress_callb
             
         return (fund_code, stocks, latest_quarter)
 
+async def scan_funds_async(fund_codes: list[str], year: int, holdings_dir: str, progress_callback=None, concurrency: int = 20) -> list:
+    """
+    Scans funds concurrently (cache read or fetch) and extracts their latest-quarter stocks.
+    Returns: [(fund_code, [stock_list], latest_quarter), ...]
+    """
+    sem = asyncio.Semaphore(concurrency)
+    tasks = [process_single_fund(code, year, holdings_dir, sem, progress_callback) for code in fund_codes]
+    return await asyncio.gather(*tasks)
+
+def update_reverse_index(cache_data: dict, results: list) -> bool:
+    """
+    Applies scan results to the reverse index in place (does not save).
+    Returns True if anything changed.
+    """
+    updated = False
+    index = cache_data.setdefault('index', {})
+    fund_stocks = cache_data.setdefault('fund_stocks', {})
+    scanned = set(cache_data.get('scanned_funds', []))
+    
+    for res in results:
+        if res:
+            f_code, stocks, quarter = res
+            indexed_before = f_code in fund_stocks
+            # Funds from older caches may be listed without a forward index entry
+            legacy = not indexed_before and f_code in scanned
+            
+            # 1. Clean up OLD stocks for this fund if it was indexed before
+            # (Though usually scanned_funds check prevents re-scanning, 
+            # but if we FORCE re-scan or invalidation happens partially, this is safe)
+            if indexed_before:
+                old_keys = fund_stocks[f_code]
+                for key in old_keys:
+                    if key in index and f_code in index[key]:
+                        index[key].remove(f_code)
+                        # Cleanup empty lists to keep JSON small? Optional.
+                        if not index[key]: del index[key]
+            
+            # 2. Add NEW stocks (by Code and by Name)
+            new_keys = []
+            for stock in stocks:
+                new_keys.append(stock['code'])
+                new_keys.append(stock['name'])
+            new_keys = list(dict.fromkeys(new_keys))
+            
+            for key in new_keys:
+                postings = index.setdefault(key, [])
+                # Only a legacy fund can already be in the postings (a re-indexed fund was removed above)
+                if not legacy or f_code not in postings:
+                    postings.append(f_code)
+            
+            # 3. Update Metadata
+            cache_data.setdefault('scanned_funds', []).append(f_code)
+            cache_data.setdefault('fund_quarters', {})[f_code] = quarter
+            fund_stocks[f_code] = new_keys
+            
+            updated = True
+    
+    if updated:
+        # Deduplicate scanned_funds list
+        cache_data['scanned_funds'] = list(set(cache_data['scanned_funds']))
+    return updated
+
 async def search_funds_by_stocks_async(stock_inputs: list[str], holdings_dir: str, year: int, filter_fund_codes: list[str], progress_callback=None) -> pd.DataFrame:
     """
     Async Search with Reverse Index Caching.
@@ -152,60 +375,8 @@ async def search_funds_by_stocks_async(stock_inputs: list[str], holdings_dir: st
     
     # If we have unscanned funds, we must scan them
     if unscanned_codes:
-        sem = asyncio.Semaphore(20)
-        tasks = [process_single_fund(code, year, holdings_dir, sem, progress_callback) for code in unscanned_codes]
-        
-        results = await asyncio.gather(*tasks)
-        
-        # Update Index
-        updated = False
-        index = cache_data.get('index', {})
-        fund_stocks = cache_data.get('fund_stocks', {})
-        
-        for res in results:
-            if res:
-                f_code, stocks, quarter = res
-                
-                # 1. Clean up OLD stocks for this fund if it was indexed before
-                # (Though usually scanned_funds check prevents re-scanning, 
-                # but if we FORCE re-scan or invalidation happens partially, this is safe)
-                if f_code in fund_stocks:
-                    old_keys = fund_stocks[f_code]
-                    for key in old_keys:
-                        if key in index and f_code in index[key]:
-                            index[key].remove(f_code)
-                            # Cleanup empty lists to keep JSON small? Optional.
-                            if not index[key]: del index[key]
-                
-                # 2. Add NEW stocks
-                new_keys = []
-                for stock in stocks:
-                    s_code = stock['code']
-                    s_name = stock['name']
-                    
-                    # Index by Code
-                    if s_code not in index: index[s_code] = []
-                    if f_code not in index[s_code]: index[s_code].append(f_code)
-                    new_keys.append(s_code)
-                    
-                    # Index by Name
-                    if s_name not in index: index[s_name] = []
-                    if f_code not in index[s_name]: index[s_name].append(f_code)
-                    new_keys.append(s_name)
-                
-                # 3. Update Metadata
-                cache_data['scanned_funds'].append(f_code)
-                cache_data['fund_quarters'][f_code] = quarter
-                fund_stocks[f_code] = new_keys
-                
-                updated = True
-        
-        if updated:
-            # Deduplicate scanned_funds list
-            cache_data['scanned_funds'] = list(set(cache_data['scanned_funds']))
-            # Ensure index keys exist
-            cache_data['index'] = index
-            cache_data['fund_stocks'] = fund_stocks
+        results = await scan_funds_async(unscanned_codes, year, holdings_dir, progress_callback)
+        if update_reverse_index(cache_data, results):
             save_reverse_index(cache_data)
     
     # Query Index
@@ -257,48 +428,173 @@ def check_cache_coverage(fund_codes):
     target_set = set(fund_codes)
     return target_set.issubset(scanned_set)
 
-def query_reverse_index_direct(stock_inputs, filter_fund_codes):
+# --- Bitset Basket Queries ---
+
+_FUND_BITSET_CACHE = {'key': None, 'value': None}
+
+def _index_version():
+    """Cheap version key for the on-disk reverse index (file and holdings dir mtimes)."""
+    index_mtime = os.path.getmtime(REVERSE_INDEX_FILE) if os.path.exists(REVERSE_INDEX_FILE) else 0
+    holdings_mtime = os.path.getmtime(HOLDINGS_DIR) if os.path.exists(HOLDINGS_DIR) else 0
+    return (index_mtime, holdings_mtime)
+
+def build_fund_bitset_index(cache_data: dict) -> dict:
     """
-    Directly query the reverse index for stocks within the given fund scope.
-    Assumes cache is valid and covers the funds (checked via check_cache_coverage).
+    Builds bitmaps over fund ids from the reverse index cache.
+    Returns: {
+        'funds': ['000001', ...],          # id -> fund code
+        'fund_pos': {'000001': 0, ...},    # fund code -> id
+        'index': BitsetIndex,              # stock name/code -> bitmap of funds
+        'quarters': {'000001': '2024Q3'}
+    }
     """
-    inputs = [s.strip() for s in stock_inputs if s.strip()]
-    if not inputs:
-        return pd.DataFrame()
-        
-    cache_data = load_reverse_index()
     index = cache_data.get('index', {})
-    quarters = cache_data.get('fund_quarters', {})
-    scope_set = set(filter_fund_codes)
-    
-    fund_hits = {} # {fund_code: {matched_stocks_set}}
-    
-    for inp in inputs:
-        if inp in index:
-            hit_funds = index[inp]
-            for f_code in hit_funds:
-                if f_code in scope_set:
-                    if f_code not in fund_hits: fund_hits[f_code] = set()
-                    fund_hits[f_code].add(inp)
-    
-    final_results = []
-    for f_code, matches in fund_hits.items():
-        if matches:
-            final_results.append({
-                'fund_code': f_code,
-                'match_count': len(matches),
-                'match_degree': len(matches) / len(inputs),
-                'matched_stocks': ", ".join(matches),
-                'quarter': quarters.get(f_code, 'Unknown')
-            })
-            
-    if not final_results:
+    fund_set = set(cache_data.get('scanned_funds', []))
+    for codes in index.values():
+        fund_set.update(codes)
+    funds = sorted(fund_set)
+    fund_pos = {code: i for i, code in enumerate(funds)}
+    postings = {key: [fund_pos[c] for c in codes] for key, codes in index.items()}
+    return {
+        'funds': funds,
+        'fund_pos': fund_pos,
+        'index': BitsetIndex(postings, len(funds)),
+        'quarters': cache_data.get('fund_quarters', {})
+    }
+
+def get_fund_bitset_index(cache_data: dict = None) -> dict:
+    """
+    Returns the fund bitset index, rebuilt only when the reverse index on disk changes.
+    If `cache_data` is given (e.g. freshly updated in memory), it is indexed directly.
+    """
+    if cache_data is not None:
+        return build_fund_bitset_index(cache_data)
+
+    key = _index_version()
+    if _FUND_BITSET_CACHE['key'] != key:
+        _FUND_BITSET_CACHE['value'] = build_fund_bitset_index(load_reverse_index())
+        _FUND_BITSET_CACHE['key'] = key
+    return _FUND_BITSET_CACHE['value']
+
+def build_scope_bitmap(fund_codes, fund_index: dict) -> np.ndarray:
+    """Bitmap of the given fund codes within the index's fund universe."""
+    fund_pos = fund_index['fund_pos']
+    ids = [fund_pos[c] for c in fund_codes if c in fund_pos]
+    return bitmap_from_ids(ids, len(fund_index['funds']))
+
+def get_equity_scope_bitmap(fund_index: dict = None) -> np.ndarray:
+    """
+    Bitmap of equity-type funds (基金类型 matching EQUITY_FUND_PATTERN).
+    Precomputed once per index / fund list version.
+    """
+    if fund_index is None:
+        fund_index = get_fund_bitset_index()
+
+    # Memoized on the index itself, keyed by the fund list version
+    funds_mtime = os.path.getmtime(FUNDS_LIST_PATH) if os.path.exists(FUNDS_LIST_PATH) else 0
+    scopes = fund_index.setdefault('scopes', {})
+    if funds_mtime in scopes:
+        return scopes[funds_mtime]
+
+    n_funds = len(fund_index['funds'])
+    scope = full_bitmap(n_funds)
+    if os.path.exists(FUNDS_LIST_PATH):
+        try:
+            funds_df = pd.read_csv(FUNDS_LIST_PATH, encoding='utf-8-sig', dtype={'基金代码': str})
+            if '基金类型' in funds_df.columns:
+                equity = funds_df.loc[funds_df['基金类型'].astype(str).str.contains(EQUITY_FUND_PATTERN, regex=True), '基金代码']
+                fund_types = pd.Series(False, index=fund_index['funds'])
+                fund_types[fund_types.index.isin(equity)] = True
+                scope = bitmap_from_mask(fund_types.values)
+        except Exception as e:
+            print(f"Failed to build equity scope bitmap: {e}")
+
+    scopes[funds_mtime] = scope
+    return scope
+
+def query_basket(any_of: list[str] = None, all_of: list[str] = None, none_of: list[str] = None,
+                 at_least: tuple = None, filter_fund_codes: list[str] = None, scope: np.ndarray = None,
+                 fund_index: dict = None) -> pd.DataFrame:
+    """
+    Boolean basket query over the stock -> fund index, evaluated on packed bitsets.
+
+    Args:
+        any_of: Funds must hold at least one of these stocks (OR).
+        all_of: Funds must hold every one of these stocks (AND).
+        none_of: Funds must hold none of these stocks (NOT).
+        at_least: (k, stocks) - funds must hold at least k of the stocks.
+        filter_fund_codes: Optional fund scope as a list of codes.
+        scope: Optional precomputed scope bitmap (e.g. get_equity_scope_bitmap()).
+
+    Returns the same columns as query_reverse_index_direct. `match_count` counts
+    the positive terms (any_of / all_of / at_least stocks) a fund holds.
+    """
+    def _clean(items):
+        return list(dict.fromkeys(s.strip() for s in (items or []) if s and s.strip()))
+
+    any_of, all_of, none_of = _clean(any_of), _clean(all_of), _clean(none_of)
+    k, at_least_stocks = (at_least[0], _clean(at_least[1])) if at_least else (0, [])
+
+    positive = list(dict.fromkeys(all_of + any_of + at_least_stocks))
+    if not positive:
         return pd.DataFrame()
-        
-    results_df = pd.DataFrame(final_results)
+
+    if fund_index is None:
+        fund_index = get_fund_bitset_index()
+    bitset = fund_index['index']
+    n_funds = len(fund_index['funds'])
+    if n_funds == 0:
+        return pd.DataFrame()
+
+    result = full_bitmap(n_funds)
+    if scope is not None:
+        result &= scope
+    if filter_fund_codes is not None:
+        result &= build_scope_bitmap(filter_fund_codes, fund_index)
+    if all_of:
+        result &= bitset.all_of(all_of)
+    if any_of:
+        result &= bitset.any_of(any_of)
+    if at_least_stocks:
+        result &= bitset.at_least(at_least_stocks, k)
+    if none_of:
+        result &= bitset.none_of(none_of)
+
+    hit_ids = bitmap_to_ids(result, n_funds)
+    if hit_ids.size == 0:
+        return pd.DataFrame()
+
+    # Per-fund matched stocks: (n_positive x n_hits) boolean matrix
+    matched = np.unpackbits(bitset.stack(positive), axis=1, count=n_funds)[:, hit_ids].astype(bool)
+    match_counts = matched.sum(axis=0)
+    keep = match_counts > 0
+    if not keep.any():
+        return pd.DataFrame()
+    hit_ids, matched, match_counts = hit_ids[keep], matched[:, keep], match_counts[keep]
+
+    funds = fund_index['funds']
+    quarters = fund_index['quarters']
+    fund_codes = [funds[i] for i in hit_ids]
+    positive_arr = np.array(positive, dtype=object)
+
+    results_df = pd.DataFrame({
+        'fund_code': fund_codes,
+        'match_count': match_counts,
+        'match_degree': match_counts / len(positive),
+        'matched_stocks': [", ".join(positive_arr[matched[:, j]]) for j in range(len(fund_codes))],
+        'quarter': [quarters.get(c, 'Unknown') for c in fund_codes]
+    })
     results_df = results_df.sort_values(by=['match_count', 'match_degree'], ascending=False)
     return results_df
 
+def query_reverse_index_direct(stock_inputs, filter_fund_codes, scope: np.ndarray = None):
+    """
+    Directly query the reverse index for stocks within the given fund scope.
+    Assumes cache is valid and covers the funds (checked via check_cache_coverage).
+    OR-style match: funds holding any of the inputs, ranked by match count.
+    """
+    return query_basket(any_of=stock_inputs, filter_fund_codes=filter_fund_codes, scope=scope)
+
 def search_funds_by_stocks(stock_inputs: list[str], holdings_dir: str, year: int, filter_fund_codes: list[str] = None) -> pd.DataFrame:
     """Sync wrapper."""
     if filter_fund_codes:
@@ -0,0 +1,183 @@
+import os
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from src.data_manager import DATA_DIR, FUNDS_LIST_PATH, load_holdings_store, save_table_to_cache, load_table_from_cache
+from src.holdings_matrix import build_weight_matrix, quarter_signature
+from src.analyzer import EQUITY_FUND_PATTERN
+from src.exposure import stock_industry_matrix, _classification_signature
+from src.stocks.classification import load_stock_classification
+from src.price_store import compute_window_returns, get_price_store_version, MIN_WINDOW_COVERAGE
+from src.utils import shift_quarter, quarter_end_date
+
+# One partition per holdings quarter: data/attribution/{quarter}.pkl
+ATTRIBUTION_DIR = os.path.join(DATA_DIR, 'attribution')
+
+SUMMARY_COLUMNS = ['基金代码', '报告期', '组合收益', '基准收益', '超额收益', '配置效应', '选股效应', '交互效应', '覆盖率']
+INDUSTRY_COLUMNS = ['行业', '基金权重', '基准权重', '基金行业收益', '基准行业收益', '配置效应', '选股效应', '交互效应']
+
+# Bumped when the return inputs change meaning, so cached partitions are rebuilt
+ATTRIBUTION_VERSION = 2
+
+_ATTRIBUTION_MEMO = {}
+
+# --- Inputs ---
+
+def _equity_fund_codes() -> set:
+    """Codes of equity-type funds (基金类型 matching EQUITY_FUND_PATTERN); empty if the fund list is missing."""
+    if not os.path.exists(FUNDS_LIST_PATH):
+        return set()
+    try:
+        funds = pd.read_csv(FUNDS_LIST_PATH, dtype={'基金代码': str}, encoding='utf-8-sig')
+        return set(funds.loc[funds['基金类型'].astype(str).str.contains(EQUITY_FUND_PATTERN, regex=True), '基金代码'])
+    except Exception as e:
+        print(f"Failed to read equity funds: {e}")
+        return set()
+
+def _row_normalize(matrix: sparse.csr_matrix) -> tuple[sparse.csr_matrix, np.ndarray]:
+    totals = np.asarray(matrix.sum(axis=1)).ravel()
+    with np.errstate(divide='ignore'):
+        scale = np.where(totals > 0, 1 / totals, 0.0)
+    return sparse.diags(scale) @ matrix, totals
+
+# --- Batch Attribution ---
+
+def build_quarter_attribution(quarter: str, holdings: pd.DataFrame = None, classification: pd.DataFrame = None) -> dict:
+    """
+    Brinson (BHB) attribution by industry of every fund's `quarter` holdings over
+    the following quarter, against the aggregate holdings (持仓市值) of all equity funds.
+
+    Weights are the disclosed holdings re-normalized over stocks whose window return
+    is known (price_store.compute_window_returns: enough trading-day coverage and
+    only verified suspension gaps, so missing rows never count as 0%); '覆盖率' is
+    that priced share of the disclosed weight.
+    With fund / benchmark industry weights w_i, b_i, industry returns R_i, B_i and
+    benchmark return B:
+        配置效应 = (w_i - b_i)(B_i - B), 选股效应 = b_i(R_i - B_i),
+        交互效应 = (w_i - b_i)(R_i - B_i), summing to 组合收益 - 基准收益.
+    Every effect of every fund is a handful of sparse products over the whole quarter.
+
+    Returns: {'funds', 'industries', 'end_date', 'benchmark' (per-industry DataFrame),
+              'summary' (SUMMARY_COLUMNS), 'fund_weight', 'fund_return',
+              'allocation', 'selection', 'interaction' (float32 funds x industries)}
+    """
+    if holdings is None:
+        holdings = load_holdings_store()
+    if classification is None:
+        classification = load_stock_classification()
+    rows = holdings[holdings['报告期'] == quarter]
+    matrix, funds, stocks = build_weight_matrix(rows)
+    end = quarter_end_date(shift_quarter(quarter, 1))
+    returns = compute_window_returns(quarter_end_date(quarter), end, list(stocks)) if len(stocks) else pd.Series(dtype=float)
+    r = returns.reindex(stocks).to_numpy(dtype=np.float64)
+    priced = ~np.isnan(r)
+    if matrix.shape[0] == 0 or not priced.any():
+        return {}
+
+    # Priced part of each fund's disclosed portfolio, weights summing to 1
+    disclosed = np.asarray(matrix.sum(axis=1)).ravel()
+    matrix, stocks, r = matrix[:, priced].astype(np.float64).tocsr(), stocks[priced], r[priced]
+    W, priced_total = _row_normalize(matrix)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        coverage = np.where(disclosed > 0, priced_total / disclosed, np.nan)
+
+    # Benchmark: market-value weights of the equity funds' aggregate portfolio
+    equity = rows[rows['基金代码'].astype(str).isin(_equity_fund_codes())]
+    if equity.empty:
+        equity = rows
+    mv = pd.to_numeric(equity['持仓市值'], errors='coerce').groupby(equity['股票代码'].astype(str), observed=True).sum()
+    b = mv.reindex(stocks).fillna(0).to_numpy(dtype=np.float64)
+    b = b / b.sum() if b.sum() > 0 else np.full(len(stocks), 1 / len(stocks))
+
+    G, industries = stock_industry_matrix(stocks, classification)
+    G = G.astype(np.float64)
+    w_ind = (W @ G).toarray()                                  # (funds, industries)
+    fund_contrib = (W @ sparse.diags(r) @ G).toarray()
+    b_ind = G.T @ b                                           # (industries,)
+    b_contrib = G.T @ (b * r)
+    bench_return = float(b @ r)
+    fund_total = W @ r
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        b_ret = np.where(b_ind > 0, b_contrib / b_ind, bench_return)
+        f_ret = np.where(w_ind > 0, fund_contrib / w_ind, b_ret[None, :])
+    active = w_ind - b_ind[None, :]
+    allocation = active * (b_ret - bench_return)[None, :]
+    selection = b_ind[None, :] * (f_ret - b_ret[None, :])
+    interaction = active * (f_ret - b_ret[None, :])
+
+    summary = pd.DataFrame({
+        '基金代码': funds,
+        '报告期': quarter,
+        '组合收益': fund_total,
+        '基准收益': bench_return,
+        '超额收益': fund_total - bench_return,
+        '配置效应': allocation.sum(axis=1),
+        '选股效应': selection.sum(axis=1),
+        '交互效应': interaction.sum(axis=1),
+        '覆盖率': coverage,
+    })
+    summary.loc[priced_total <= 0, SUMMARY_COLUMNS[2:8]] = np.nan
+    benchmark = pd.DataFrame({'行业': industries, '基准权重': b_ind, '基准行业收益': b_ret})
+    return {
+        'funds': funds, 'industries': industries, 'end_date': end, 'benchmark': benchmark, 'summary': summary,
+        'fund_weight': w_ind.astype(np.float32), 'fund_return': f_ret.astype(np.float32),
+        'allocation': allocation.astype(np.float32), 'selection': selection.astype(np.float32),
+        'interaction': interaction.astype(np.float32),
+    }
+
+def get_quarter_attribution(quarter: str, holdings: pd.DataFrame = None) -> dict:
+    """Cached build_quarter_attribution, rebuilt when holdings, prices, classification or the fund list change."""
+    if holdings is None:
+        holdings = load_holdings_store()
+    classification = load_stock_classification()
+    stocks = np.unique(holdings.loc[holdings['报告期'] == quarter, '股票代码'].astype(str).to_numpy())
+    funds_mtime = os.path.getmtime(FUNDS_LIST_PATH) if os.path.exists(FUNDS_LIST_PATH) else 0
+    signature = (ATTRIBUTION_VERSION, MIN_WINDOW_COVERAGE, quarter_signature(quarter, holdings), get_price_store_version(),
+                 _classification_signature(stocks, classification), funds_mtime)
+
+    memo = _ATTRIBUTION_MEMO.get(quarter)
+    if memo and memo['signature'] == signature:
+        return memo
+    file_path = os.path.join(ATTRIBUTION_DIR, f'{quarter}.pkl')
+    cached = load_table_from_cache(file_path)
+    if not (cached and cached.get('signature') == signature):
+        print(f"Computing industry attribution for {quarter}...")
+        cached = {'signature': signature, **build_quarter_attribution(quarter, holdings, classification)}
+        save_table_to_cache(cached, file_path)
+    _ATTRIBUTION_MEMO[quarter] = cached
+    return cached
+
+# --- Views ---
+
+def get_attribution_summary(quarter: str, fund_codes: list[str] = None) -> pd.DataFrame:
+    """Per-fund totals (SUMMARY_COLUMNS) for one holdings quarter."""
+    table = get_quarter_attribution(quarter)
+    if 'summary' not in table:
+        return pd.DataFrame(columns=SUMMARY_COLUMNS)
+    summary = table['summary']
+    if fund_codes is not None:
+        summary = summary[summary['基金代码'].isin([str(c) for c in fund_codes])]
+    return summary.reset_index(drop=True)
+
+def get_fund_attribution(fund_code: str, quarter: str) -> pd.DataFrame:
+    """Per-industry breakdown (INDUSTRY_COLUMNS) of one fund, largest absolute contribution first."""
+    table = get_quarter_attribution(quarter)
+    pos = np.flatnonzero(table.get('funds', np.array([], dtype=object)) == str(fund_code))
+    if pos.size == 0:
+        return pd.DataFrame(columns=INDUSTRY_COLUMNS)
+    i = pos[0]
+    bench = table['benchmark']
+    result = pd.DataFrame({
+        '行业': table['industries'],
+        '基金权重': table['fund_weight'][i],
+        '基准权重': bench['基准权重'].to_numpy(),
+        '基金行业收益': np.where(table['fund_weight'][i] > 0, table['fund_return'][i], np.nan),
+        '基准行业收益': bench['基准行业收益'].to_numpy(),
+        '配置效应': table['allocation'][i],
+        '选股效应': table['selection'][i],
+        '交互效应': table['interaction'][i],
+    })
+    order = (result['配置效应'] + result['选股效应'] + result['交互效应']).abs().sort_values(ascending=False).index
+    return result.loc[order].reset_index(drop=True)
@@ -0,0 +1,156 @@
+import itertools
+import numpy as np
+import pandas as pd
+
+from src.data_manager import load_nav_store
+from src.metrics import build_nav_panel, forward_fill, compute_metrics_panel, METRIC_COLUMNS
+
+REBALANCE_RULES = {'none': None, 'M': 'M', 'Q': 'Q', 'Y': 'Y'}
+
+# --- Inputs ---
+
+def load_backtest_prices(fund_codes: list[str], start_date=None, end_date=None):
+    """
+    Adjusted NAV (日增长率 compounded) of the funds on their common dates:
+    the series starts on the first date all funds have a value and gaps are
+    forward-filled (a fund without a NAV that day keeps its last value).
+
+    Returns: (prices (n_funds, n_dates) in fund_codes order, dates DatetimeIndex)
+    """
+    fund_codes = [str(c) for c in fund_codes]
+    nav = load_nav_store()
+    nav = nav[nav['基金代码'].astype(str).isin(fund_codes)]
+    values, codes, dates = build_nav_panel(nav, end_date=end_date)
+    missing = [c for c in fund_codes if c not in set(codes)]
+    if missing:
+        raise ValueError(f"No cached NAV for: {', '.join(missing)}")
+
+    values = values[pd.Index(codes).get_indexer(fund_codes)]
+    first_common = np.max(np.argmax(~np.isnan(values), axis=1))
+    if start_date is not None:
+        first_common = max(first_common, int(dates.searchsorted(pd.Timestamp(start_date))))
+    values = forward_fill(values)[:, first_common:]
+    return values, dates[first_common:]
+
+def rebalance_positions(dates: pd.DatetimeIndex, rebalance='Q') -> np.ndarray:
+    """
+    Indices of rebalance days (always including 0). `rebalance` is 'none', 'M', 'Q', 'Y'
+    (first trading day of each new period), or a list of dates (first trading day on/after each).
+    """
+    if len(dates) == 0:
+        return np.array([0])
+    if isinstance(rebalance, str):
+        freq = REBALANCE_RULES.get(rebalance)
+        if freq is None:
+            return np.array([0])
+        periods = dates.to_period(freq).asi8
+        positions = np.flatnonzero(np.diff(periods) != 0) + 1
+    else:
+        positions = dates.searchsorted(pd.to_datetime(list(rebalance)))
+        positions = positions[positions < len(dates)]
+    return np.unique(np.concatenate([[0], positions])).astype(np.int64)
+
+def normalize_weights(weights) -> np.ndarray:
+    """(n,) or (m, n) weights -> (m, n) rows summing to 1."""
+    weights = np.atleast_2d(np.asarray(weights, dtype=np.float64))
+    totals = weights.sum(axis=1, keepdims=True)
+    if np.any(totals <= 0) or np.any(weights < 0):
+        raise ValueError("Weights must be non-negative with a positive sum.")
+    return weights / totals
+
+def weight_grid(n_funds: int, step: float = 0.1) -> np.ndarray:
+    """All weight vectors on the simplex with the given step, e.g. for a grid search. Shape (m, n_funds)."""
+    units = int(round(1 / step))
+    grid = [c for c in itertools.product(range(units + 1), repeat=n_funds - 1) if sum(c) <= units]
+    grid = np.array([list(c) + [units - sum(c)] for c in grid], dtype=np.float64)
+    return grid / units
+
+# --- Simulation ---
+
+def simulate_portfolios(prices: np.ndarray, weights: np.ndarray, rebalance_idx: np.ndarray,
+                        contribution: float = 0.0, fee_rate: float = 0.0) -> dict:
+    """
+    Simulates m weight vectors at once on aligned prices (n_funds, n_dates).
+
+    A rebalance on day s trades at the previous close (day s - 1), so a segment
+    grows by W @ (P_t / P_base) with base = s - 1 (0 for the first segment) and
+    consecutive segments chain end to end; every vector and every date of the
+    segment is one matrix product. At each rebalance the portfolio is reset to its
+    target weights, paying fee_rate on the traded fraction, and `contribution`
+    (cash per rebalance, e.g. monthly investing) is added.
+
+    Returns: {'nav': time-weighted index (m, T) starting at 1,
+              'value': account value (m, T) with initial capital 1,
+              'invested': cumulative capital (T,),
+              'turnover': traded fraction per rebalance (m, n_rebalances)}
+    """
+    m, T = weights.shape[0], prices.shape[1]
+    starts = np.asarray(rebalance_idx, dtype=np.int64)
+    segment = np.searchsorted(starts, np.arange(T), side='right') - 1
+    seg_start = starts[segment]
+
+    # Growth since the close before the segment start, for every fund and date: (n, T)
+    base = np.maximum(seg_start - 1, 0)
+    relative = prices / prices[:, base]
+    within = weights @ relative  # (m, T)
+
+    # Segment end factors and drift-induced turnover at each following rebalance
+    ends = np.append(starts[1:] - 1, T - 1)
+    end_growth = within[:, ends]  # (m, S)
+    drifted = weights[:, :, None] * relative[None, :, ends] / end_growth[:, None, :]  # (m, n, S)
+    turnover = np.abs(weights[:, :, None] - drifted).sum(axis=1)  # (m, S); turnover[:, s] applies at start s + 1
+    cost = np.ones_like(end_growth)
+    cost[:, 1:] = 1 - fee_rate * turnover[:, :-1]
+
+    # Time-weighted index: product of completed segments x growth inside the current one
+    seg_factor = end_growth * np.append(cost[:, 1:], np.ones((m, 1)), axis=1)
+    completed = np.cumprod(np.hstack([np.ones((m, 1)), seg_factor[:, :-1]]), axis=1)
+    nav = completed[:, segment] * within
+
+    # Account value with contributions: V_start[s] = V_start[s-1] * factor[s-1] + c
+    value_start = np.empty_like(end_growth)
+    value_start[:, 0] = 1.0
+    for s in range(1, len(starts)):
+        value_start[:, s] = value_start[:, s - 1] * seg_factor[:, s - 1] + contribution
+    value = value_start[:, segment] * within
+    invested = 1.0 + contribution * segment
+
+    return {'nav': nav, 'value': value, 'invested': invested, 'turnover': turnover[:, :-1]}
+
+def run_backtest(fund_codes: list[str], weights, rebalance='Q', start_date=None, end_date=None,
+                 contribution: float = 0.0, fee_rate: float = 0.0) -> dict:
+    """
+    Backtests one or many weight vectors over the funds' cached NAVs.
+
+    Args:
+        weights: (n_funds,) or (m, n_funds); rows are normalized to sum to 1.
+        rebalance: 'none', 'M', 'Q', 'Y' or a list of dates.
+        contribution: Cash added at each rebalance (initial capital is 1).
+        fee_rate: Cost per unit of traded value at each rebalance.
+
+    Returns: {'dates', 'funds', 'weights', 'nav', 'value', 'invested', 'drawdown', 'metrics'}
+        metrics: one row per weight vector (METRIC_COLUMNS without 基金代码, + 组合).
+    """
+    weights = normalize_weights(weights)
+    if weights.shape[1] != len(fund_codes):
+        raise ValueError("Weights must have one column per fund.")
+    prices, dates = load_backtest_prices(fund_codes, start_date, end_date)
+    rebalance_idx = rebalance_positions(dates, rebalance)
+    result = simulate_portfolios(prices, weights, rebalance_idx, contribution, fee_rate)
+
+    nav = result['nav']
+    drawdown = nav / np.maximum.accumulate(nav, axis=1) - 1
+    metrics = pd.DataFrame(compute_metrics_panel(nav, dates))
+    metrics.insert(0, '组合', np.arange(len(weights)))
+    metrics = metrics[['组合'] + METRIC_COLUMNS[1:]]
+
+    return {'dates': dates, 'funds': list(fund_codes), 'weights': weights, 'nav': nav, 'value': result['value'],
+            'invested': result['invested'], 'drawdown': drawdown, 'metrics': metrics}
+
+if __name__ == "__main__":
+    # Consistency check: a single fund at weight 1 must not depend on the rebalance schedule
+    toy = np.array([[1, 1.1, 1.21, 1.331, 1.4641, 1.61051]])
+    for idx in ([0], [0, 2, 4], [0, 1, 2, 3, 4, 5]):
+        nav = simulate_portfolios(toy, np.ones((1, 1)), np.array(idx))['nav'][0]
+        assert np.allclose(nav, toy[0]), (idx, nav)
+    print("Rebalance schedules agree for a single fund.")
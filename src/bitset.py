@@ -0,0 +1,133 @@
+import numpy as np
+
+# Number of set bits for every possible byte value, used to popcount packed bitmaps.
+_POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+# --- Packed Bitmap Helpers ---
+# Bitmaps are uint8 arrays produced by np.packbits over a fixed universe of
+# `n_bits` ids. Padding bits at the end are always kept at zero.
+
+def empty_bitmap(n_bits: int) -> np.ndarray:
+    return np.zeros((n_bits + 7) // 8, dtype=np.uint8)
+
+def full_bitmap(n_bits: int) -> np.ndarray:
+    return np.packbits(np.ones(n_bits, dtype=bool))
+
+def bitmap_from_ids(ids, n_bits: int) -> np.ndarray:
+    """Packs a collection of integer ids into a bitmap."""
+    bits = np.zeros(n_bits, dtype=bool)
+    ids = np.asarray(ids, dtype=np.int64)
+    if ids.size:
+        bits[ids] = True
+    return np.packbits(bits)
+
+def bitmap_from_mask(mask) -> np.ndarray:
+    """Packs a boolean mask (one entry per id) into a bitmap."""
+    return np.packbits(np.asarray(mask, dtype=bool))
+
+def bitmap_to_ids(bitmap: np.ndarray, n_bits: int) -> np.ndarray:
+    """Returns the sorted ids whose bit is set."""
+    return np.flatnonzero(np.unpackbits(bitmap, count=n_bits))
+
+def bitmap_not(bitmap: np.ndarray, n_bits: int) -> np.ndarray:
+    """Complement within the universe (padding bits stay cleared)."""
+    return np.bitwise_and(np.invert(bitmap), full_bitmap(n_bits))
+
+def popcount(bitmap: np.ndarray) -> int:
+    return int(_POPCOUNT_TABLE[bitmap].sum(dtype=np.int64))
+
+def popcount_rows(bitmaps: np.ndarray) -> np.ndarray:
+    """Popcount of every row of a 2-D stack of bitmaps."""
+    return _POPCOUNT_TABLE[bitmaps].sum(axis=-1, dtype=np.int64)
+
+def bit_counts(bitmaps: np.ndarray, n_bits: int) -> np.ndarray:
+    """For a stack of bitmaps (rows), counts how many rows have each id set."""
+    if len(bitmaps) == 0:
+        return np.zeros(n_bits, dtype=np.int64)
+    unpacked = np.unpackbits(np.asarray(bitmaps), axis=-1, count=n_bits)
+    return unpacked.sum(axis=0, dtype=np.int64)
+
+
+class BitsetIndex:
+    """
+    Inverted index mapping keys to packed bitmaps over a fixed universe of ids.
+
+    Postings are stored compactly as one sorted int32 array with offsets (CSR
+    layout); a key's bitmap is only materialized the first time it is queried
+    and then kept in a small cache. All boolean operators work on packed
+    bitmaps, so a query costs a few vectorized passes over n_bits / 8 bytes.
+    """
+
+    def __init__(self, postings: dict, n_bits: int, max_cached: int = 4096):
+        self.n_bits = n_bits
+        self.max_cached = max_cached
+        self.keys = list(postings.keys())
+        self.key_pos = {k: i for i, k in enumerate(self.keys)}
+
+        lengths = np.fromiter((len(postings[k]) for k in self.keys), dtype=np.int64, count=len(self.keys))
+        self.offsets = np.zeros(len(self.keys) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=self.offsets[1:])
+        self.ids = np.empty(self.offsets[-1], dtype=np.int32)
+        for i, k in enumerate(self.keys):
+            self.ids[self.offsets[i]:self.offsets[i + 1]] = np.sort(np.asarray(list(postings[k]), dtype=np.int32))
+
+        self._cache = {}
+
+    def __contains__(self, key) -> bool:
+        return key in self.key_pos
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def postings(self, key) -> np.ndarray:
+        """Sorted ids for a key (empty if the key is unknown)."""
+        pos = self.key_pos.get(key)
+        if pos is None:
+            return np.empty(0, dtype=np.int32)
+        return self.ids[self.offsets[pos]:self.offsets[pos + 1]]
+
+    def bitmap(self, key) -> np.ndarray:
+        """Packed bitmap for a key (all zeros if the key is unknown)."""
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        bitmap = bitmap_from_ids(self.postings(key), self.n_bits)
+        if len(self._cache) >= self.max_cached:
+            self._cache.clear()
+        self._cache[key] = bitmap
+        return bitmap
+
+    def stack(self, keys) -> np.ndarray:
+        """2-D array with one bitmap row per key."""
+        if not keys:
+            return np.zeros((0, (self.n_bits + 7) // 8), dtype=np.uint8)
+        return np.vstack([self.bitmap(k) for k in keys])
+
+    # --- Boolean Operators ---
+
+    def any_of(self, keys) -> np.ndarray:
+        if not keys:
+            return empty_bitmap(self.n_bits)
+        return np.bitwise_or.reduce(self.stack(keys), axis=0)
+
+    def all_of(self, keys) -> np.ndarray:
+        if not keys:
+            return full_bitmap(self.n_bits)
+        return np.bitwise_and.reduce(self.stack(keys), axis=0)
+
+    def none_of(self, keys) -> np.ndarray:
+        return bitmap_not(self.any_of(keys), self.n_bits)
+
+    def at_least(self, keys, k: int) -> np.ndarray:
+        """Ids matched by at least `k` of `keys`."""
+        if k <= 0:
+            return full_bitmap(self.n_bits)
+        if k == 1:
+            return self.any_of(keys)
+        if k >= len(keys):
+            return self.all_of(keys) if k == len(keys) else empty_bitmap(self.n_bits)
+        return bitmap_from_mask(bit_counts(self.stack(keys), self.n_bits) >= k)
+
+    def counts(self, keys) -> np.ndarray:
+        """Per-id number of matching keys."""
+        return bit_counts(self.stack(keys), self.n_bits)
@@ -0,0 +1,216 @@
+import hashlib
+import os
+import numpy as np
+import pandas as pd
+from scipy.cluster.hierarchy import linkage, fcluster
+from scipy.cluster.vq import kmeans2
+from scipy.spatial.distance import squareform
+
+from src.data_manager import DATA_DIR, load_nav_store, get_nav_store_version, save_table_to_cache, load_table_from_cache
+from src.metrics import build_nav_panel
+
+CORRELATION_DIR = os.path.join(DATA_DIR, 'correlation')
+
+# Rows per block. A block keeps six block_size x n_funds float32 slices
+# (~150 MB at 256 x 25k), independent of how many funds are correlated.
+DEFAULT_BLOCK_SIZE = 256
+DEFAULT_TOP_K = 20
+DEFAULT_LOOKBACK = 250  # trading days
+MIN_OVERLAP = 60        # minimum common dates for a pair to be scored
+
+# Hierarchical clustering needs the full condensed distance matrix
+HIERARCHICAL_MAX_FUNDS = 3000
+
+# --- Return Panels ---
+
+def build_return_panel(lookback: int = DEFAULT_LOOKBACK, fund_codes: list[str] = None, min_obs: int = MIN_OVERLAP):
+    """
+    Aligned daily returns (日增长率 / 100) over the last `lookback` NAV dates,
+    NaN where a fund has no value that day. Funds with fewer than `min_obs`
+    returns in the window are dropped.
+
+    Returns: (returns float32 (n_funds, n_dates), fund_codes ndarray, dates DatetimeIndex)
+    """
+    nav = load_nav_store()
+    if fund_codes is not None:
+        nav = nav[nav['基金代码'].astype(str).isin([str(c) for c in fund_codes])]
+    if nav.empty:
+        return np.empty((0, 0), dtype=np.float32), np.array([], dtype=object), pd.DatetimeIndex([])
+
+    dates = np.sort(nav['净值日期'].unique())
+    start_date = dates[-lookback] if len(dates) > lookback else dates[0]
+    values, codes, dates = build_nav_panel(nav, value_col='日增长率', start_date=start_date)
+    keep = (~np.isnan(values)).sum(axis=1) >= min_obs
+    return (values[keep] / 100).astype(np.float32), codes[keep], dates
+
+def _pairwise_block(x_block, m_block, x, m, x2, min_overlap: int):
+    """
+    Pairwise-complete Pearson correlation of a block of rows against all rows.
+    Each pair uses only the dates both funds have. x / m are the zero-filled
+    returns and the validity mask; x2 = x ** 2.
+    Returns: (corr (b, n) float32 with NaN for pairs below min_overlap, overlap (b, n))
+    """
+    n_common = m_block @ m.T
+    s_i = x_block @ m.T
+    s_j = m_block @ x.T
+    ss_i = (x_block * x_block) @ m.T
+    ss_j = m_block @ x2.T
+    p = x_block @ x.T
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = n_common * p - s_i * s_j
+        var = (n_common * ss_i - s_i * s_i) * (n_common * ss_j - s_j * s_j)
+        corr = cov / np.sqrt(var)
+    corr[(n_common < min_overlap) | ~(var > 0)] = np.nan
+    return np.clip(corr, -1.0, 1.0), n_common
+
+def compute_top_correlated(returns: np.ndarray, k: int = DEFAULT_TOP_K, block_size: int = DEFAULT_BLOCK_SIZE,
+                           min_overlap: int = MIN_OVERLAP, progress_callback=None):
+    """
+    Blocked all-pairs return correlation keeping only the top-k neighbours per
+    fund (highest correlation first). Rows are processed `block_size` at a time,
+    so the n x n matrix is never held in memory.
+
+    Returns: (neighbors int32 (n, k), scores float32 (n, k), overlap int32 (n, k)); missing slots are -1 / NaN / 0.
+    """
+    n = returns.shape[0]
+    k = min(k, max(n - 1, 0))
+    neighbors = np.full((n, k), -1, dtype=np.int32)
+    scores = np.full((n, k), np.nan, dtype=np.float32)
+    overlap = np.zeros((n, k), dtype=np.int32)
+    if n == 0 or k == 0:
+        return neighbors, scores, overlap
+
+    m = (~np.isnan(returns)).astype(np.float32)
+    x = np.nan_to_num(returns, nan=0.0).astype(np.float32)
+    x2 = x * x
+
+    for start in range(0, n, block_size):
+        end = min(start + block_size, n)
+        corr, n_common = _pairwise_block(x[start:end], m[start:end], x, m, x2, min_overlap)
+        # Exclude self-correlation; NaN pairs sort last
+        corr[np.arange(end - start), np.arange(start, end)] = np.nan
+        key = np.where(np.isnan(corr), -np.inf, corr)
+
+        top = np.argpartition(-key, k - 1, axis=1)[:, :k]
+        top_key = np.take_along_axis(key, top, axis=1)
+        order = np.argsort(-top_key, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_key = np.take_along_axis(top_key, order, axis=1)
+
+        valid = np.isfinite(top_key)
+        neighbors[start:end] = np.where(valid, top, -1)
+        scores[start:end] = np.where(valid, top_key, np.nan)
+        overlap[start:end] = np.where(valid, np.take_along_axis(n_common, top, axis=1), 0)
+
+        if progress_callback:
+            progress_callback(end, n)
+
+    return neighbors, scores, overlap
+
+def compute_correlation_matrix(fund_codes: list[str], lookback: int = DEFAULT_LOOKBACK, min_overlap: int = MIN_OVERLAP) -> pd.DataFrame:
+    """Full pairwise-complete correlation matrix for a small set of funds (e.g. favorites)."""
+    returns, codes, _ = build_return_panel(lookback, fund_codes=fund_codes, min_obs=min_overlap)
+    if len(codes) == 0:
+        return pd.DataFrame()
+    m = (~np.isnan(returns)).astype(np.float32)
+    x = np.nan_to_num(returns, nan=0.0)
+    corr, _ = _pairwise_block(x, m, x, m, x * x, min_overlap)
+    np.fill_diagonal(corr, 1.0)
+    return pd.DataFrame(corr, index=codes, columns=codes)
+
+# --- Cached Neighbour Tables ---
+
+def get_correlation_table(lookback: int = DEFAULT_LOOKBACK, k: int = DEFAULT_TOP_K) -> dict:
+    """
+    Returns the cached top-k correlation table over all cached NAV series,
+    recomputing it when the NAV store changed.
+    Structure: {'version', 'lookback', 'k', 'funds', 'neighbors', 'scores', 'overlap'}
+    """
+    version = get_nav_store_version()
+    file_path = os.path.join(CORRELATION_DIR, f'top_{lookback}.pkl')
+    cached = load_table_from_cache(file_path)
+    if cached and cached.get('version') == version and cached.get('k', 0) >= k:
+        return cached
+
+    print(f"Computing return correlation (lookback {lookback})...")
+    returns, fund_codes, _ = build_return_panel(lookback)
+    neighbors, scores, overlap = compute_top_correlated(returns, k=k)
+    table = {'version': version, 'lookback': lookback, 'k': k, 'funds': fund_codes,
+             'neighbors': neighbors, 'scores': scores, 'overlap': overlap}
+    save_table_to_cache(table, file_path)
+    print(f"Saved correlation table: {len(fund_codes)} funds.")
+    return table
+
+def get_correlated_funds(fund_code: str, lookback: int = DEFAULT_LOOKBACK, k: int = 10) -> pd.DataFrame:
+    """Top-k funds whose daily returns move most closely with `fund_code`."""
+    table = get_correlation_table(lookback)
+    pos = np.flatnonzero(table['funds'] == fund_code)
+    if pos.size == 0:
+        return pd.DataFrame(columns=['基金代码', '相关系数', '共同交易日'])
+    i = pos[0]
+    valid = table['neighbors'][i] >= 0
+    return pd.DataFrame({
+        '基金代码': table['funds'][table['neighbors'][i][valid]],
+        '相关系数': table['scores'][i][valid],
+        '共同交易日': table['overlap'][i][valid],
+    }).head(k)
+
+# --- Clustering ---
+
+def _standardize_rows(returns: np.ndarray) -> np.ndarray:
+    """
+    Z-scores each row over its own valid dates and sets missing dates to 0.
+    Squared Euclidean distance between such rows is proportional to 1 - correlation,
+    so k-means on them clusters by co-movement.
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.nanmean(returns, axis=1, keepdims=True)
+        std = np.nanstd(returns, axis=1, keepdims=True)
+        z = (returns - mean) / np.where(std > 0, std, 1.0)
+    counts = np.maximum((~np.isnan(returns)).sum(axis=1, keepdims=True), 1)
+    return np.nan_to_num(z, nan=0.0) / np.sqrt(counts)
+
+def cluster_funds(fund_codes: list[str] = None, n_clusters: int = 20, method: str = 'kmeans',
+                  lookback: int = DEFAULT_LOOKBACK, seed: int = 0) -> pd.DataFrame:
+    """
+    Clusters funds by daily-return behaviour. Results are cached per NAV store version.
+
+    Args:
+        fund_codes: Funds to cluster (default: every fund with enough NAV history).
+        method: 'kmeans' (standardized return vectors, any size) or
+                'hierarchical' (average linkage on 1 - pairwise-complete correlation,
+                up to HIERARCHICAL_MAX_FUNDS funds; larger sets fall back to k-means).
+
+    Returns: DataFrame ['基金代码', '簇']
+    """
+    version = get_nav_store_version()
+    codes_key = hashlib.md5(','.join(sorted(map(str, fund_codes))).encode('utf-8')).hexdigest()[:12] if fund_codes is not None else 'all'
+    file_path = os.path.join(CORRELATION_DIR, f'clusters_{method}_{n_clusters}_{lookback}_{codes_key}.pkl')
+    cached = load_table_from_cache(file_path)
+    if cached and cached.get('version') == version:
+        return cached['table']
+
+    returns, codes, _ = build_return_panel(lookback, fund_codes=fund_codes)
+    if len(codes) == 0:
+        return pd.DataFrame(columns=['基金代码', '簇'])
+    n_clusters = max(1, min(n_clusters, len(codes)))
+
+    if method == 'hierarchical' and len(codes) > HIERARCHICAL_MAX_FUNDS:
+        print(f"{len(codes)} funds is too many for hierarchical clustering, using k-means.")
+        method = 'kmeans'
+
+    if method == 'hierarchical':
+        m = (~np.isnan(returns)).astype(np.float32)
+        x = np.nan_to_num(returns, nan=0.0)
+        corr, _ = _pairwise_block(x, m, x, m, x * x, MIN_OVERLAP)
+        dist = 1.0 - np.nan_to_num(corr, nan=0.0)
+        np.fill_diagonal(dist, 0.0)
+        dist = (dist + dist.T) / 2
+        labels = fcluster(linkage(squareform(dist, checks=False), method='average'), n_clusters, criterion='maxclust') - 1
+    else:
+        z = _standardize_rows(returns).astype(np.float64)
+        _, labels = kmeans2(z, n_clusters, minit='++', seed=seed)
+
+    table = pd.DataFrame({'基金代码': codes, '簇': labels.astype(int)})
+    save_table_to_cache({'version': version, 'table': table}, file_path)
+    return table
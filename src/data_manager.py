@@ -1,13 +1,31 @@
 import os
+import pickle
+import hashlib
 import pandas as pd
 import akshare as ak
 from datetime import datetime
 
+from src.utils import parse_report_quarter
+
 DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
 NAV_DIR = os.path.join(DATA_DIR, 'nav')
 HOLDINGS_DIR = os.path.join(DATA_DIR, 'holdings')
 FUNDS_LIST_PATH = os.path.join(DATA_DIR, 'funds.csv')
 FAVORITES_PATH = os.path.join(DATA_DIR, 'favorites.csv')
+HOLDINGS_STORE_PATH = os.path.join(DATA_DIR, 'holdings_store.pkl')
+
+# Columns of the consolidated holdings store (one row per fund / quarter / stock)
+HOLDINGS_STORE_COLUMNS = ['基金代码', '年份', '报告期', '股票代码', '股票名称', '占净值比例', '持股数', '持仓市值']
+
+# In-process copy of the holdings store, reused while no source file changes
+_HOLDINGS_STORE_MEMO = {'files': None, 'table': None}
+
+NAV_STORE_PATH = os.path.join(DATA_DIR, 'nav_store.pkl')
+
+# Columns of the consolidated NAV store (one row per fund / date)
+NAV_STORE_COLUMNS = ['基金代码', '净值日期', '单位净值', '日增长率']
+
+_NAV_STORE_MEMO = {'files': None, 'table': None, 'version': None}
 
 def _read_csv_robust(file_path, **kwargs):
     """
@@ -224,6 +242,170 @@ def get_nav_last_date(fund_code: str) -> str:
         print(f"Error checking NAV last date for {fund_code}: {e}")
         return None
 
+# --- Columnar Table Cache ---
+def save_table_to_cache(obj, file_path: str):
+    """
+    Saves a derived table (DataFrame, or dict of arrays/frames) as a pickle.
+    Pandas/numpy columns are pickled as whole column blocks, so reload is fast.
+    Written to a temp file first so readers never see a partial file.
+    """
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    tmp_path = f"{file_path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, file_path)
+
+def load_table_from_cache(file_path: str, default=None):
+    """Loads a table saved by save_table_to_cache. Returns `default` if missing/unreadable."""
+    if os.path.exists(file_path):
+        try:
+            with open(file_path, 'rb') as f:
+                return pickle.load(f)
+        except Exception as e:
+            print(f"Error reading table cache {file_path}: {e}")
+    return default
+
+# --- Consolidated Holdings Store ---
+def _read_holdings_file(file_path: str) -> pd.DataFrame:
+    """Reads one data/holdings/{code}_{year}.csv into the store schema."""
+    file_name = os.path.basename(file_path)
+    fund_code, year = file_name[:-4].split('_')
+    try:
+        df = _read_csv_robust(file_path, dtype={'股票代码': str})
+    except Exception as e:
+        print(f"Error reading holdings cache {file_name}: {e}")
+        return pd.DataFrame(columns=HOLDINGS_STORE_COLUMNS)
+    if df.empty or '季度' not in df.columns or '股票代码' not in df.columns:
+        return pd.DataFrame(columns=HOLDINGS_STORE_COLUMNS)
+
+    df['基金代码'] = fund_code
+    df['年份'] = int(year)
+    df['报告期'] = df['季度'].map({q: parse_report_quarter(q) for q in df['季度'].unique()})
+    for col in ['占净值比例', '持股数', '持仓市值']:
+        df[col] = pd.to_numeric(df[col], errors='coerce') if col in df.columns else 0.0
+    if '股票名称' not in df.columns:
+        df['股票名称'] = df['股票代码']
+    return df.dropna(subset=['报告期'])[HOLDINGS_STORE_COLUMNS]
+
+def load_holdings_store(refresh: bool = True) -> pd.DataFrame:
+    """
+    Loads all cached holdings as one columnar table:
+    ['基金代码', '年份', '报告期', '股票代码', '股票名称', '占净值比例', '持股数', '持仓市值']
+    where '报告期' is a 'YYYYQn' label.
+
+    The table is persisted to data/holdings_store.pkl together with the mtime of
+    every source CSV. On refresh only new/changed/removed files are re-read.
+    """
+    if not refresh and _HOLDINGS_STORE_MEMO['table'] is not None:
+        return _HOLDINGS_STORE_MEMO['table']
+
+    current = {}
+    if refresh and os.path.exists(HOLDINGS_DIR):
+        current = {e.name: e.stat().st_mtime for e in os.scandir(HOLDINGS_DIR) if e.name.endswith('.csv')}
+        if current == _HOLDINGS_STORE_MEMO['files']:
+            return _HOLDINGS_STORE_MEMO['table']
+
+    stored = load_table_from_cache(HOLDINGS_STORE_PATH, default={'files': {}, 'table': pd.DataFrame(columns=HOLDINGS_STORE_COLUMNS)})
+    if not refresh or not os.path.exists(HOLDINGS_DIR):
+        _HOLDINGS_STORE_MEMO.update(stored)
+        return stored['table']
+
+    known = stored['files']
+    changed = [name for name, mtime in current.items() if known.get(name) != mtime]
+    removed = [name for name in known if name not in current]
+    if not changed and not removed:
+        _HOLDINGS_STORE_MEMO.update(stored)
+        return stored['table']
+
+    print(f"Refreshing holdings store: {len(changed)} changed, {len(removed)} removed files...")
+    table = stored['table']
+    stale = {(name[:-4].split('_')[0], int(name[:-4].split('_')[1])) for name in changed + removed}
+    if not table.empty and stale:
+        keys = pd.MultiIndex.from_arrays([table['基金代码'].astype(str), table['年份'].astype(int)])
+        table = table[~keys.isin(list(stale))]
+
+    frames = [table.astype({'基金代码': str, '报告期': str, '股票代码': str, '股票名称': str})] if not table.empty else []
+    frames += [_read_holdings_file(os.path.join(HOLDINGS_DIR, name)) for name in changed]
+    frames = [f for f in frames if not f.empty]
+    table = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=HOLDINGS_STORE_COLUMNS)
+
+    # Categorical keys keep the pickle small and make group-bys cheap
+    table = table.astype({'基金代码': 'category', '报告期': 'category', '股票代码': 'category', '股票名称': 'category', '年份': 'int16'})
+    save_table_to_cache({'files': current, 'table': table}, HOLDINGS_STORE_PATH)
+    _HOLDINGS_STORE_MEMO.update({'files': current, 'table': table})
+    print(f"Holdings store saved: {len(table)} rows.")
+    return table
+
+# --- Consolidated NAV Store ---
+def _read_nav_file(file_path: str) -> pd.DataFrame:
+    """Reads one data/nav/{code}.csv into the store schema."""
+    fund_code = os.path.basename(file_path)[:-4]
+    try:
+        df = _read_csv_robust(file_path)
+    except Exception as e:
+        print(f"Error reading NAV cache for {fund_code}: {e}")
+        return pd.DataFrame(columns=NAV_STORE_COLUMNS)
+    if df.empty or '净值日期' not in df.columns or '单位净值' not in df.columns:
+        return pd.DataFrame(columns=NAV_STORE_COLUMNS)
+
+    df['基金代码'] = fund_code
+    df['净值日期'] = pd.to_datetime(df['净值日期'], errors='coerce')
+    df['单位净值'] = pd.to_numeric(df['单位净值'], errors='coerce')
+    df['日增长率'] = pd.to_numeric(df['日增长率'], errors='coerce') if '日增长率' in df.columns else float('nan')
+    return df.dropna(subset=['净值日期'])[NAV_STORE_COLUMNS]
+
+def _files_version(files: dict) -> str:
+    """Stable version string for a {file_name: mtime} map."""
+    return hashlib.md5(repr(sorted(files.items())).encode('utf-8')).hexdigest()
+
+def load_nav_store(refresh: bool = True) -> pd.DataFrame:
+    """
+    Loads all cached NAV series as one columnar table sorted by (基金代码, 净值日期):
+    ['基金代码', '净值日期', '单位净值', '日增长率']
+
+    Persisted to data/nav_store.pkl with per-file mtimes; only new/changed/removed
+    NAV files are re-read on refresh (same scheme as load_holdings_store).
+    """
+    if not refresh and _NAV_STORE_MEMO['table'] is not None:
+        return _NAV_STORE_MEMO['table']
+
+    current = {}
+    if refresh and os.path.exists(NAV_DIR):
+        current = {e.name: e.stat().st_mtime for e in os.scandir(NAV_DIR) if e.name.endswith('.csv')}
+        if current == _NAV_STORE_MEMO['files']:
+            return _NAV_STORE_MEMO['table']
+
+    stored = load_table_from_cache(NAV_STORE_PATH, default={'files': {}, 'table': pd.DataFrame(columns=NAV_STORE_COLUMNS)})
+    if not refresh or not os.path.exists(NAV_DIR):
+        _NAV_STORE_MEMO.update({'files': stored['files'], 'table': stored['table'], 'version': _files_version(stored['files'])})
+        return stored['table']
+
+    known = stored['files']
+    changed = [name for name, mtime in current.items() if known.get(name) != mtime]
+    removed = [name for name in known if name not in current]
+    table = stored['table']
+    if changed or removed:
+        print(f"Refreshing NAV store: {len(changed)} changed, {len(removed)} removed files...")
+        stale = {name[:-4] for name in changed + removed}
+        if not table.empty and stale:
+            table = table[~table['基金代码'].astype(str).isin(stale)]
+        frames = [table.astype({'基金代码': str})] if not table.empty else []
+        frames += [_read_nav_file(os.path.join(NAV_DIR, name)) for name in changed]
+        frames = [f for f in frames if not f.empty]
+        table = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=NAV_STORE_COLUMNS)
+        table = table.drop_duplicates(subset=['基金代码', '净值日期'], keep='last')
+        table = table.sort_values(['基金代码', '净值日期'], kind='stable').reset_index(drop=True)
+        table = table.astype({'基金代码': 'category'})
+        save_table_to_cache({'files': current, 'table': table}, NAV_STORE_PATH)
+
+    _NAV_STORE_MEMO.update({'files': current, 'table': table, 'version': _files_version(current)})
+    return table
+
+def get_nav_store_version() -> str:
+    """Version of the NAV store (changes whenever any NAV cache file changes)."""
+    load_nav_store()
+    return _NAV_STORE_MEMO['version']
+
 if __name__ == "__main__":
     ensure_data_dir_structure()
     fetch_and_save_fund_list()
@@ -0,0 +1,309 @@
+import os
+import shutil
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+from src.data_manager import DATA_DIR, load_holdings_store, load_nav_store, save_table_to_cache, load_table_from_cache
+from src.holdings_matrix import build_weight_matrix
+from src.stocks.stocks import get_spot_snapshot
+
+# Recorded estimates and their accuracy (see the Snapshot Store section)
+ESTIMATES_DIR = os.path.join(DATA_DIR, 'estimates')
+
+ESTIMATE_COLUMNS = ['基金代码', '穿透估算涨幅', '覆盖率', '股票仓位', '持仓报告期', '估算时间']
+
+# Look-through weights, rebuilt when the holdings store object changes
+_WEIGHTS_MEMO = {'holdings': None, 'weights': None}
+
+# --- Look-through Weights ---
+
+def build_lookthrough_weights(holdings: pd.DataFrame) -> dict:
+    """
+    Funds x stocks 占净值比例 matrix from each fund's latest report, plus the
+    fund's equity position. Q1/Q3 reports disclose only the top 10 holdings,
+    so for those the total weight of the fund's latest Q2/Q4 report is used
+    as the position (undisclosed holdings are assumed to move like disclosed ones).
+
+    Returns: {'matrix', 'funds', 'stocks', 'position', 'quarter'}
+    """
+    rows = holdings[['基金代码', '报告期', '股票代码', '占净值比例']]
+    quarter = rows['报告期'].astype(str)
+    latest = quarter.groupby(rows['基金代码'], observed=True).transform('max')
+    is_latest = (quarter == latest).to_numpy()
+    matrix, funds, stocks = build_weight_matrix(rows[is_latest])
+    disclosed = np.asarray(matrix.sum(axis=1)).ravel()
+
+    latest_q = pd.Series(latest[is_latest].to_numpy(), index=rows['基金代码'][is_latest].astype(str).to_numpy())
+    latest_q = latest_q[~latest_q.index.duplicated()].reindex(funds)
+
+    is_full = quarter.str.endswith(('Q2', 'Q4')).to_numpy()
+    full_rows, full_q = rows[is_full], quarter[is_full]
+    latest_full = full_q.groupby(full_rows['基金代码'], observed=True).transform('max')
+    full_position = full_rows[(full_q == latest_full).to_numpy()].groupby('基金代码', observed=True)['占净值比例'].sum()
+    full_position.index = full_position.index.astype(str)
+    full_position = full_position.reindex(funds).to_numpy()
+
+    partial = latest_q.str.endswith(('Q1', 'Q3')).to_numpy()
+    position = np.where(partial & ~np.isnan(full_position), np.fmax(full_position, disclosed), disclosed)
+    return {'matrix': matrix, 'funds': funds, 'stocks': stocks, 'position': position, 'quarter': latest_q.to_numpy()}
+
+def get_lookthrough_weights() -> dict:
+    holdings = load_holdings_store()
+    if _WEIGHTS_MEMO['holdings'] is not holdings:
+        _WEIGHTS_MEMO.update({'holdings': holdings, 'weights': build_lookthrough_weights(holdings)})
+    return _WEIGHTS_MEMO['weights']
+
+# --- Estimation ---
+
+def estimate_fund_changes(spot: pd.DataFrame = None, fund_codes: list[str] = None) -> pd.DataFrame:
+    """
+    Estimated intraday change (%) of every fund with cached holdings, from one
+    A-share spot snapshot: a single sparse matrix-vector product of holdings
+    weights with stock returns, rescaled from the priced (A-share) part of the
+    disclosed portfolio to the fund's equity position.
+
+    Args:
+        spot: Snapshot from get_spot_snapshot (shared snapshot if None).
+        fund_codes: Only return these funds.
+    """
+    if spot is None:
+        spot = get_spot_snapshot()
+    weights = get_lookthrough_weights()
+    if spot.empty or weights['matrix'].shape[0] == 0:
+        return pd.DataFrame(columns=ESTIMATE_COLUMNS)
+
+    changes = spot.drop_duplicates('代码').set_index('代码')['涨跌幅']
+    returns = changes.reindex(weights['stocks']).to_numpy(dtype=np.float64) / 100
+    priced = ~np.isnan(returns)
+
+    matrix = weights['matrix']
+    weighted = matrix @ np.where(priced, returns, 0.0)
+    covered = matrix @ priced.astype(np.float64)
+    disclosed = np.asarray(matrix.sum(axis=1)).ravel()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        estimate = np.where(covered > 0, weighted / covered * weights['position'], np.nan)
+        coverage = np.where(disclosed > 0, covered / disclosed, np.nan)
+
+    result = pd.DataFrame({
+        '基金代码': weights['funds'],
+        '穿透估算涨幅': estimate,
+        '覆盖率': coverage,
+        '股票仓位': weights['position'],
+        '持仓报告期': weights['quarter'],
+        '估算时间': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    })
+    if fund_codes is not None:
+        result = result[result['基金代码'].isin([str(c) for c in fund_codes])]
+    return result.reset_index(drop=True)
+
+# --- Snapshot Store ---
+# data/estimates/snapshots/{day}/{time}_{source}.pkl: append-only, one file per recorded snapshot
+# data/estimates/daily/{day}.pkl: compacted day (last estimate per fund and source, with its error once known)
+# data/estimates/stats.pkl: running per-fund error statistics
+
+SNAPSHOTS_DIR = os.path.join(ESTIMATES_DIR, 'snapshots')
+DAILY_DIR = os.path.join(ESTIMATES_DIR, 'daily')
+STATS_PATH = os.path.join(ESTIMATES_DIR, 'stats.pkl')
+
+ESTIMATE_SOURCES = {'eastmoney': '天天基金估值', 'lookthrough': '穿透估算'}
+SNAPSHOT_COLUMNS = ['基金代码', '来源', '估值日期', '估算涨幅', '记录时间']
+DAILY_COLUMNS = SNAPSHOT_COLUMNS + ['日增长率', '误差', '已计入']
+STATS_COLUMNS = ['样本数', '误差和', '绝对误差和', '误差平方和', '方向一致数', '近期绝对误差', '最近日期']
+
+# A day keeps being re-joined while late NAVs may still arrive, and its compacted file is kept for the report
+FINALIZE_AFTER_DAYS = 10
+RETAIN_DAYS = 60
+# Weight of the latest day in 近期绝对误差 (exponentially weighted)
+RECENT_ERROR_ALPHA = 0.1
+
+def record_estimates(estimates: pd.DataFrame, source: str, value_date: str = None):
+    """
+    Appends one estimation snapshot to the store (never rewrites earlier ones).
+
+    Args:
+        estimates: Frame with 基金代码 and 估算涨幅 (% number or '1.23%' text).
+        source: Key of ESTIMATE_SOURCES.
+        value_date: NAV date the estimate is for (default: today).
+    """
+    if estimates is None or estimates.empty:
+        return
+    now = datetime.now()
+    value_date = value_date or now.strftime("%Y-%m-%d")
+    change = pd.to_numeric(estimates['估算涨幅'].astype(str).str.rstrip('%'), errors='coerce')
+    snapshot = pd.DataFrame({
+        '基金代码': estimates['基金代码'].astype(str).to_numpy(),
+        '来源': source,
+        '估值日期': value_date,
+        '估算涨幅': change.to_numpy(dtype=np.float64),
+        '记录时间': now.strftime("%Y-%m-%d %H:%M:%S"),
+    }).dropna(subset=['估算涨幅'])
+    if snapshot.empty:
+        return
+    file_path = os.path.join(SNAPSHOTS_DIR, value_date, f"{now.strftime('%H%M%S%f')}_{source}.pkl")
+    save_table_to_cache(snapshot.reset_index(drop=True), file_path)
+
+def record_estimate_snapshot(estimates: pd.DataFrame, trade_date: str = None):
+    """Appends a look-through estimate (estimate_fund_changes output) to the snapshot store."""
+    if estimates.empty:
+        return
+    record_estimates(estimates.rename(columns={'穿透估算涨幅': '估算涨幅'}), 'lookthrough', trade_date)
+
+def _read_snapshots(day: str) -> pd.DataFrame:
+    day_dir = os.path.join(SNAPSHOTS_DIR, day)
+    files = sorted(f for f in os.listdir(day_dir) if f.endswith('.pkl')) if os.path.isdir(day_dir) else []
+    frames = [load_table_from_cache(os.path.join(day_dir, f)) for f in files]
+    frames = [f for f in frames if f is not None and not f.empty]
+    if not frames:
+        return pd.DataFrame(columns=SNAPSHOT_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+def _list_days(directory: str, suffix: str = '') -> list[str]:
+    if not os.path.isdir(directory):
+        return []
+    return sorted(f[:len(f) - len(suffix)] if suffix else f for f in os.listdir(directory)
+                  if f.endswith(suffix) and not f.endswith('.tmp'))
+
+# --- Nightly Join ---
+
+def load_estimation_stats() -> pd.DataFrame:
+    """Running error statistics indexed by (基金代码, 来源)."""
+    empty = pd.DataFrame(columns=STATS_COLUMNS, index=pd.MultiIndex.from_tuples([], names=['基金代码', '来源']))
+    return load_table_from_cache(STATS_PATH, default=empty)
+
+def _fold_into_stats(stats: pd.DataFrame, errors: pd.DataFrame, day: str) -> pd.DataFrame:
+    """Adds one day's (基金代码, 来源, 估算涨幅, 日增长率, 误差) rows to the running statistics."""
+    err = errors['误差'].to_numpy(dtype=np.float64)
+    day_stats = pd.DataFrame({
+        '样本数': 1,
+        '误差和': err,
+        '绝对误差和': np.abs(err),
+        '误差平方和': err ** 2,
+        '方向一致数': (np.sign(errors['估算涨幅'].to_numpy()) == np.sign(errors['日增长率'].to_numpy())).astype(int),
+    }, index=pd.MultiIndex.from_frame(errors[['基金代码', '来源']]))
+    day_stats = day_stats[~day_stats.index.duplicated(keep='last')]
+
+    merged = stats.reindex(stats.index.union(day_stats.index))
+    summable = ['样本数', '误差和', '绝对误差和', '误差平方和', '方向一致数']
+    merged[summable] = merged[summable].astype(float).fillna(0).add(day_stats[summable].reindex(merged.index, fill_value=0))
+    recent = merged['近期绝对误差'].astype(float)
+    latest = day_stats['绝对误差和'].reindex(merged.index)
+    merged['近期绝对误差'] = np.where(latest.isna(), recent,
+                                 np.where(recent.isna(), latest, (1 - RECENT_ERROR_ALPHA) * recent + RECENT_ERROR_ALPHA * latest))
+    merged.loc[day_stats.index, '最近日期'] = day
+    return merged[STATS_COLUMNS]
+
+def update_estimation_accuracy() -> int:
+    """
+    Nightly job: compacts every past day's snapshots to the last estimate per fund
+    and source, joins them with the actual 日增长率 from the NAV cache, and folds
+    newly matched rows into the running per-fund statistics. Raw snapshots of
+    compacted days and daily files older than RETAIN_DAYS are deleted, so storage
+    stays bounded while the statistics keep the full history.
+
+    Returns: number of newly matched (fund, source, day) rows.
+    """
+    today = datetime.now().strftime("%Y-%m-%d")
+    oldest_open = (pd.Timestamp(today) - pd.Timedelta(days=FINALIZE_AFTER_DAYS)).strftime("%Y-%m-%d")
+    raw_days = [d for d in _list_days(SNAPSHOTS_DIR) if d < today]
+    open_days = sorted(set(raw_days) | {d for d in _list_days(DAILY_DIR, '.pkl') if d >= oldest_open})
+    if not open_days:
+        return 0
+
+    nav = load_nav_store()
+    nav = nav.loc[nav['净值日期'].isin(pd.to_datetime(open_days)), ['基金代码', '净值日期', '日增长率']]
+    stats = load_estimation_stats()
+    added = 0
+    for day in open_days:
+        daily_path = os.path.join(DAILY_DIR, f'{day}.pkl')
+        daily = load_table_from_cache(daily_path, default=pd.DataFrame(columns=DAILY_COLUMNS))
+        raw = _read_snapshots(day)
+        if not raw.empty:
+            # Later snapshots replace earlier ones; already-joined rows keep their flag
+            latest = raw.sort_values('记录时间').drop_duplicates(['基金代码', '来源'], keep='last')
+            kept = daily.set_index(['基金代码', '来源'])
+            latest = latest.set_index(['基金代码', '来源'])
+            counted = kept['已计入'].reindex(latest.index).fillna(False).astype(bool)
+            latest = latest[~counted]
+            daily = pd.concat([kept[~kept.index.isin(latest.index)], latest]).reset_index()
+            daily['已计入'] = daily['已计入'].fillna(False).astype(bool)
+
+        actual = nav.loc[nav['净值日期'] == pd.Timestamp(day), ['基金代码', '日增长率']].astype({'基金代码': str})
+        actual = actual.dropna().drop_duplicates('基金代码', keep='last').set_index('基金代码')['日增长率']
+        if not daily.empty:
+            daily = daily.astype({'估算涨幅': float, '日增长率': float})
+            fill = daily['日增长率'].isna() & daily['基金代码'].isin(actual.index)
+            daily.loc[fill, '日增长率'] = actual.reindex(daily.loc[fill, '基金代码']).to_numpy()
+            daily['误差'] = daily['估算涨幅'] - daily['日增长率']
+            new = daily[~daily['已计入'] & daily['误差'].notna()]
+            if not new.empty:
+                stats = _fold_into_stats(stats, new, day)
+                daily.loc[new.index, '已计入'] = True
+                added += len(new)
+            save_table_to_cache(daily[DAILY_COLUMNS].reset_index(drop=True), daily_path)
+        if not raw.empty:
+            shutil.rmtree(os.path.join(SNAPSHOTS_DIR, day), ignore_errors=True)
+
+    save_table_to_cache(stats, STATS_PATH)
+    # Bounded storage: the statistics already hold what old daily files contributed
+    cutoff = (pd.Timestamp(today) - pd.Timedelta(days=RETAIN_DAYS)).strftime("%Y-%m-%d")
+    for day in _list_days(DAILY_DIR, '.pkl'):
+        if day < cutoff:
+            os.remove(os.path.join(DAILY_DIR, f'{day}.pkl'))
+    print(f"Estimation accuracy updated: {added} new fund-days over {len(open_days)} open days.")
+    return added
+
+# --- Reports ---
+
+def get_estimation_accuracy(fund_codes: list[str] = None, min_samples: int = 1) -> pd.DataFrame:
+    """
+    Per-fund error statistics of each estimate source (errors in percentage points).
+    Columns: ['基金代码', '来源', '样本数', '平均误差', '平均绝对误差', '均方根误差', '方向一致率', '近期绝对误差', '最近日期']
+    """
+    stats = load_estimation_stats().reset_index()
+    if fund_codes is not None:
+        stats = stats[stats['基金代码'].isin([str(c) for c in fund_codes])]
+    stats = stats[stats['样本数'] >= min_samples]
+    n = stats['样本数'].astype(float)
+    result = pd.DataFrame({
+        '基金代码': stats['基金代码'],
+        '来源': stats['来源'].map(ESTIMATE_SOURCES).fillna(stats['来源']),
+        '样本数': stats['样本数'].astype(int),
+        '平均误差': stats['误差和'] / n,
+        '平均绝对误差': stats['绝对误差和'] / n,
+        '均方根误差': np.sqrt((stats['误差平方和'] / n).astype(float)),
+        '方向一致率': stats['方向一致数'] / n,
+        '近期绝对误差': stats['近期绝对误差'].astype(float),
+        '最近日期': stats['最近日期'],
+    })
+    return result.sort_values(['来源', '平均绝对误差']).reset_index(drop=True)
+
+def build_estimation_error_report(last_days: int = 20) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Daily accuracy of recorded estimates from the compacted store (run update_estimation_accuracy first).
+
+    Returns: (daily summary per source, per-fund errors of the latest evaluated day)
+        summary: ['日期', '来源', '基金数', '平均绝对误差', '均方根误差', '方向一致率']
+        detail:  ['基金代码', '来源', '估算涨幅', '日增长率', '误差']
+    """
+    summary_cols = ['日期', '来源', '基金数', '平均绝对误差', '均方根误差', '方向一致率']
+    summary, detail = [], pd.DataFrame()
+    for day in _list_days(DAILY_DIR, '.pkl')[-last_days:]:
+        daily = load_table_from_cache(os.path.join(DAILY_DIR, f'{day}.pkl'))
+        if daily is None:
+            continue
+        daily = daily.dropna(subset=['误差'])
+        if daily.empty:
+            continue
+        daily = daily.assign(来源=daily['来源'].map(ESTIMATE_SOURCES).fillna(daily['来源']))
+        for source, rows in daily.groupby('来源'):
+            summary.append({
+                '日期': day,
+                '来源': source,
+                '基金数': len(rows),
+                '平均绝对误差': rows['误差'].abs().mean(),
+                '均方根误差': float(np.sqrt((rows['误差'] ** 2).mean())),
+                '方向一致率': (np.sign(rows['估算涨幅']) == np.sign(rows['日增长率'])).mean(),
+            })
+        detail = daily[['基金代码', '来源', '估算涨幅', '日增长率', '误差']]
+    return pd.DataFrame(summary, columns=summary_cols), detail.reset_index(drop=True)
@@ -0,0 +1,173 @@
+import hashlib
+import os
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from src.data_manager import DATA_DIR, load_holdings_store, save_table_to_cache, load_table_from_cache
+from src.holdings_matrix import build_weight_matrix, get_store_quarters, quarter_signature
+from src.stocks.classification import load_stock_classification, get_classification_version, UNCLASSIFIED
+from src.utils import shift_quarter
+
+# One partition per quarter: data/exposure/{quarter}.pkl
+EXPOSURE_DIR = os.path.join(DATA_DIR, 'exposure')
+
+EXPOSURE_COLUMNS = ['基金代码', '报告期', '名称', '占净值比例', '占股票持仓比例']
+
+_EXPOSURE_MEMO = {}
+
+# --- Stock Classification Matrices ---
+
+def stock_industry_matrix(stock_codes: np.ndarray, classification: pd.DataFrame = None):
+    """One-hot stocks x industries CSR (stocks missing from the cache go to 未分类). Returns (matrix, industries)."""
+    if classification is None:
+        classification = load_stock_classification()
+    industry = classification['所属行业'].reindex(stock_codes).fillna('').replace('', UNCLASSIFIED)
+    ids, industries = pd.factorize(industry, sort=True)
+    matrix = sparse.csr_matrix((np.ones(len(ids), dtype=np.float32), (np.arange(len(ids)), ids)),
+                               shape=(len(stock_codes), len(industries)))
+    return matrix, np.asarray(industries, dtype=object)
+
+def stock_concept_matrix(stock_codes: np.ndarray, classification: pd.DataFrame = None):
+    """Binary stocks x concepts CSR from the ';'-joined 所属概念. Returns (matrix, concepts)."""
+    if classification is None:
+        classification = load_stock_classification()
+    concepts = classification['所属概念'].reindex(stock_codes).fillna('').astype(str).str.split(';')
+    exploded = concepts.explode()
+    exploded = exploded[exploded.str.len() > 0]
+    stock_pos = pd.Index(stock_codes).get_indexer(exploded.index)
+    ids, names = pd.factorize(exploded.to_numpy(), sort=True)
+    matrix = sparse.csr_matrix((np.ones(len(ids), dtype=np.float32), (stock_pos, ids)),
+                               shape=(len(stock_codes), len(names)))
+    matrix.data[:] = 1.0  # a stock listed twice under one concept still counts once
+    return matrix, np.asarray(names, dtype=object)
+
+def _classification_signature(stock_codes: np.ndarray, classification: pd.DataFrame) -> str:
+    """Hash of the classification of exactly these stocks, so unrelated cache updates do not invalidate."""
+    rows = classification.reindex(stock_codes)[['所属行业', '所属概念']].fillna('')
+    return hashlib.md5(pd.util.hash_pandas_object(rows, index=True).to_numpy().tobytes()).hexdigest()
+
+def _to_long(product: sparse.csr_matrix, funds: np.ndarray, names: np.ndarray, disclosed: np.ndarray, quarter: str) -> pd.DataFrame:
+    coo = product.tocoo()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        share = coo.data / disclosed[coo.row] * 100
+    return pd.DataFrame({
+        '基金代码': pd.Categorical(funds[coo.row]),
+        '报告期': quarter,
+        '名称': pd.Categorical(names[coo.col]),
+        '占净值比例': coo.data.astype(np.float32),
+        '占股票持仓比例': share.astype(np.float32),
+    })
+
+# --- Per-quarter Batch ---
+
+def build_quarter_exposure(quarter: str, holdings: pd.DataFrame = None, classification: pd.DataFrame = None) -> dict:
+    """
+    Industry and concept exposure of every fund in one quarter: the funds x stocks
+    weight matrix times the stocks x industry / concept matrices.
+    '占股票持仓比例' is relative to the fund's disclosed holdings, which makes
+    Q1/Q3 (top-10 only) and Q2/Q4 (full) reports comparable.
+
+    Returns: {'industry': long table, 'concept': long table} with EXPOSURE_COLUMNS.
+    """
+    if holdings is None:
+        holdings = load_holdings_store()
+    if classification is None:
+        classification = load_stock_classification()
+    matrix, funds, stocks = build_weight_matrix(holdings[holdings['报告期'] == quarter])
+    if matrix.shape[0] == 0:
+        empty = pd.DataFrame(columns=EXPOSURE_COLUMNS)
+        return {'industry': empty, 'concept': empty}
+
+    disclosed = np.asarray(matrix.sum(axis=1)).ravel()
+    industry_matrix, industries = stock_industry_matrix(stocks, classification)
+    concept_matrix, concepts = stock_concept_matrix(stocks, classification)
+    return {
+        'industry': _to_long((matrix @ industry_matrix).tocsr(), funds, industries, disclosed, quarter),
+        'concept': _to_long((matrix @ concept_matrix).tocsr(), funds, concepts, disclosed, quarter),
+    }
+
+def get_quarter_exposure(quarter: str, holdings: pd.DataFrame = None) -> dict:
+    """Cached build_quarter_exposure, rebuilt when the quarter's holdings or its stocks' classification change."""
+    if holdings is None:
+        holdings = load_holdings_store()
+    classification = load_stock_classification()
+    cls_version = get_classification_version()
+
+    # Same holdings store object and untouched classification file: nothing to check
+    memo = _EXPOSURE_MEMO.get(quarter)
+    if memo and memo['holdings'] is holdings and memo['cls_version'] == cls_version:
+        return memo['tables']
+
+    stocks = np.unique(holdings.loc[holdings['报告期'] == quarter, '股票代码'].astype(str).to_numpy())
+    signature = (quarter_signature(quarter, holdings), _classification_signature(stocks, classification))
+    if memo and memo['tables']['signature'] == signature:
+        tables = memo['tables']
+    else:
+        file_path = os.path.join(EXPOSURE_DIR, f'{quarter}.pkl')
+        tables = load_table_from_cache(file_path)
+        if not (tables and tables.get('signature') == signature):
+            print(f"Computing industry / concept exposure for {quarter}...")
+            tables = {'signature': signature, **build_quarter_exposure(quarter, holdings, classification)}
+            save_table_to_cache(tables, file_path)
+    _EXPOSURE_MEMO[quarter] = {'holdings': holdings, 'cls_version': cls_version, 'tables': tables}
+    return tables
+
+def refresh_exposure(quarters: list[str] = None) -> dict:
+    """Brings every (or the given) quarter's exposure partition up to date. Returns {quarter: tables}."""
+    holdings = load_holdings_store()
+    quarters = quarters or get_store_quarters(holdings)
+    return {q: get_quarter_exposure(q, holdings) for q in quarters}
+
+# --- Views ---
+
+def get_fund_exposure(fund_code: str, kind: str = 'industry', value: str = '占股票持仓比例') -> pd.DataFrame:
+    """Exposure history of one fund: quarters x names pivot of `value`."""
+    frames = []
+    for quarter, tables in refresh_exposure().items():
+        rows = tables[kind]
+        rows = rows[rows['基金代码'] == fund_code]
+        if not rows.empty:
+            frames.append(rows.astype({'基金代码': str, '名称': str}))
+    if not frames:
+        return pd.DataFrame()
+    rows = pd.concat(frames, ignore_index=True)
+    return rows.pivot_table(index='报告期', columns='名称', values=value, aggfunc='sum', fill_value=0).sort_index()
+
+def compute_style_drift(quarter: str, prev_quarter: str = None) -> pd.DataFrame:
+    """
+    Industry style drift of every fund between two quarters:
+    0.5 * sum |share_curr - share_prev| over industries (0 = same mix, 1 = no overlap).
+    Returns ['基金代码', '风格漂移', '主要行业', '主要行业占比'] for funds present in both quarters.
+    """
+    prev_quarter = prev_quarter or shift_quarter(quarter, -1)
+    curr = get_quarter_exposure(quarter)['industry'].astype({'基金代码': str, '名称': str})
+    prev = get_quarter_exposure(prev_quarter)['industry'].astype({'基金代码': str, '名称': str})
+    if curr.empty or prev.empty:
+        return pd.DataFrame(columns=['基金代码', '风格漂移', '主要行业', '主要行业占比'])
+
+    funds = np.intersect1d(curr['基金代码'].unique(), prev['基金代码'].unique())
+    names = pd.Index(np.union1d(curr['名称'].unique(), prev['名称'].unique()))
+    fund_index = pd.Index(funds)
+
+    def _matrix(rows):
+        rows = rows[rows['基金代码'].isin(funds)]
+        return sparse.csr_matrix((rows['占股票持仓比例'].to_numpy(dtype=np.float64) / 100,
+                                  (fund_index.get_indexer(rows['基金代码']), names.get_indexer(rows['名称']))),
+                                 shape=(len(funds), len(names)))
+
+    a, b = _matrix(curr), _matrix(prev)
+    drift = 0.5 * np.asarray(abs(a - b).sum(axis=1)).ravel()
+    top = np.asarray(a.argmax(axis=1)).ravel()
+    return pd.DataFrame({
+        '基金代码': funds,
+        '风格漂移': drift,
+        '主要行业': names.to_numpy()[top],
+        '主要行业占比': a.max(axis=1).toarray().ravel() * 100,
+    }).sort_values('风格漂移', ascending=False).reset_index(drop=True)
+
+def screen_by_exposure(quarter: str, name: str, min_share: float = 20.0, kind: str = 'industry') -> pd.DataFrame:
+    """Funds whose share of disclosed holdings in an industry / concept is at least `min_share` (%)."""
+    rows = get_quarter_exposure(quarter)[kind]
+    rows = rows[(rows['名称'] == name) & (rows['占股票持仓比例'] >= min_share)]
+    return rows.sort_values('占股票持仓比例', ascending=False).astype({'基金代码': str, '名称': str}).reset_index(drop=True)
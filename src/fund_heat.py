@@ -0,0 +1,108 @@
+import os
+import numpy as np
+import pandas as pd
+
+from src.data_manager import FUNDS_LIST_PATH, load_holdings_store
+from src.estimator import get_lookthrough_weights
+from src.stocks.stocks import get_spot_snapshot, query_spot_by_gain
+
+HEAT_COLUMNS = ['基金代码', '基金简称', '热度', '强势股占比', '龙虎榜占比', '命中个股数', '命中个股', '持仓报告期']
+
+# Weight of holdings on the LHB with a net buy (added to the strong-list weight)
+LHB_SIGNAL_WEIGHT = 0.5
+# Strong list taken from the live spot snapshot when no list is given
+HEAT_MIN_GAIN = 7.0
+TOP_HIT_STOCKS = 3
+
+# Last result, keyed by the input objects (a new list, LHB table, snapshot or holdings store recomputes)
+_HEAT_MEMO = {'inputs': None, 'min_gain': None, 'result': None}
+
+# --- Inputs ---
+
+def _fund_names() -> pd.Series:
+    if not os.path.exists(FUNDS_LIST_PATH):
+        return pd.Series(dtype=object)
+    try:
+        funds = pd.read_csv(FUNDS_LIST_PATH, dtype={'基金代码': str}, encoding='utf-8-sig')
+        return funds.drop_duplicates('基金代码').set_index('基金代码')['基金简称']
+    except Exception as e:
+        print(f"Failed to read fund names: {e}")
+        return pd.Series(dtype=object)
+
+def _stock_names(*frames) -> pd.Series:
+    names = [f[['代码', '名称']].astype(str) for f in frames if f is not None and not f.empty and {'代码', '名称'} <= set(f.columns)]
+    if not names:
+        return pd.Series(dtype=object)
+    return pd.concat(names).drop_duplicates('代码').set_index('代码')['名称']
+
+# --- Heat Score ---
+
+def compute_fund_heat(strong_df: pd.DataFrame, lhb_df: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Ranks funds by their latest disclosed exposure to the day's strong stocks.
+
+    Stock signals (strong list membership, LHB net buy) are two columns of one
+    dense stocks x 2 matrix; a single sparse product with the funds x stocks
+    占净值比例 matrix gives every fund's weight in each. '热度' is
+    强势股占比 + LHB_SIGNAL_WEIGHT * 龙虎榜占比 (% of NAV).
+
+    Returns: HEAT_COLUMNS, funds with a hit only, hottest first.
+    """
+    weights = get_lookthrough_weights()
+    matrix, stocks = weights['matrix'], weights['stocks']
+    if matrix.shape[0] == 0 or strong_df is None or strong_df.empty:
+        return pd.DataFrame(columns=HEAT_COLUMNS)
+
+    signals = np.zeros((len(stocks), 2), dtype=np.float32)
+    stock_pos = pd.Index(stocks)
+    strong_rows = stock_pos.get_indexer(strong_df['代码'].astype(str).unique())
+    signals[strong_rows[strong_rows >= 0], 0] = 1.0
+    if lhb_df is not None and not lhb_df.empty and '龙虎榜净买额' in lhb_df.columns:
+        bought = lhb_df.loc[pd.to_numeric(lhb_df['龙虎榜净买额'], errors='coerce') > 0, '代码'].astype(str).unique()
+        lhb_rows = stock_pos.get_indexer(bought)
+        signals[lhb_rows[lhb_rows >= 0], 1] = 1.0
+
+    exposure = matrix @ signals                                          # (funds, 2)
+    hit = signals.any(axis=1)
+    held = matrix[:, hit].tocsr()
+    hit_count = np.diff(held.indptr)
+    heat = exposure[:, 0] + LHB_SIGNAL_WEIGHT * exposure[:, 1]
+    funds = np.flatnonzero(hit_count > 0)
+    funds = funds[np.argsort(-heat[funds], kind='stable')]
+
+    # Largest hit holdings of the listed funds only
+    hit_stocks = stocks[hit]
+    names = _stock_names(strong_df, lhb_df).reindex(hit_stocks)
+    labels = np.where(names.isna(), hit_stocks, names.to_numpy(dtype=object))
+    top_hits = []
+    for i in funds:
+        row = slice(held.indptr[i], held.indptr[i + 1])
+        top = np.argsort(-held.data[row], kind='stable')[:TOP_HIT_STOCKS]
+        top_hits.append(', '.join(labels[held.indices[row][top]]))
+
+    fund_codes = weights['funds'][funds]
+    return pd.DataFrame({
+        '基金代码': fund_codes,
+        '基金简称': _fund_names().reindex(fund_codes).to_numpy(),
+        '热度': heat[funds],
+        '强势股占比': exposure[funds, 0],
+        '龙虎榜占比': exposure[funds, 1],
+        '命中个股数': hit_count[funds],
+        '命中个股': top_hits,
+        '持仓报告期': weights['quarter'][funds],
+    }, columns=HEAT_COLUMNS)
+
+def get_fund_heat(strong_df: pd.DataFrame = None, lhb_df: pd.DataFrame = None, min_gain: float = HEAT_MIN_GAIN) -> pd.DataFrame:
+    """
+    Cached compute_fund_heat. Without `strong_df` the strong list is the shared spot
+    snapshot's stocks up at least `min_gain`%, so the score follows each new snapshot.
+    """
+    live = strong_df is None
+    inputs = (get_spot_snapshot() if live else strong_df, lhb_df, load_holdings_store())
+    memo_inputs = _HEAT_MEMO['inputs']
+    if (memo_inputs is not None and all(a is b for a, b in zip(memo_inputs, inputs))
+            and _HEAT_MEMO['min_gain'] == (min_gain if live else None)):
+        return _HEAT_MEMO['result']
+    result = compute_fund_heat(query_spot_by_gain(min_gain) if live else strong_df, lhb_df)
+    _HEAT_MEMO.update({'inputs': inputs, 'min_gain': min_gain if live else None, 'result': result})
+    return result
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from src.data_manager import load_holdings_store
+
+# --- Funds x Stocks Weight Matrices ---
+
+def get_store_quarters(holdings: pd.DataFrame = None) -> list[str]:
+    """Sorted 'YYYYQn' labels present in the holdings store."""
+    if holdings is None:
+        holdings = load_holdings_store()
+    if holdings.empty:
+        return []
+    return sorted(holdings['报告期'].astype(str).unique().tolist())
+
+def build_weight_matrix(rows: pd.DataFrame, value_col: str = '占净值比例'):
+    """
+    Builds a sparse funds x stocks matrix from holdings-store rows.
+    Duplicate (fund, stock) rows are summed.
+
+    Returns: (csr_matrix float32, fund_codes ndarray, stock_codes ndarray)
+    """
+    if rows.empty:
+        return sparse.csr_matrix((0, 0), dtype=np.float32), np.array([], dtype=object), np.array([], dtype=object)
+
+    fund_ids, fund_codes = pd.factorize(rows['基金代码'].astype(str), sort=True)
+    stock_ids, stock_codes = pd.factorize(rows['股票代码'].astype(str), sort=True)
+    values = pd.to_numeric(rows[value_col], errors='coerce').fillna(0).to_numpy(dtype=np.float32)
+
+    matrix = sparse.coo_matrix(
+        (values, (fund_ids, stock_ids)),
+        shape=(len(fund_codes), len(stock_codes))
+    ).tocsr()
+    matrix.sum_duplicates()
+    return matrix, np.asarray(fund_codes, dtype=object), np.asarray(stock_codes, dtype=object)
+
+def get_quarter_weight_matrix(quarter: str, holdings: pd.DataFrame = None):
+    """Funds x stocks 占净值比例 matrix for one 'YYYYQn' quarter."""
+    if holdings is None:
+        holdings = load_holdings_store()
+    rows = holdings[holdings['报告期'] == quarter]
+    return build_weight_matrix(rows)
+
+def quarter_signature(quarter: str, holdings: pd.DataFrame = None) -> tuple:
+    """Cheap version key of a quarter's holdings (row count and weight sum), used to invalidate caches."""
+    if holdings is None:
+        holdings = load_holdings_store()
+    mask = (holdings['报告期'] == quarter).to_numpy()
+    return (int(mask.sum()), round(float(np.nansum(holdings['占净值比例'].to_numpy()[mask])), 4))
+
+def quarter_signatures(holdings: pd.DataFrame = None) -> dict:
+    """Signatures of every quarter in one group-by: {'2025Q1': (rows, weight_sum), ...}."""
+    if holdings is None:
+        holdings = load_holdings_store()
+    if holdings.empty:
+        return {}
+    stats = holdings.groupby('报告期', observed=True, sort=True)['占净值比例'].agg(['size', 'sum'])
+    return {str(q): (int(n), round(float(w), 4)) for q, n, w in zip(stats.index, stats['size'], stats['sum'])}
@@ -0,0 +1,229 @@
+import os
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from src.data_manager import save_table_to_cache, load_table_from_cache
+from src.lhb import explode_hot_money
+from src.lhb_store import LHB_DIR, get_stored_lhb_dates, load_lhb_partition
+from src.price_store import get_calendar_returns, get_price_store_version, MIN_WINDOW_COVERAGE
+
+# Department index over the whole LHB history, rebuilt when partitions or prices change
+DEPARTMENT_INDEX_PATH = os.path.join(LHB_DIR, 'department_index.pkl')
+
+# Bumped when the follow-through return rules change, so a cached index is rebuilt
+DEPARTMENT_INDEX_VERSION = 2
+
+FOLLOW_THROUGH_DAYS = (1, 3, 5)
+CO_OCCURRENCE_TOP_K = 20
+
+_INDEX_MEMO = {'signature': None, 'index': None}
+
+# --- Events ---
+
+def _history_signature() -> tuple:
+    """(kind, date, mtime) of every stored hot-money / detail partition."""
+    signature = []
+    for kind in ('detail', 'hot_money'):
+        for date_str in get_stored_lhb_dates(kind):
+            signature.append((kind, date_str, os.path.getmtime(os.path.join(LHB_DIR, kind, f'{date_str}.pkl'))))
+    return tuple(signature)
+
+def load_department_events() -> pd.DataFrame:
+    """
+    Every (department, date, stock) buy event in the LHB history.
+    The department's daily 净买入额 is split evenly over the stocks it bought
+    that day ('净买额' is therefore an allocation, the source has no per-stock split).
+    """
+    frames = []
+    for date_str in sorted(set(get_stored_lhb_dates('detail')) & set(get_stored_lhb_dates('hot_money'))):
+        pairs = explode_hot_money(load_lhb_partition('hot_money', date_str), load_lhb_partition('detail', date_str))
+        if pairs.empty:
+            continue
+        per_dept = pairs.groupby('营业部名称')['股票名称'].transform('size')
+        frames.append(pd.DataFrame({
+            '营业部名称': pairs['营业部名称'].astype(str),
+            '日期': date_str,
+            '代码': pairs['代码'].astype(str),
+            '股票名称': pairs['股票名称'].astype(str),
+            '净买额': pairs['净买入额'].to_numpy(dtype=np.float64) / per_dept.to_numpy(),
+        }))
+    if not frames:
+        return pd.DataFrame(columns=['营业部名称', '日期', '代码', '股票名称', '净买额'])
+    return pd.concat(frames, ignore_index=True).drop_duplicates(['营业部名称', '日期', '代码'])
+
+def compute_forward_returns(codes: np.ndarray, dates: np.ndarray, horizons=FOLLOW_THROUGH_DAYS) -> np.ndarray:
+    """
+    Compounded return of each (stock, YYYYMMDD date) event over the next h trading
+    days after the event day (trading calendar), from the local price store.
+    Same rules as price_store.compute_window_returns: NaN unless the store has rows on
+    at least MIN_WINDOW_COVERAGE of the h days including the last one, with every gap
+    a verified suspension.
+    Returns (n_events, len(horizons)).
+    """
+    result = np.full((len(codes), len(horizons)), np.nan)
+    if len(codes) == 0:
+        return result
+    event_days = pd.to_datetime(dates, format='%Y%m%d')
+    first_day = event_days.min()
+    pct, broken, panel_codes, days = get_calendar_returns(first_day, pd.Timestamp(datetime.now().date()), list(np.unique(codes)))
+    if pct.size == 0:
+        return result
+
+    # Running totals with a leading 0, so a total over days (p, p + h] is cum[p + h] - cum[p]
+    present = ~np.isnan(pct)
+    def _cum(values):
+        return np.hstack([np.zeros((len(panel_codes), 1)), np.cumsum(values, axis=1)])
+    growth_cum = _cum(np.log1p(np.where(present, pct, 0.0) / 100))
+    present_cum, broken_cum = _cum(present), _cum(broken)
+
+    rows = pd.Index(panel_codes).get_indexer(codes)
+    # Column of the event day in [first_day] + days (-1 if not a trading day)
+    start = pd.DatetimeIndex([first_day]).append(days).get_indexer(event_days)
+    for j, h in enumerate(horizons):
+        end = start + h
+        valid = (rows >= 0) & (start >= 0) & (end <= len(days))
+        r, s, e = rows[valid], start[valid], end[valid]
+        covered = ((present_cum[r, e] - present_cum[r, s]) >= MIN_WINDOW_COVERAGE * h) & present[r, e - 1] \
+            & (broken_cum[r, e] == broken_cum[r, s])
+        result[valid, j] = np.where(covered, np.expm1(growth_cum[r, e] - growth_cum[r, s]), np.nan)
+    return result
+
+# --- Index ---
+
+def build_department_index() -> dict:
+    """
+    Compact department <-> stock index over the LHB history.
+
+    Events are stored columnar and sorted by (department, date), with CSR offsets
+    per department plus a permutation sorted by (stock, date) for the reverse
+    direction. Per-department aggregates and top co-occurring departments
+    (same stock, same day) are precomputed, so profile queries are lookups.
+
+    Returns: {'departments', 'stocks', 'stock_names', 'dept', 'date', 'stock', 'net_buy',
+              'forward', 'dept_offsets', 'stock_order', 'stock_offsets',
+              'summary', 'co_neighbors', 'co_counts'}
+    """
+    events = load_department_events()
+    dept_ids, departments = pd.factorize(events['营业部名称'], sort=True)
+    stock_ids, stocks = pd.factorize(events['代码'], sort=True)
+    dates = events['日期'].astype(int).to_numpy(dtype=np.int32)
+
+    order = np.lexsort((dates, dept_ids))
+    dept_ids, stock_ids, dates = dept_ids[order], stock_ids[order], dates[order]
+    net_buy = events['净买额'].to_numpy(dtype=np.float64)[order]
+    stock_names = events.drop_duplicates('代码').set_index('代码')['股票名称'].reindex(stocks).to_numpy()
+    forward = compute_forward_returns(np.asarray(stocks, dtype=object)[stock_ids], dates.astype(str))
+
+    n_depts, n_stocks = len(departments), len(stocks)
+    dept_offsets = np.concatenate([[0], np.cumsum(np.bincount(dept_ids, minlength=n_depts))])
+    stock_order = np.lexsort((dates, stock_ids))
+    stock_offsets = np.concatenate([[0], np.cumsum(np.bincount(stock_ids, minlength=n_stocks))])
+
+    # Per-department aggregates in one group-by
+    frame = pd.DataFrame({'dept': dept_ids, 'date': dates, 'net': net_buy})
+    for j, h in enumerate(FOLLOW_THROUGH_DAYS):
+        frame[f'r{h}'] = forward[:, j]
+        frame[f'w{h}'] = np.where(np.isnan(forward[:, j]), np.nan, forward[:, j] > 0)
+    agg = frame.groupby('dept').agg(
+        上榜天数=('date', 'nunique'), 买入事件数=('date', 'size'), 累计净买额=('net', 'sum'), 最近上榜=('date', 'max'),
+        **{f'{h}日胜率': (f'w{h}', 'mean') for h in FOLLOW_THROUGH_DAYS},
+        **{f'{h}日平均收益': (f'r{h}', 'mean') for h in FOLLOW_THROUGH_DAYS},
+    ).reindex(np.arange(n_depts))
+    summary = agg.reset_index(drop=True)
+    summary.insert(0, '营业部名称', np.asarray(departments, dtype=object))
+
+    # Co-occurrence: departments x (date, stock) incidence times its transpose
+    key_ids = pd.factorize(dates.astype(np.int64) * n_stocks + stock_ids)[0] if len(dates) else np.array([], dtype=np.int64)
+    incidence = sparse.csr_matrix((np.ones(len(key_ids), dtype=np.float32), (dept_ids, key_ids)),
+                                  shape=(n_depts, int(key_ids.max()) + 1 if len(key_ids) else 0))
+    incidence.data[:] = 1.0
+    co = (incidence @ incidence.T).tocsr()
+    co.setdiag(0)
+    co.eliminate_zeros()
+    k = CO_OCCURRENCE_TOP_K
+    co_neighbors = np.full((n_depts, k), -1, dtype=np.int32)
+    co_counts = np.zeros((n_depts, k), dtype=np.int32)
+    for i in range(n_depts):
+        row = slice(co.indptr[i], co.indptr[i + 1])
+        cols, vals = co.indices[row], co.data[row]
+        if len(cols):
+            top = np.argsort(-vals, kind='stable')[:k]
+            co_neighbors[i, :len(top)] = cols[top]
+            co_counts[i, :len(top)] = vals[top]
+
+    return {
+        'departments': np.asarray(departments, dtype=object), 'stocks': np.asarray(stocks, dtype=object),
+        'stock_names': stock_names, 'dept': dept_ids.astype(np.int32), 'date': dates,
+        'stock': stock_ids.astype(np.int32), 'net_buy': net_buy.astype(np.float32), 'forward': forward.astype(np.float32),
+        'dept_offsets': dept_offsets, 'stock_order': stock_order, 'stock_offsets': stock_offsets,
+        'summary': summary, 'co_neighbors': co_neighbors, 'co_counts': co_counts,
+    }
+
+def get_department_index() -> dict:
+    """Cached build_department_index, rebuilt when LHB partitions or the price store change."""
+    signature = (DEPARTMENT_INDEX_VERSION, MIN_WINDOW_COVERAGE, _history_signature(), get_price_store_version())
+    if _INDEX_MEMO['signature'] == signature:
+        return _INDEX_MEMO['index']
+    cached = load_table_from_cache(DEPARTMENT_INDEX_PATH)
+    if not (cached and cached.get('signature') == signature):
+        print("Building hot-money department index...")
+        cached = {'signature': signature, **build_department_index()}
+        save_table_to_cache(cached, DEPARTMENT_INDEX_PATH)
+    _INDEX_MEMO.update({'signature': signature, 'index': cached})
+    return cached
+
+# --- Queries ---
+
+def rank_departments(min_events: int = 5, sort_by: str = '1日胜率', limit: int = 50) -> pd.DataFrame:
+    """Departments with at least `min_events` buys, best first by `sort_by`."""
+    summary = get_department_index()['summary']
+    summary = summary[summary['买入事件数'] >= min_events]
+    return summary.sort_values(sort_by, ascending=False).head(limit).reset_index(drop=True)
+
+def find_departments(keyword: str) -> list[str]:
+    departments = get_department_index()['departments']
+    return [d for d in departments if keyword in d]
+
+def get_department_profile(department: str, recent: int = 50) -> dict:
+    """
+    Profile of one department (exact name).
+    Returns: {'summary': aggregate row (Series), 'events': latest `recent` buys,
+              'co_departments': departments most often buying the same stock on the same day}
+    """
+    index = get_department_index()
+    pos = np.flatnonzero(index['departments'] == department)
+    if pos.size == 0:
+        return {}
+    i = pos[0]
+    rows = slice(index['dept_offsets'][i], index['dept_offsets'][i + 1])
+    stocks = index['stock'][rows]
+    events = pd.DataFrame({
+        '日期': index['date'][rows].astype(str),
+        '代码': index['stocks'][stocks],
+        '股票名称': index['stock_names'][stocks],
+        '净买额': index['net_buy'][rows],
+        **{f'{h}日收益': index['forward'][rows][:, j] for j, h in enumerate(FOLLOW_THROUGH_DAYS)},
+    }).iloc[::-1].head(recent).reset_index(drop=True)
+
+    valid = index['co_neighbors'][i] >= 0
+    co_departments = pd.DataFrame({
+        '营业部名称': index['departments'][index['co_neighbors'][i][valid]],
+        '同买次数': index['co_counts'][i][valid],
+    })
+    return {'summary': index['summary'].iloc[i], 'events': events, 'co_departments': co_departments}
+
+def get_stock_departments(stock: str) -> pd.DataFrame:
+    """Departments that bought a stock (代码 or 名称) across the history, most frequent first."""
+    index = get_department_index()
+    pos = np.flatnonzero((index['stocks'] == stock) | (index['stock_names'] == stock))
+    if pos.size == 0:
+        return pd.DataFrame(columns=['营业部名称', '买入次数', '累计净买额', '最近日期'])
+    j = pos[0]
+    rows = index['stock_order'][index['stock_offsets'][j]:index['stock_offsets'][j + 1]]
+    events = pd.DataFrame({'营业部名称': index['departments'][index['dept'][rows]],
+                           '净买额': index['net_buy'][rows], '日期': index['date'][rows]})
+    result = events.groupby('营业部名称').agg(买入次数=('日期', 'size'), 累计净买额=('净买额', 'sum'), 最近日期=('日期', 'max'))
+    result['最近日期'] = result['最近日期'].astype(str)
+    return result.sort_values(['买入次数', '累计净买额'], ascending=False).reset_index()
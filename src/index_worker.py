@@ -0,0 +1,164 @@
+import asyncio
+import os
+import threading
+import time
+import uuid
+
+from src.analyzer import HOLDINGS_DIR, load_reverse_index, save_reverse_index, scan_funds_async, update_reverse_index
+
+# Job states
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_PAUSED = 'paused'
+JOB_DONE = 'done'
+JOB_CANCELLED = 'cancelled'
+JOB_FAILED = 'failed'
+FINISHED_STATES = (JOB_DONE, JOB_CANCELLED, JOB_FAILED)
+
+class IndexWorker:
+    """
+    Background indexing service that owns the reverse index.
+
+    Runs in a daemon thread of the server process, so scanning is independent
+    of Streamlit reruns and continues when the browser tab is closed. Jobs are
+    processed FIFO in batches; the index is kept in memory and saved once per
+    batch. Pause / cancel take effect at the next batch boundary.
+    """
+
+    def __init__(self, batch_size: int = 200, concurrency: int = 20):
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self._jobs = {}
+        self._order = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._cache_data = None
+        self._thread = threading.Thread(target=self._run, name='index-worker', daemon=True)
+        self._thread.start()
+
+    # --- Job API ---
+
+    def submit(self, fund_codes: list[str], year: int) -> str:
+        """Queues fund codes for scanning. Returns a job id."""
+        job_id = uuid.uuid4().hex[:12]
+        codes = list(dict.fromkeys(fund_codes))
+        with self._lock:
+            self._jobs[job_id] = {
+                'id': job_id,
+                'year': year,
+                'pending': codes,
+                'total': len(codes),
+                'done': 0,
+                'status': JOB_QUEUED if codes else JOB_DONE,
+                'error': None,
+                'created': time.time(),
+                'finished': None if codes else time.time()
+            }
+            self._order.append(job_id)
+            self._wakeup.notify()
+        return job_id
+
+    def progress(self, job_id: str) -> dict:
+        """Snapshot of a job: {'status', 'done', 'total', 'error', ...}. None if unknown."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            snapshot = {k: v for k, v in job.items() if k != 'pending'}
+            snapshot['remaining'] = len(job['pending'])
+            return snapshot
+
+    def pause(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job and job['status'] in (JOB_QUEUED, JOB_RUNNING):
+                job['status'] = JOB_PAUSED
+
+    def resume(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job and job['status'] == JOB_PAUSED:
+                job['status'] = JOB_QUEUED
+                self._wakeup.notify()
+
+    def cancel(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job and job['status'] not in FINISHED_STATES:
+                job['status'] = JOB_CANCELLED
+                job['finished'] = time.time()
+
+    def active_jobs(self) -> list[dict]:
+        """Jobs that are queued, running or paused (e.g. to re-attach after a page reload)."""
+        with self._lock:
+            ids = [j for j in self._order if self._jobs[j]['status'] not in FINISHED_STATES]
+        return [self.progress(j) for j in ids]
+
+    # --- Worker Loop ---
+
+    def _next_batch(self):
+        """Picks the next batch from the oldest runnable job. Caller holds the lock."""
+        for job_id in self._order:
+            job = self._jobs[job_id]
+            if job['status'] in (JOB_QUEUED, JOB_RUNNING) and job['pending']:
+                job['status'] = JOB_RUNNING
+                batch = job['pending'][:self.batch_size]
+                job['pending'] = job['pending'][self.batch_size:]
+                return job, batch
+        return None, None
+
+    def _run(self):
+        while True:
+            with self._lock:
+                job, batch = self._next_batch()
+                while job is None:
+                    self._wakeup.wait()
+                    job, batch = self._next_batch()
+
+            try:
+                self._process_batch(job, batch)
+            except Exception as e:
+                print(f"Index worker batch failed: {e}")
+                with self._lock:
+                    job['status'] = JOB_FAILED
+                    job['error'] = str(e)
+                    job['finished'] = time.time()
+                continue
+
+            with self._lock:
+                if not job['pending'] and job['status'] not in FINISHED_STATES:
+                    job['status'] = JOB_DONE
+                    job['finished'] = time.time()
+
+    def _process_batch(self, job: dict, batch: list[str]):
+        # Reload if never loaded or if holdings changed outside this worker
+        holdings_mtime = os.path.getmtime(HOLDINGS_DIR) if os.path.exists(HOLDINGS_DIR) else 0
+        if self._cache_data is None or holdings_mtime > self._cache_data.get('timestamp', 0) + 2.0:
+            self._cache_data = load_reverse_index()
+        scanned = set(self._cache_data.get('scanned_funds', []))
+        todo = [c for c in batch if c not in scanned]
+
+        def on_progress():
+            with self._lock:
+                job['done'] += 1
+
+        with self._lock:
+            job['done'] += len(batch) - len(todo)
+
+        if not todo:
+            return
+        results = asyncio.run(scan_funds_async(todo, job['year'], HOLDINGS_DIR, on_progress, self.concurrency))
+        if update_reverse_index(self._cache_data, results):
+            save_reverse_index(self._cache_data)
+
+
+_WORKER = None
+_WORKER_LOCK = threading.Lock()
+
+def get_index_worker() -> IndexWorker:
+    """Process-wide IndexWorker, shared by all sessions."""
+    global _WORKER
+    with _WORKER_LOCK:
+        if _WORKER is None:
+            _WORKER = IndexWorker()
+        return _WORKER
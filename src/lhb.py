@@ -10,6 +10,8 @@ def get_daily_lhb(date_str: str = None) -> pd.DataFrame:
     
     Args:
         date_str: "YYYYMMDD". If None, defaults to today.
+
+    Returns None if the request (or enrichment) failed, an empty frame if the list has no rows.
     """
     if not date_str:
         date_str = datetime.now().strftime("%Y%m%d")
@@ -47,12 +49,13 @@ def get_daily_lhb(date_str: str = None) -> pd.DataFrame:
         return df
     except Exception as e:
         print(f"Error fetching LHB data: {e}")
-        return pd.DataFrame()
+        return None
 
 def get_lhb_hot_money(date_str: str = None) -> pd.DataFrame:
     """
     Fetch active business departments (Hot Money) on LHB.
-    Returns DataFrame with columns: ['营业部名称', '上榜次数', '累积买入额', '买入相关个股', '累积卖出额', '卖出相关个股', '净买入额']
+    Returns DataFrame with columns: ['营业部名称', '上榜次数', '累积买入额', '买入相关个股', '累积卖出额', '卖出相关个股', '净买入额'],
+    or None if the request failed.
     """
     if not date_str:
         date_str = datetime.now().strftime("%Y%m%d")
@@ -97,4 +100,59 @@ def get_lhb_hot_money(date_str: str = None) -> pd.DataFrame:
         return df
     except Exception as e:
         print(f"Error fetching Hot Money data: {e}")
-        return pd.DataFrame()
\ No newline at end of file
+        return None
+# --- Hot Money x Stocks ---
+
+# Separators used in '买入相关个股' (comma, full-width comma, whitespace)
+STOCK_LIST_SEPARATOR = r'[,，\s]+'
+
+def explode_hot_money(hm_df: pd.DataFrame, daily_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    One row per (department, bought stock), keeping only stocks on the same day's
+    LHB list (matched by name). Vectorized: str.split + explode + merge.
+    Returns: ['营业部名称', '净买入额', '股票名称', '代码'] + the stock's daily columns that exist
+    ('所属行业', '所属概念', '龙虎榜净买额', '涨跌幅', '收盘价').
+    """
+    stock_cols = [c for c in ['代码', '所属行业', '所属概念', '龙虎榜净买额', '涨跌幅', '收盘价'] if c in daily_df.columns]
+    if hm_df is None or hm_df.empty or daily_df is None or daily_df.empty or '代码' not in stock_cols:
+        return pd.DataFrame(columns=['营业部名称', '净买入额', '股票名称'] + stock_cols)
+
+    pairs = hm_df[['营业部名称']].assign(
+        净买入额=pd.to_numeric(hm_df['净买入额'], errors='coerce') if '净买入额' in hm_df.columns else 0.0,
+        股票名称=hm_df['买入相关个股'].fillna('').astype(str).str.split(STOCK_LIST_SEPARATOR, regex=True)
+    ).explode('股票名称')
+    pairs = pairs[pairs['股票名称'].str.len() > 0]
+    stocks = daily_df.drop_duplicates(subset=['名称']).rename(columns={'名称': '股票名称'})[['股票名称'] + stock_cols]
+    return pairs.merge(stocks, on='股票名称', how='inner').reset_index(drop=True)
+
+# Sector counts per LHB date, reused across reruns / drill-down clicks
+_SECTOR_MEMO = {}
+
+def get_hot_money_sector_counts(date_str: str, daily_df: pd.DataFrame, hm_df: pd.DataFrame) -> dict:
+    """
+    Industry / concept distribution of the stocks hot-money departments bought on
+    one date (each stock counted once). Memoized by date and input size.
+
+    Returns: {'stocks': unique bought stocks, 'industry': ['行业', '上榜个股数'],
+              'concept': ['概念', '上榜个股数'], 'concept_stocks': one row per (概念, stock)}
+    """
+    key = (date_str, len(daily_df) if daily_df is not None else 0, len(hm_df) if hm_df is not None else 0)
+    if key in _SECTOR_MEMO:
+        return _SECTOR_MEMO[key]
+
+    pairs = explode_hot_money(hm_df, daily_df)
+    stocks = pairs.drop_duplicates(subset=['股票名称']).rename(columns={'营业部名称': '营业部', '净买入额': '游资净买额'})
+    if '所属行业' not in stocks.columns:
+        stocks['所属行业'] = 'Unknown'
+    if '所属概念' not in stocks.columns:
+        stocks['所属概念'] = ''
+    stocks = stocks.rename(columns={'所属行业': '行业', '所属概念': '概念'}).reset_index(drop=True)
+
+    industry = stocks['行业'].value_counts().rename_axis('行业').reset_index(name='上榜个股数')
+    concept_stocks = stocks.assign(概念=stocks['概念'].fillna('').astype(str).str.split(';')).explode('概念')
+    concept_stocks = concept_stocks[concept_stocks['概念'].str.len() > 0].reset_index(drop=True)
+    concept = concept_stocks['概念'].value_counts().rename_axis('概念').reset_index(name='上榜个股数')
+
+    result = {'stocks': stocks, 'industry': industry, 'concept': concept, 'concept_stocks': concept_stocks}
+    _SECTOR_MEMO[key] = result
+    return result
@@ -0,0 +1,145 @@
+import os
+import concurrent.futures
+from datetime import datetime
+import pandas as pd
+
+from src.data_manager import DATA_DIR, save_table_to_cache, load_table_from_cache
+from src.lhb import get_daily_lhb, get_lhb_hot_money
+from src.trade_calendar import trading_days_between
+
+# Date-partitioned LHB history: data/lhb/{kind}/{YYYYMMDD}.pkl
+LHB_DIR = os.path.join(DATA_DIR, 'lhb')
+LHB_KINDS = ('detail', 'hot_money')
+
+# Partitions already read, keyed by (kind, date) -> (mtime, frame)
+_PARTITION_MEMO = {}
+
+# --- Partitions ---
+
+def _partition_path(kind: str, date_str: str) -> str:
+    return os.path.join(LHB_DIR, kind, f'{date_str}.pkl')
+
+def get_stored_lhb_dates(kind: str = 'detail') -> list[str]:
+    """Sorted YYYYMMDD dates with a stored partition (including days without LHB data)."""
+    kind_dir = os.path.join(LHB_DIR, kind)
+    if not os.path.isdir(kind_dir):
+        return []
+    return sorted(f[:-4] for f in os.listdir(kind_dir) if f.endswith('.pkl'))
+
+def load_lhb_partition(kind: str, date_str: str):
+    """Stored frame of one date, or None if the date was never ingested."""
+    file_path = _partition_path(kind, date_str)
+    if not os.path.exists(file_path):
+        return None
+    mtime = os.path.getmtime(file_path)
+    memo = _PARTITION_MEMO.get((kind, date_str))
+    if memo and memo[0] == mtime:
+        return memo[1]
+    df = load_table_from_cache(file_path)
+    _PARTITION_MEMO[(kind, date_str)] = (mtime, df)
+    return df
+
+# --- Ingestion ---
+
+LHB_FETCHERS = {'detail': get_daily_lhb, 'hot_money': get_lhb_hot_money}
+
+def stream_lhb_date(date_str: str, force: bool = False):
+    """
+    Yields (kind, frame) for 'detail' (enriched) and 'hot_money' as each is ready.
+    Stored dates are served from the store; otherwise both fetches run concurrently
+    (the detail's concept enrichment overlaps the hot-money download) and each table
+    is stored as soon as it arrives. A failed fetch is yielded as an empty frame and
+    not stored (retried by the next call / backfill); an empty list for today or a
+    future date is not stored either (the list is published after the close).
+    """
+    todo = []
+    for kind in LHB_KINDS:
+        stored = None if force else load_lhb_partition(kind, date_str)
+        if stored is not None:
+            yield kind, stored
+        else:
+            todo.append(kind)
+    if not todo:
+        return
+
+    is_past = date_str < datetime.now().strftime("%Y%m%d")
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(todo)) as executor:
+        futures = {executor.submit(LHB_FETCHERS[kind], date_str): kind for kind in todo}
+        for future in concurrent.futures.as_completed(futures):
+            kind = futures[future]
+            df = future.result()
+            if df is None:
+                yield kind, pd.DataFrame()
+                continue
+            if not df.empty or is_past:
+                save_table_to_cache(df, _partition_path(kind, date_str))
+            yield kind, df
+
+def ingest_lhb_date(date_str: str, force: bool = False) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Fetches one date's LHB detail (enriched) and hot-money tables into the store.
+    Idempotent: stored dates are returned as is unless `force`.
+
+    Returns: (detail, hot_money)
+    """
+    tables = dict(stream_lhb_date(date_str, force))
+    return tables['detail'], tables['hot_money']
+
+def backfill_lhb(start_date: str, end_date: str = None, force: bool = False, progress_callback=None) -> int:
+    """
+    Ingests every trading day in [start_date, end_date] (YYYYMMDD) that is not stored yet.
+    Days whose fetch failed stay unstored, so the next backfill retries them.
+    Returns the number of dates fetched.
+    """
+    end_date = end_date or datetime.now().strftime("%Y%m%d")
+    dates = [d.strftime("%Y%m%d") for d in trading_days_between(start_date, end_date)]
+    stored = set(get_stored_lhb_dates('detail')) & set(get_stored_lhb_dates('hot_money'))
+    todo = dates if force else [d for d in dates if d not in stored]
+    for i, date_str in enumerate(todo, 1):
+        ingest_lhb_date(date_str, force=force)
+        if progress_callback:
+            progress_callback(i, len(todo))
+    return len(todo)
+
+# --- Range Queries (local only) ---
+
+def _select_dates(kind: str, start_date: str = None, end_date: str = None, last_n: int = None) -> list[str]:
+    dates = get_stored_lhb_dates(kind)
+    if start_date:
+        dates = [d for d in dates if d >= start_date]
+    if end_date:
+        dates = [d for d in dates if d <= end_date]
+    if last_n:
+        # Days with a non-empty list only, so holidays do not use up the window
+        dates = [d for d in dates if not load_lhb_partition(kind, d).empty][-last_n:]
+    return dates
+
+def load_lhb_range(kind: str = 'detail', start_date: str = None, end_date: str = None, last_n: int = None) -> pd.DataFrame:
+    """
+    Stored rows of one table over a date range (YYYYMMDD bounds) or the last `last_n`
+    trading days with data, with a 日期 column. No network access.
+    """
+    frames = []
+    for date_str in _select_dates(kind, start_date, end_date, last_n):
+        df = load_lhb_partition(kind, date_str)
+        if df is not None and not df.empty:
+            frames.append(df.assign(日期=date_str))
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+def query_stock_lhb(stock: str, last_n: int = 20, end_date: str = None) -> pd.DataFrame:
+    """LHB appearances of one stock (代码 or 名称) over the last `last_n` stored trading days."""
+    df = load_lhb_range('detail', end_date=end_date, last_n=last_n)
+    if df.empty:
+        return df
+    mask = (df['代码'].astype(str) == stock) | (df['名称'].astype(str) == stock)
+    return df[mask].sort_values('日期', ascending=False).reset_index(drop=True)
+
+def query_department_lhb(department: str, last_n: int = 20, end_date: str = None) -> pd.DataFrame:
+    """Daily activity of departments whose name contains `department` over the last `last_n` stored trading days."""
+    df = load_lhb_range('hot_money', end_date=end_date, last_n=last_n)
+    if df.empty:
+        return df
+    mask = df['营业部名称'].astype(str).str.contains(department, regex=False)
+    return df[mask].sort_values('日期', ascending=False).reset_index(drop=True)
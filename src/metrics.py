@@ -0,0 +1,187 @@
+import os
+import warnings
+import numpy as np
+import pandas as pd
+
+from src.data_manager import DATA_DIR, load_nav_store, get_nav_store_version, save_table_to_cache, load_table_from_cache
+
+METRICS_DIR = os.path.join(DATA_DIR, 'metrics')
+
+TRADING_DAYS_PER_YEAR = 250
+RISK_FREE_RATE = 0.02  # Annualized, used by Sharpe / Sortino
+
+METRIC_COLUMNS = ['基金代码', '起始日期', '截止日期', '区间收益', '年化收益率', '年化波动率', '最大回撤',
+                  '回撤峰值日期', '回撤谷底日期', '夏普比率', '索提诺比率', '卡玛比率']
+
+# --- NAV Panels (funds x dates) ---
+
+def add_adjusted_nav(nav: pd.DataFrame) -> pd.DataFrame:
+    """
+    Adds '复权净值': cumulative growth from '日增长率' (dividend-adjusted), per fund.
+    Where 日增长率 is missing, the 单位净值 change is used instead.
+    Expects columns ['基金代码', '净值日期', '单位净值', '日增长率'] sorted by fund and date.
+    """
+    nav = nav.copy()
+    group = nav.groupby('基金代码', observed=True, sort=False)
+    unit_change = group['单位净值'].pct_change() * 100
+    growth = nav['日增长率'].where(nav['日增长率'].notna(), unit_change).fillna(0)
+    nav['复权净值'] = (1 + growth / 100).groupby(nav['基金代码'], observed=True, sort=False).cumprod()
+    return nav
+
+def build_nav_panel(nav: pd.DataFrame, value_col: str = '复权净值', start_date=None, end_date=None):
+    """
+    Pivots long NAV rows into an aligned funds x dates array (NaN where a fund has no value).
+    Returns: (values float64 (n_funds, n_dates), fund_codes ndarray, dates DatetimeIndex)
+    """
+    if value_col == '复权净值' and '复权净值' not in nav.columns:
+        nav = add_adjusted_nav(nav)
+    if start_date is not None:
+        nav = nav[nav['净值日期'] >= pd.to_datetime(start_date)]
+    if end_date is not None:
+        nav = nav[nav['净值日期'] <= pd.to_datetime(end_date)]
+    if nav.empty:
+        return np.empty((0, 0)), np.array([], dtype=object), pd.DatetimeIndex([])
+
+    fund_ids, fund_codes = pd.factorize(nav['基金代码'].astype(str), sort=True)
+    date_ids, dates = pd.factorize(nav['净值日期'], sort=True)
+    values = np.full((len(fund_codes), len(dates)), np.nan)
+    values[fund_ids, date_ids] = nav[value_col].to_numpy(dtype=float)
+    return values, np.asarray(fund_codes, dtype=object), pd.DatetimeIndex(dates)
+
+def forward_fill(values: np.ndarray) -> np.ndarray:
+    """Row-wise forward fill of NaNs along the date axis."""
+    n, T = values.shape
+    idx = np.where(~np.isnan(values), np.arange(T), 0)
+    np.maximum.accumulate(idx, axis=1, out=idx)
+    return values[np.arange(n)[:, None], idx]
+
+def panel_returns(values: np.ndarray) -> np.ndarray:
+    """
+    Daily returns on each fund's own observations: a value is compared with the
+    fund's previous available value, and is NaN where the fund has no value.
+    Shape (n_funds, n_dates - 1).
+    """
+    filled = forward_fill(values)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return values[:, 1:] / filled[:, :-1] - 1
+
+# --- Metrics ---
+
+def compute_metrics_panel(values: np.ndarray, dates: pd.DatetimeIndex, risk_free: float = RISK_FREE_RATE) -> dict:
+    """
+    Vectorized performance metrics for every row of a funds x dates NAV array.
+    Returns a dict of 1-D arrays (one entry per fund); returns are fractions.
+    """
+    n, T = values.shape
+    rows = np.arange(n)
+    cols = np.arange(T)
+    valid = ~np.isnan(values)
+    has_data = valid.any(axis=1)
+    first = np.where(has_data, valid.argmax(axis=1), 0)
+    last = np.where(has_data, T - 1 - valid[:, ::-1].argmax(axis=1), 0)
+    filled = forward_fill(values)
+    date_values = dates.values.astype('datetime64[D]')
+
+    with np.errstate(invalid='ignore', divide='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+
+        # Returns
+        total_return = filled[rows, last] / filled[rows, first] - 1
+        years = (date_values[last] - date_values[first]).astype(float) / 365.25
+        ann_return = np.where(years > 0, np.power(1 + total_return, 1 / np.where(years > 0, years, 1)) - 1, np.nan)
+
+        # Volatility / Sharpe / Sortino on daily returns
+        rets = panel_returns(values)
+        rf_daily = risk_free / TRADING_DAYS_PER_YEAR
+        mean_daily = np.nanmean(rets, axis=1)
+        volatility = np.nanstd(rets, axis=1, ddof=1) * np.sqrt(TRADING_DAYS_PER_YEAR)
+        excess = (mean_daily - rf_daily) * TRADING_DAYS_PER_YEAR
+        downside = np.sqrt(np.nanmean(np.minimum(rets - rf_daily, 0) ** 2, axis=1)) * np.sqrt(TRADING_DAYS_PER_YEAR)
+        sharpe = excess / volatility
+        sortino = excess / downside
+
+        # Max drawdown with peak / trough positions
+        running_max = np.fmax.accumulate(filled, axis=1)
+        drawdown = filled / running_max - 1
+        trough = np.where(np.isnan(drawdown), np.inf, drawdown).argmin(axis=1)
+        max_drawdown = drawdown[rows, trough]
+        peak_value = running_max[rows, trough]
+        at_peak = (filled == peak_value[:, None]) & (cols[None, :] <= trough[:, None])
+        peak = T - 1 - at_peak[:, ::-1].argmax(axis=1)
+        calmar = np.where(max_drawdown < 0, ann_return / np.abs(max_drawdown), np.nan)
+
+    no_dd = ~(max_drawdown < 0)
+    peak_dates = np.where(has_data & ~no_dd, date_values[peak], np.datetime64('NaT'))
+    trough_dates = np.where(has_data & ~no_dd, date_values[trough], np.datetime64('NaT'))
+    return {
+        '起始日期': np.where(has_data, date_values[first], np.datetime64('NaT')),
+        '截止日期': np.where(has_data, date_values[last], np.datetime64('NaT')),
+        '区间收益': total_return,
+        '年化收益率': ann_return,
+        '年化波动率': volatility,
+        '最大回撤': np.where(has_data, max_drawdown, np.nan),
+        '回撤峰值日期': peak_dates,
+        '回撤谷底日期': trough_dates,
+        '夏普比率': sharpe,
+        '索提诺比率': sortino,
+        '卡玛比率': calmar,
+    }
+
+def compute_fund_metrics(nav_df: pd.DataFrame, risk_free: float = RISK_FREE_RATE) -> dict:
+    """
+    Metrics for one fund's NAV frame (columns 净值日期, 单位净值[, 日增长率]).
+    Returns a dict keyed like METRIC_COLUMNS (without 基金代码); empty if no data.
+    """
+    if nav_df is None or nav_df.empty or '净值日期' not in nav_df.columns:
+        return {}
+    nav = nav_df.copy()
+    nav['基金代码'] = 'fund'
+    nav['净值日期'] = pd.to_datetime(nav['净值日期'])
+    if '日增长率' not in nav.columns:
+        nav['日增长率'] = np.nan
+    nav['单位净值'] = pd.to_numeric(nav['单位净值'], errors='coerce')
+    nav['日增长率'] = pd.to_numeric(nav['日增长率'], errors='coerce')
+    nav = nav.sort_values('净值日期')[['基金代码', '净值日期', '单位净值', '日增长率']]
+
+    values, _, dates = build_nav_panel(nav)
+    if values.size == 0:
+        return {}
+    metrics = compute_metrics_panel(values, dates, risk_free)
+    return {k: v[0] for k, v in metrics.items()}
+
+def compute_universe_metrics(lookback_days: int = None, chunk_size: int = 2000, risk_free: float = RISK_FREE_RATE) -> pd.DataFrame:
+    """
+    Metrics for every fund in the NAV store, computed in chunks of `chunk_size`
+    funds (each chunk one vectorized pass over its funds x dates array).
+    Cached per NAV store version, so it is recomputed only after NAV files change.
+
+    Args:
+        lookback_days: Only use the last N calendar days (relative to the latest NAV date).
+    """
+    version = get_nav_store_version()
+    file_path = os.path.join(METRICS_DIR, f"universe_{lookback_days or 'all'}.pkl")
+    cached = load_table_from_cache(file_path)
+    if cached and cached.get('version') == version and cached.get('risk_free') == risk_free:
+        return cached['table']
+
+    nav = load_nav_store()
+    if nav.empty:
+        return pd.DataFrame(columns=METRIC_COLUMNS)
+    nav = add_adjusted_nav(nav)
+    start_date = nav['净值日期'].max() - pd.Timedelta(days=lookback_days) if lookback_days else None
+
+    codes = nav['基金代码'].astype(str)
+    all_codes = np.sort(codes.unique())
+    frames = []
+    for i in range(0, len(all_codes), chunk_size):
+        chunk_codes = all_codes[i:i + chunk_size]
+        values, fund_codes, dates = build_nav_panel(nav[codes.isin(chunk_codes)], start_date=start_date)
+        if values.size == 0:
+            continue
+        metrics = compute_metrics_panel(values, dates, risk_free)
+        frames.append(pd.DataFrame({'基金代码': fund_codes, **metrics}))
+
+    table = pd.concat(frames, ignore_index=True)[METRIC_COLUMNS] if frames else pd.DataFrame(columns=METRIC_COLUMNS)
+    save_table_to_cache({'version': version, 'risk_free': risk_free, 'table': table}, file_path)
+    print(f"Computed metrics for {len(table)} funds.")
+    return table
@@ -0,0 +1,130 @@
+import os
+import pandas as pd
+
+from src.data_manager import DATA_DIR, load_holdings_store, save_table_to_cache, load_table_from_cache
+from src.holdings_matrix import quarter_signatures
+from src.utils import shift_quarter
+
+OWNERSHIP_PATH = os.path.join(DATA_DIR, 'ownership.pkl')
+
+OWNERSHIP_COLUMNS = ['报告期', '股票代码', '股票名称', '持有基金数', '持仓市值合计', '持股数合计', '平均占净值比例']
+DELTA_COLUMNS = ['持有基金数变化', '持仓市值变化', '持股数变化']
+# Bumped when the stored table's layout changes, so it is rebuilt from scratch
+OWNERSHIP_VERSION = 2
+
+# In-process copy of the aggregate table, reused while the stored signatures match
+_OWNERSHIP_MEMO = {'signatures': None, 'table': None}
+
+def build_quarter_ownership(rows: pd.DataFrame) -> pd.DataFrame:
+    """One group-by over a quarter's holdings rows -> one row per stock."""
+    if rows.empty:
+        return pd.DataFrame(columns=OWNERSHIP_COLUMNS)
+    rows = rows.astype({'股票代码': str, '股票名称': str, '基金代码': str, '报告期': str})
+    agg = rows.groupby(['报告期', '股票代码'], sort=False).agg(
+        股票名称=('股票名称', 'first'),
+        持有基金数=('基金代码', 'nunique'),
+        持仓市值合计=('持仓市值', 'sum'),
+        持股数合计=('持股数', 'sum'),
+        平均占净值比例=('占净值比例', 'mean')
+    ).reset_index()
+    return agg[OWNERSHIP_COLUMNS]
+
+def _add_quarter_deltas(table: pd.DataFrame, quarters: list[str]) -> pd.DataFrame:
+    """
+    Recomputes quarter-over-quarter deltas for the given quarters (vs their preceding quarter).
+    Stocks every fund exited get a row with zero ownership carrying the full negative delta.
+    """
+    value_columns = ['持有基金数', '持仓市值合计', '持股数合计']
+    for quarter in quarters:
+        # Exit rows are rebuilt below
+        table = table[~((table['报告期'] == quarter) & (table['持有基金数'] == 0))]
+        curr_mask = table['报告期'] == quarter
+        prev = table.loc[(table['报告期'] == shift_quarter(quarter, -1)) & (table['持有基金数'] > 0), ['股票代码', '股票名称'] + value_columns]
+        if prev.empty:
+            table.loc[curr_mask, DELTA_COLUMNS] = float('nan')
+            continue
+        prev = prev.set_index('股票代码')
+        codes = table.loc[curr_mask, '股票代码']
+        # Stocks absent last quarter had zero ownership
+        prev_values = prev[value_columns].reindex(codes).fillna(0).to_numpy()
+        curr = table.loc[curr_mask, value_columns].to_numpy()
+        table.loc[curr_mask, DELTA_COLUMNS] = curr - prev_values
+
+        exited = prev[~prev.index.isin(codes)]
+        if not exited.empty:
+            exits = pd.DataFrame({
+                '报告期': quarter,
+                '股票代码': exited.index,
+                '股票名称': exited['股票名称'].to_numpy(),
+                **{col: 0 for col in value_columns},
+                '平均占净值比例': 0.0,
+                **{delta: -exited[col].to_numpy() for delta, col in zip(DELTA_COLUMNS, value_columns)},
+            })
+            table = pd.concat([table, exits[table.columns]], ignore_index=True)
+    return table
+
+def refresh_ownership_aggregates() -> pd.DataFrame:
+    """
+    Returns the materialized (stock, quarter) ownership table, refreshing it
+    incrementally: only quarters whose holdings changed (or are new) are
+    re-aggregated, and deltas are recomputed only for those quarters and the
+    quarter after each of them. Stocks fully exited in a quarter have a row
+    with 持有基金数 0 there (see _add_quarter_deltas).
+
+    Columns: OWNERSHIP_COLUMNS + DELTA_COLUMNS
+    """
+    holdings = load_holdings_store()
+    signatures = quarter_signatures(holdings)
+    quarters = list(signatures.keys())
+    if _OWNERSHIP_MEMO['signatures'] == signatures:
+        return _OWNERSHIP_MEMO['table']
+
+    stored = load_table_from_cache(OWNERSHIP_PATH, default={'signatures': {}, 'table': pd.DataFrame(columns=OWNERSHIP_COLUMNS + DELTA_COLUMNS)})
+    old_signatures = stored['signatures'] if stored.get('version') == OWNERSHIP_VERSION else {}
+    changed = [q for q in quarters if old_signatures.get(q) != signatures[q]]
+    removed = [q for q in old_signatures if q not in signatures]
+
+    table = stored['table']
+    if changed or removed:
+        print(f"Refreshing ownership aggregates for: {changed + removed}")
+        table = table[~table['报告期'].isin(changed + removed)]
+        new_rows = build_quarter_ownership(holdings[holdings['报告期'].isin(changed)])
+        frames = [f for f in [table, new_rows] if not f.empty]
+        table = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=OWNERSHIP_COLUMNS + DELTA_COLUMNS)
+        for col in DELTA_COLUMNS:
+            if col not in table.columns:
+                table[col] = float('nan')
+
+        affected = sorted({q for q in changed} | {shift_quarter(q, 1) for q in changed + removed})
+        table = _add_quarter_deltas(table, [q for q in affected if q in signatures])
+        table = table.sort_values(['报告期', '持有基金数'], ascending=[True, False]).reset_index(drop=True)
+        save_table_to_cache({'version': OWNERSHIP_VERSION, 'signatures': signatures, 'table': table}, OWNERSHIP_PATH)
+
+    _OWNERSHIP_MEMO.update({'signatures': signatures, 'table': table})
+    return table
+
+# --- Ranking Views ---
+
+def rank_most_crowded(quarter: str, top_n: int = 50, by: str = '持有基金数') -> pd.DataFrame:
+    """Stocks held by the most funds (or largest 持仓市值合计) in a quarter."""
+    table = refresh_ownership_aggregates()
+    rows = table[(table['报告期'] == quarter) & (table['持有基金数'] > 0)]
+    return rows.nlargest(top_n, by).reset_index(drop=True)
+
+def rank_institutional_flows(quarter: str, top_n: int = 50, by: str = '持股数变化', inflow: bool = True) -> pd.DataFrame:
+    """
+    Biggest institutional inflows (or outflows) vs the previous quarter.
+    Ranks by share count change by default, which is not moved by price.
+    """
+    table = refresh_ownership_aggregates()
+    rows = table[(table['报告期'] == quarter) & table[by].notna()]
+    if inflow:
+        return rows.nlargest(top_n, by).reset_index(drop=True)
+    return rows.nsmallest(top_n, by).reset_index(drop=True)
+
+def get_stock_ownership(stock: str) -> pd.DataFrame:
+    """Ownership history of one stock (code or name) across quarters."""
+    table = refresh_ownership_aggregates()
+    stock = stock.strip()
+    rows = table[(table['股票代码'] == stock) | (table['股票名称'] == stock)]
+    return rows.sort_values('报告期', ascending=False).reset_index(drop=True)
@@ -0,0 +1,333 @@
+import os
+import concurrent.futures
+from datetime import datetime
+import akshare as ak
+import numpy as np
+import pandas as pd
+
+from src.data_manager import DATA_DIR, save_table_to_cache, load_table_from_cache
+from src.stocks.stocks import get_spot_snapshot
+from src.trade_calendar import previous_trading_day, trading_days_between
+
+PRICES_DIR = os.path.join(DATA_DIR, 'prices')
+PRICE_STORE_PATH = os.path.join(PRICES_DIR, 'store.pkl')
+# One partition per appended trading day, merged into the main store by compaction
+DAILY_PRICES_DIR = os.path.join(PRICES_DIR, 'daily')
+
+PRICE_COLUMNS = ['开盘', '收盘', '最高', '最低', '成交量', '成交额', '涨跌幅']
+COMPACT_AFTER_DAYS = 20
+
+# Market benchmark (中证全指), stored alongside the stocks under its own code
+BENCHMARK_INDEX = '000985'
+BENCHMARK_CODE = f'IDX{BENCHMARK_INDEX}'
+
+# A window return needs rows on at least this share of the window's trading days
+MIN_WINDOW_COVERAGE = 0.8
+# Tolerance (yuan, about one tick plus rounding) when checking that a row after a gap continues from the last stored close
+GAP_CLOSE_TOLERANCE = 0.011
+
+# Spot snapshot column -> store column
+SPOT_COLUMN_MAP = {'今开': '开盘', '最新价': '收盘', '最高': '最高', '最低': '最低', '成交量': '成交量', '成交额': '成交额', '涨跌幅': '涨跌幅'}
+
+# In-process copy: main store + pending daily partitions
+_PRICE_MEMO = {'main_mtime': None, 'daily_files': None, 'main': None, 'delta': None}
+
+# --- Packed Layout ---
+# Rows sorted by (代码, 日期); codes[i]'s rows are offsets[i]:offsets[i + 1],
+# so one code's range is a binary search inside its own segment.
+
+def _empty_store() -> dict:
+    return {
+        'codes': np.array([], dtype=object),
+        'offsets': np.zeros(1, dtype=np.int64),
+        'dates': np.array([], dtype='datetime64[D]'),
+        'columns': {col: np.array([], dtype=np.float64) for col in PRICE_COLUMNS},
+    }
+
+def _pack(df: pd.DataFrame) -> dict:
+    """Long rows ['代码', '日期'] + PRICE_COLUMNS -> packed columnar store (later duplicates win)."""
+    if df.empty:
+        return _empty_store()
+    df = df.drop_duplicates(subset=['代码', '日期'], keep='last').sort_values(['代码', '日期'], kind='stable')
+    codes, starts = np.unique(df['代码'].to_numpy(dtype=object), return_index=True)
+    return {
+        'codes': codes,
+        'offsets': np.append(starts, len(df)).astype(np.int64),
+        'dates': df['日期'].to_numpy(dtype='datetime64[D]'),
+        'columns': {col: pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=np.float64) for col in PRICE_COLUMNS},
+    }
+
+def _unpack(store: dict) -> pd.DataFrame:
+    counts = np.diff(store['offsets'])
+    df = pd.DataFrame({'代码': np.repeat(store['codes'], counts), '日期': store['dates']})
+    for col in PRICE_COLUMNS:
+        df[col] = store['columns'][col]
+    return df
+
+def _normalize_rows(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    df['代码'] = df['代码'].astype(str)
+    df['日期'] = pd.to_datetime(df['日期']).dt.normalize()
+    for col in PRICE_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors='coerce') if col in df.columns else np.nan
+    return df[['代码', '日期'] + PRICE_COLUMNS]
+
+# --- Load / Append / Compact ---
+
+def _daily_files() -> dict:
+    if not os.path.exists(DAILY_PRICES_DIR):
+        return {}
+    return {e.name: e.stat().st_mtime for e in os.scandir(DAILY_PRICES_DIR) if e.name.endswith('.pkl')}
+
+def load_price_store() -> tuple[dict, pd.DataFrame]:
+    """
+    Returns (main packed store, delta rows of not-yet-compacted days).
+    Reloaded only when the main file or the daily partitions change.
+    """
+    main_mtime = os.path.getmtime(PRICE_STORE_PATH) if os.path.exists(PRICE_STORE_PATH) else None
+    daily = _daily_files()
+    if _PRICE_MEMO['main'] is not None and _PRICE_MEMO['main_mtime'] == main_mtime and _PRICE_MEMO['daily_files'] == daily:
+        return _PRICE_MEMO['main'], _PRICE_MEMO['delta']
+
+    main = _PRICE_MEMO['main'] if _PRICE_MEMO['main_mtime'] == main_mtime and _PRICE_MEMO['main'] is not None \
+        else load_table_from_cache(PRICE_STORE_PATH, default=_empty_store())
+    frames = [load_table_from_cache(os.path.join(DAILY_PRICES_DIR, name)) for name in sorted(daily)]
+    frames = [f for f in frames if f is not None and not f.empty]
+    delta = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['代码', '日期'] + PRICE_COLUMNS)
+
+    _PRICE_MEMO.update({'main_mtime': main_mtime, 'daily_files': daily, 'main': main, 'delta': delta})
+    return main, delta
+
+def get_price_store_version() -> tuple:
+    """Changes whenever the main store or a daily partition changes."""
+    load_price_store()
+    return (_PRICE_MEMO['main_mtime'], tuple(sorted(_PRICE_MEMO['daily_files'].items())))
+
+def append_daily_prices(rows: pd.DataFrame, trade_date: str):
+    """
+    Writes one trading day's rows (['代码'] + PRICE_COLUMNS) as its own partition.
+    Re-appending the same day replaces it. Compacts once enough days are pending.
+    """
+    rows = rows.copy()
+    rows['日期'] = pd.Timestamp(trade_date)
+    rows = _normalize_rows(rows)
+    save_table_to_cache(rows.reset_index(drop=True), os.path.join(DAILY_PRICES_DIR, f"{pd.Timestamp(trade_date):%Y%m%d}.pkl"))
+    print(f"Appended {len(rows)} price rows for {trade_date}.")
+    if len(_daily_files()) >= COMPACT_AFTER_DAYS:
+        compact_price_store()
+
+def ingest_spot_snapshot(trade_date: str = None) -> int:
+    """
+    Appends today's OHLCV for all A-shares from one spot snapshot.
+    Meant to run after the close; returns the number of rows stored.
+    """
+    spot = get_spot_snapshot()
+    if spot.empty:
+        return 0
+    trade_date = trade_date or datetime.now().strftime("%Y-%m-%d")
+    rows = spot.rename(columns=SPOT_COLUMN_MAP)
+    rows = rows[rows['收盘'].notna()]
+    # The benchmark index's row goes into the same day partition
+    day = pd.Timestamp(trade_date).strftime("%Y%m%d")
+    index_row = _fetch_index_hist(BENCHMARK_INDEX, day, day)
+    if not index_row.empty:
+        rows = pd.concat([rows, index_row], ignore_index=True)
+    append_daily_prices(rows, trade_date)
+    return len(rows)
+
+def compact_price_store(extra_rows: pd.DataFrame = None):
+    """Merges pending daily partitions (and `extra_rows`) into the main store and removes the partitions."""
+    main, delta = load_price_store()
+    frames = [f for f in [_unpack(main), delta, extra_rows] if f is not None and not f.empty]
+    if not frames:
+        return
+    merged = _pack(_normalize_rows(pd.concat(frames, ignore_index=True)))
+    save_table_to_cache(merged, PRICE_STORE_PATH)
+    for name in _PRICE_MEMO['daily_files'] or {}:
+        try:
+            os.remove(os.path.join(DAILY_PRICES_DIR, name))
+        except OSError:
+            pass
+    print(f"Compacted price store: {len(merged['codes'])} codes, {len(merged['dates'])} rows.")
+
+def _fetch_hist(code: str, start_date: str, end_date: str) -> pd.DataFrame:
+    try:
+        df = ak.stock_zh_a_hist(symbol=code, period='daily', start_date=start_date, end_date=end_date, adjust='')
+    except Exception as e:
+        print(f"Error fetching price history for {code}: {e}")
+        return pd.DataFrame()
+    if df.empty:
+        return df
+    df['代码'] = code
+    return df
+
+def _fetch_index_hist(index_code: str, start_date: str, end_date: str) -> pd.DataFrame:
+    try:
+        df = ak.index_zh_a_hist(symbol=index_code, period='daily', start_date=start_date, end_date=end_date)
+    except Exception as e:
+        print(f"Error fetching index history for {index_code}: {e}")
+        return pd.DataFrame()
+    if df.empty:
+        return df
+    df['代码'] = f'IDX{index_code}'
+    return df
+
+def backfill_benchmark_history(start_date: str, end_date: str = None) -> int:
+    """Downloads the benchmark index's daily history (BENCHMARK_CODE) into the store. Returns rows added."""
+    end_date = end_date or datetime.now().strftime("%Y%m%d")
+    df = _fetch_index_hist(BENCHMARK_INDEX, start_date, end_date)
+    if df.empty:
+        return 0
+    rows = _normalize_rows(df)
+    compact_price_store(extra_rows=rows)
+    return len(rows)
+
+def backfill_price_history(codes: list[str], start_date: str, end_date: str = None, max_workers: int = 8, progress_callback=None) -> int:
+    """
+    Downloads daily history (ak.stock_zh_a_hist, unadjusted) for `codes` and merges
+    it into the store. Returns the number of rows added.
+    Dividend/split effects are handled through '涨跌幅', which is exchange-adjusted.
+    """
+    end_date = end_date or datetime.now().strftime("%Y%m%d")
+    frames = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_fetch_hist, code, start_date, end_date) for code in dict.fromkeys(codes)]
+        for i, future in enumerate(concurrent.futures.as_completed(futures), 1):
+            df = future.result()
+            if not df.empty:
+                frames.append(df)
+            if progress_callback:
+                progress_callback(i, len(futures))
+    if not frames:
+        return 0
+    rows = _normalize_rows(pd.concat(frames, ignore_index=True))
+    compact_price_store(extra_rows=rows)
+    return len(rows)
+
+# --- Queries ---
+
+def get_price_history(code: str, start_date=None, end_date=None) -> pd.DataFrame:
+    """Daily rows of one stock within [start_date, end_date], sorted by date."""
+    main, delta = load_price_store()
+    start = np.datetime64(pd.Timestamp(start_date).date()) if start_date is not None else None
+    end = np.datetime64(pd.Timestamp(end_date).date()) if end_date is not None else None
+
+    frames = []
+    i = np.searchsorted(main['codes'], code)
+    if i < len(main['codes']) and main['codes'][i] == code:
+        lo, hi = main['offsets'][i], main['offsets'][i + 1]
+        seg_dates = main['dates'][lo:hi]
+        a = lo + (np.searchsorted(seg_dates, start, 'left') if start is not None else 0)
+        b = lo + (np.searchsorted(seg_dates, end, 'right') if end is not None else hi - lo)
+        part = pd.DataFrame({'日期': pd.to_datetime(main['dates'][a:b])})
+        for col in PRICE_COLUMNS:
+            part[col] = main['columns'][col][a:b]
+        frames.append(part)
+    if not delta.empty:
+        part = delta[delta['代码'] == code]
+        if start is not None:
+            part = part[part['日期'] >= pd.Timestamp(start)]
+        if end is not None:
+            part = part[part['日期'] <= pd.Timestamp(end)]
+        frames.append(part[['日期'] + PRICE_COLUMNS])
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame(columns=['日期'] + PRICE_COLUMNS)
+    result = pd.concat(frames, ignore_index=True).drop_duplicates(subset=['日期'], keep='last')
+    return result.sort_values('日期').reset_index(drop=True)
+
+def get_price_panel(codes: list[str] = None, start_date=None, end_date=None, column: str = '涨跌幅'):
+    """
+    Aligned codes x dates array of one price column over a date range
+    (NaN where a stock has no row). codes=None means every stored stock.
+
+    Returns: (values float64 (n_codes, n_dates), codes ndarray, dates DatetimeIndex)
+    """
+    main, delta = load_price_store()
+    dates = main['dates']
+    keep = np.ones(len(dates), dtype=bool)
+    if start_date is not None:
+        keep &= dates >= np.datetime64(pd.Timestamp(start_date).date())
+    if end_date is not None:
+        keep &= dates <= np.datetime64(pd.Timestamp(end_date).date())
+    row_codes = np.repeat(main['codes'], np.diff(main['offsets']))
+    if codes is not None:
+        keep &= np.isin(row_codes, np.asarray(codes, dtype=object))
+    rows = pd.DataFrame({'代码': row_codes[keep], '日期': pd.to_datetime(dates[keep]), column: main['columns'][column][keep]})
+
+    if not delta.empty:
+        part = delta
+        if codes is not None:
+            part = part[part['代码'].isin(codes)]
+        if start_date is not None:
+            part = part[part['日期'] >= pd.Timestamp(start_date)]
+        if end_date is not None:
+            part = part[part['日期'] <= pd.Timestamp(end_date)]
+        rows = pd.concat([rows, part[['代码', '日期', column]]], ignore_index=True).drop_duplicates(subset=['代码', '日期'], keep='last')
+
+    if rows.empty:
+        return np.empty((0, 0)), np.array([], dtype=object), pd.DatetimeIndex([])
+    code_ids, panel_codes = pd.factorize(rows['代码'], sort=True)
+    date_ids, panel_dates = pd.factorize(rows['日期'], sort=True)
+    values = np.full((len(panel_codes), len(panel_dates)), np.nan)
+    values[code_ids, date_ids] = rows[column].to_numpy(dtype=np.float64)
+    return values, np.asarray(panel_codes, dtype=object), pd.DatetimeIndex(panel_dates)
+
+def get_calendar_returns(start_date, end_date, codes: list[str] = None):
+    """
+    涨跌幅 of each stock on every trading day in (start_date, end_date], aligned to the
+    trading calendar (NaN where the store has no row).
+
+    A row after missing days is a verified suspension only if it continues from the
+    last stored close (涨跌幅 is against the stock's own previous close); otherwise a
+    move is missing from the store and the day is flagged in `broken`.
+
+    Returns: (pct, broken, codes, days), pct / broken shaped (codes, days)
+    """
+    days = trading_days_between(pd.Timestamp(start_date) + pd.Timedelta(days=1), end_date)
+    empty = (np.empty((0, len(days))), np.empty((0, len(days)), dtype=bool), np.array([], dtype=object), days)
+    if len(days) == 0:
+        return empty
+    base_day = pd.Timestamp(previous_trading_day(start_date, inclusive=True))
+    pct, panel_codes, panel_dates = get_price_panel(codes, base_day, end_date, column='涨跌幅')
+    if pct.size == 0:
+        return empty
+    close, _, _ = get_price_panel(codes, base_day, end_date, column='收盘')
+
+    # Align to the calendar: column 0 is the base day (last close before the window)
+    cols = panel_dates.get_indexer(pd.DatetimeIndex([base_day]).append(days))
+    def _align(values):
+        out = np.full((len(panel_codes), len(cols)), np.nan)
+        out[:, cols >= 0] = values[:, cols[cols >= 0]]
+        return out
+    pct, close = _align(pct)[:, 1:], _align(close)
+
+    present = ~np.isnan(pct)
+    last_close = pd.DataFrame(close).ffill(axis=1).to_numpy()[:, :-1]
+    after_gap = present & np.isnan(close[:, :-1])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        implied_prev = close[:, 1:] / (1 + pct / 100)
+        continuous = np.abs(implied_prev - last_close) <= GAP_CLOSE_TOLERANCE + 1e-4 * last_close
+    return pct, after_gap & ~continuous, panel_codes, days
+
+def compute_window_returns(start_date, end_date, codes: list[str] = None, min_coverage: float = MIN_WINDOW_COVERAGE) -> pd.Series:
+    """
+    Compounded return of each stock over trading days in (start_date, end_date],
+    from the exchange-adjusted 涨跌幅 (so splits / dividends do not show as losses).
+
+    A stock's return is NaN unless the store has its rows on at least `min_coverage`
+    of the window's trading days (trading calendar) including the last one, and
+    every gap is a verified suspension (get_calendar_returns).
+    """
+    pct, broken, panel_codes, _ = get_calendar_returns(start_date, end_date, codes)
+    if pct.size == 0:
+        return pd.Series(dtype=float)
+    present = ~np.isnan(pct)
+    valid = (present.mean(axis=1) >= min_coverage) & present[:, -1] & ~broken.any(axis=1)
+    growth = np.prod(1 + np.where(present, pct, 0.0) / 100, axis=1) - 1
+    return pd.Series(np.where(valid, growth, np.nan), index=panel_codes)
+
+def compute_benchmark_return(start_date, end_date) -> float:
+    """Benchmark index return over (start_date, end_date]; NaN if the store does not cover the window."""
+    returns = compute_window_returns(start_date, end_date, [BENCHMARK_CODE])
+    return float(returns.get(BENCHMARK_CODE, np.nan))
@@ -0,0 +1,180 @@
+import math
+import os
+from collections import deque
+import pandas as pd
+
+from src.data_manager import DATA_DIR, NAV_DIR, load_fund_nav_from_cache, save_table_to_cache, load_table_from_cache
+
+# Persisted per fund next to the NAV cache: data/nav_rolling/{code}.pkl
+ROLLING_DIR = os.path.join(DATA_DIR, 'nav_rolling')
+
+# Windows in trading days
+ROLLING_WINDOWS = {'1M': 21, '3M': 63, '1Y': 250}
+TRADING_DAYS_PER_YEAR = 250
+
+# Running sums are re-summed from the window every N rows to cancel float drift
+RESYNC_EVERY = 1000
+
+# In-process copy per fund: {code: (nav_mtime, {'state', 'table'})}
+_ROLLING_MEMO = {}
+
+def rolling_columns(windows: dict = ROLLING_WINDOWS) -> list[str]:
+    cols = ['净值日期', '复权净值', '回撤']
+    for key in windows:
+        cols += [f'收益_{key}', f'波动率_{key}', f'回撤_{key}']
+    return cols
+
+class RollingState:
+    """
+    Streaming state for rolling NAV analytics, updated in O(1) amortized per row:
+    - returns over a window: ring buffer of the last adjusted NAVs
+    - volatility: running sum / sum of squares of the window's daily returns
+    - window drawdown: monotonic deque of (position, NAV) holding the window max
+    Adjusted NAV compounds 日增长率 (dividend-adjusted), or 单位净值 changes when missing.
+    """
+
+    def __init__(self, windows: dict = ROLLING_WINDOWS):
+        self.windows = dict(windows)
+        self.count = 0
+        self.first_date = None
+        self.last_date = None
+        self.last_unit = float('nan')
+        self.adj_nav = 1.0
+        self.peak = float('-inf')
+        self.navs = deque(maxlen=max(self.windows.values()) + 1)
+        self.rets = {key: deque() for key in self.windows}
+        self.sums = {key: [0.0, 0.0] for key in self.windows}
+        self.max_queues = {key: deque() for key in self.windows}
+
+    def push(self, date, unit_nav: float, growth: float) -> dict:
+        """Appends one NAV row and returns its rolling metrics."""
+        i = self.count
+        if i == 0:
+            ret = None
+            adj = 1.0
+        else:
+            if not math.isnan(growth):
+                ret = growth / 100
+            elif not math.isnan(unit_nav) and not math.isnan(self.last_unit) and self.last_unit != 0:
+                ret = unit_nav / self.last_unit - 1
+            else:
+                ret = 0.0
+            adj = self.adj_nav * (1 + ret)
+
+        self.navs.append(adj)
+        self.peak = max(self.peak, adj)
+        row = {'净值日期': date, '复权净值': adj, '回撤': adj / self.peak - 1}
+
+        for key, w in self.windows.items():
+            # Return over the last w rows
+            row[f'收益_{key}'] = adj / self.navs[-1 - w] - 1 if len(self.navs) > w else float('nan')
+
+            # Volatility of the last w daily returns
+            vol = float('nan')
+            if ret is not None:
+                q, s = self.rets[key], self.sums[key]
+                q.append(ret)
+                s[0] += ret
+                s[1] += ret * ret
+                if len(q) > w:
+                    old = q.popleft()
+                    s[0] -= old
+                    s[1] -= old * old
+                if i % RESYNC_EVERY == 0:
+                    s[0] = math.fsum(q)
+                    s[1] = math.fsum(x * x for x in q)
+                if len(q) == w and w > 1:
+                    var = (s[1] - s[0] * s[0] / w) / (w - 1)
+                    vol = math.sqrt(max(var, 0.0) * TRADING_DAYS_PER_YEAR)
+            row[f'波动率_{key}'] = vol
+
+            # Drawdown from the max of the last w + 1 rows
+            mq = self.max_queues[key]
+            while mq and mq[-1][1] <= adj:
+                mq.pop()
+            mq.append((i, adj))
+            if mq[0][0] < i - w:
+                mq.popleft()
+            row[f'回撤_{key}'] = adj / mq[0][1] - 1 if i >= w else float('nan')
+
+        if i == 0:
+            self.first_date = date
+        self.count += 1
+        self.last_date = date
+        self.adj_nav = adj
+        if not math.isnan(unit_nav):
+            self.last_unit = unit_nav
+        return row
+
+def _normalize_nav(nav_df: pd.DataFrame) -> pd.DataFrame:
+    nav = pd.DataFrame({
+        '净值日期': pd.to_datetime(nav_df['净值日期'], errors='coerce'),
+        '单位净值': pd.to_numeric(nav_df['单位净值'], errors='coerce'),
+        '日增长率': pd.to_numeric(nav_df['日增长率'], errors='coerce') if '日增长率' in nav_df.columns else float('nan'),
+    })
+    nav = nav.dropna(subset=['净值日期']).drop_duplicates(subset=['净值日期'], keep='last')
+    return nav.sort_values('净值日期').reset_index(drop=True)
+
+def _is_prefix_of(state: RollingState, nav: pd.DataFrame) -> bool:
+    """True if the rows the state has consumed are still the head of `nav` (nothing rewritten)."""
+    if state.count == 0 or state.count > len(nav):
+        return False
+    head_last = nav.iloc[state.count - 1]
+    return (nav['净值日期'].iloc[0] == state.first_date
+            and head_last['净值日期'] == state.last_date
+            and (math.isnan(state.last_unit) or head_last['单位净值'] == state.last_unit))
+
+def get_rolling_analytics(fund_code: str, nav_df: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Rolling 1M/3M/1Y return, volatility and drawdown for a fund, one row per NAV date.
+
+    The streaming state is persisted with the output, so when the NAV cache
+    gains rows only the new tail is pushed through it. A full rebuild happens
+    only if earlier NAV rows were rewritten.
+
+    Args:
+        nav_df: NAV rows to use instead of data/nav/{code}.csv (not persisted).
+    """
+    if nav_df is not None:
+        nav = _normalize_nav(nav_df) if not nav_df.empty else pd.DataFrame()
+        state = RollingState()
+        rows = [state.push(d, u, g) for d, u, g in zip(nav.get('净值日期', []), nav.get('单位净值', []), nav.get('日增长率', []))]
+        return pd.DataFrame(rows, columns=rolling_columns())
+
+    nav_path = os.path.join(NAV_DIR, f'{fund_code}.csv')
+    if not os.path.exists(nav_path):
+        return pd.DataFrame(columns=rolling_columns())
+    mtime = os.path.getmtime(nav_path)
+    memo = _ROLLING_MEMO.get(fund_code)
+    if memo and memo[0] == mtime:
+        return memo[1]['table']
+
+    file_path = os.path.join(ROLLING_DIR, f'{fund_code}.pkl')
+    stored = memo[1] if memo else load_table_from_cache(file_path)
+    raw = load_fund_nav_from_cache(fund_code)
+    nav = _normalize_nav(raw) if not raw.empty and '净值日期' in raw.columns else pd.DataFrame(columns=['净值日期', '单位净值', '日增长率'])
+
+    if stored and _is_prefix_of(stored['state'], nav):
+        state, table = stored['state'], stored['table']
+        tail = nav.iloc[state.count:]
+    else:
+        state, table = RollingState(), pd.DataFrame(columns=rolling_columns())
+        tail = nav
+
+    if not tail.empty:
+        rows = [state.push(d, u, g) for d, u, g in zip(tail['净值日期'], tail['单位净值'], tail['日增长率'])]
+        new_rows = pd.DataFrame(rows, columns=rolling_columns())
+        table = pd.concat([table, new_rows], ignore_index=True) if not table.empty else new_rows
+        save_table_to_cache({'state': state, 'table': table}, file_path)
+
+    _ROLLING_MEMO[fund_code] = (mtime, {'state': state, 'table': table})
+    return table
+
+def get_latest_rolling(fund_codes: list[str]) -> pd.DataFrame:
+    """Latest rolling metrics per fund (one row each), e.g. for rankings."""
+    rows = []
+    for code in fund_codes:
+        table = get_rolling_analytics(code)
+        if not table.empty:
+            rows.append({'基金代码': code, **table.iloc[-1].to_dict()})
+    return pd.DataFrame(rows, columns=['基金代码'] + rolling_columns())
@@ -118,5 +118,60 @@ def run_smart_update():
     else:
         print("Cache is up-to-date (Latest online quarter matches local). No update needed.")
 
+def run_daily_price_update():
+    """
+    Appends today's A-share OHLCV to the local price store (after the close on trading days).
+    """
+    from src.price_store import ingest_spot_snapshot
+    from src.trade_calendar import is_trading_day
+
+    now = datetime.now()
+    if not is_trading_day(now) or now.hour < 15:
+        print("Market not closed yet (or not a trading day). Skipping daily price update.")
+        return
+    count = ingest_spot_snapshot(now.strftime("%Y-%m-%d"))
+    print(f"Daily price update complete: {count} stocks.")
+
+def run_daily_lhb_update():
+    """
+    Stores today's LHB detail and hot-money tables (published in the evening on trading days).
+    """
+    from src.lhb_store import ingest_lhb_date
+    from src.trade_calendar import is_trading_day
+
+    now = datetime.now()
+    if not is_trading_day(now) or now.hour < 18:
+        print("LHB not published yet (or not a trading day). Skipping daily LHB update.")
+        return
+    detail, _ = ingest_lhb_date(now.strftime("%Y%m%d"), force=True)
+    print(f"Daily LHB update complete: {len(detail)} rows.")
+
+def run_daily_limit_up_update(days: int = 10):
+    """
+    Stores the last trading days' limit-up / failed pools and advances the ladder.
+    """
+    from src.stocks.limit_up import backfill_limit_up_pools, update_limit_up_ladder
+    from src.trade_calendar import trading_days_between
+
+    recent = trading_days_between(datetime.now() - pd.Timedelta(days=days * 2), datetime.now())[-days:]
+    if len(recent) == 0:
+        return
+    fetched = backfill_limit_up_pools(recent[0].strftime("%Y%m%d"))
+    state = update_limit_up_ladder()
+    print(f"Daily limit-up update complete: {fetched} new days, ladder through {state['last_date']}.")
+
+def run_nightly_estimation_update():
+    """
+    Joins recorded fund estimates with the NAV cache and updates per-fund error statistics.
+    """
+    from src.estimator import update_estimation_accuracy
+
+    added = update_estimation_accuracy()
+    print(f"Nightly estimation update complete: {added} fund-days evaluated.")
+
 if __name__ == "__main__":
     run_smart_update()
+    run_daily_price_update()
+    run_daily_lhb_update()
+    run_daily_limit_up_update()
+    run_nightly_estimation_update()
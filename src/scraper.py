@@ -1,11 +1,13 @@
+import os
 import akshare as ak
 import pandas as pd
 from datetime import datetime, timedelta
 
 from src.data_manager import load_fund_nav_from_cache, save_fund_nav_to_cache, \
                                  load_fund_holdings_from_cache, save_fund_holdings_to_cache, \
-                                 update_fund_status, get_nav_last_date
+                                 update_fund_status, get_nav_last_date, NAV_DIR
 from src.source_manager import get_active_source, update_source_status
+from src.trade_calendar import expected_nav_date
 
 def fetch_fund_info(fund_code: str) -> pd.DataFrame:
     """
@@ -80,14 +82,16 @@ def fetch_fund_nav(fund_code: str, start_date: str = "20200101", end_date: str =
     
     if last_cached_date_str:
         last_cached = pd.to_datetime(last_cached_date_str)
-        target_end = pd.to_datetime(end_date)
         
-        # If cache covers up to the target end date (or very close, e.g. within 3 days for weekends)
-        # We consider it fresh.
-        # Trading data stops on Friday. If today is Sunday, last data is Friday (2 days ago).
-        days_diff = (target_end - last_cached).days
-        if days_diff <= 3: 
+        # Fresh when the cache reaches the latest NAV that can exist for end_date
+        # (trading calendar: weekends / holidays are skipped, today's NAV is published in the evening)
+        if last_cached.date() >= expected_nav_date(end_date):
             is_fresh = True
+        else:
+            # Already refetched today (QDII funds publishing T+1/T+2, suspended / liquidated funds)
+            cache_path = os.path.join(NAV_DIR, f'{fund_code}.csv')
+            if os.path.exists(cache_path) and datetime.fromtimestamp(os.path.getmtime(cache_path)).date() == datetime.now().date():
+                is_fresh = True
     
     # 1. Try Cache if fresh
     if is_fresh:
@@ -234,6 +238,14 @@ def fetch_fund_estimation_batch(fund_codes: list[str] = None) -> pd.DataFrame:
         
         # Ensure Code is string
         df['基金代码'] = df['基金代码'].astype(str)
+
+        # Keep every snapshot (all funds) for the estimation accuracy tracker
+        try:
+            from src.estimator import record_estimates
+            value_date = est_time if len(est_time) == 10 and est_time[:4].isdigit() else None
+            record_estimates(df, 'eastmoney', value_date)
+        except Exception as e:
+            print(f"Failed to record estimation snapshot: {e}")
         
         # Filter
         if fund_codes:
@@ -0,0 +1,214 @@
+import os
+import numpy as np
+import pandas as pd
+
+from src.data_manager import DATA_DIR, FUNDS_LIST_PATH, load_holdings_store, get_nav_store_version, save_table_to_cache, load_table_from_cache
+from src.holdings_matrix import quarter_signatures
+from src.metrics import compute_universe_metrics
+
+SCREENER_PATH = os.path.join(DATA_DIR, 'screener.pkl')
+
+TOP_HOLDINGS_N = 5
+
+# Numeric columns of the screener table
+NUMERIC_COLUMNS = ['年化收益率', '近1年收益', '年化波动率', '最大回撤', '夏普比率', '卡玛比率', '披露仓位', '前十大集中度', '估算规模(亿)']
+# Dictionary-encoded columns (int codes + categories)
+CATEGORY_COLUMNS = ['基金类型', '最新报告期']
+TEXT_COLUMNS = ['基金代码', '基金简称', '前五大重仓']
+SCREENER_COLUMNS = ['基金代码', '基金简称', '基金类型', '最新报告期', '前五大重仓'] + NUMERIC_COLUMNS
+
+# Predicate evaluation order: cheap integer/float compares first, string matching last
+_OP_COST = {'==': 0, '!=': 0, 'in': 0, '>': 1, '>=': 1, '<': 1, '<=': 1, 'between': 1, 'contains': 2}
+
+# In-process copy of the columnar table
+_SCREENER_MEMO = {'key': None, 'table': None}
+
+# --- Build ---
+
+def _holdings_summary(holdings: pd.DataFrame) -> pd.DataFrame:
+    """Per fund, from its latest quarter: top holdings, equity ratio, concentration, estimated size."""
+    if holdings.empty:
+        return pd.DataFrame(columns=['基金代码', '最新报告期', '前五大重仓', '披露仓位', '前十大集中度', '估算规模(亿)'])
+
+    rows = holdings[['基金代码', '报告期', '股票名称', '占净值比例', '持仓市值']]
+    quarter = rows['报告期'].astype(str)
+    latest = quarter.groupby(rows['基金代码'], observed=True).transform('max')
+    rows = rows[(quarter == latest).to_numpy()].assign(最新报告期=latest[quarter == latest].to_numpy())
+    rows = rows.sort_values(['基金代码', '占净值比例'], ascending=[True, False])
+
+    group = rows.groupby('基金代码', observed=True, sort=False)
+    rank = group.cumcount()
+    summary = group.agg(
+        最新报告期=('最新报告期', 'first'),
+        披露仓位=('占净值比例', 'sum'),
+        持仓市值合计=('持仓市值', 'sum'),
+    )
+    summary['前十大集中度'] = rows[rank.to_numpy() < 10].groupby('基金代码', observed=True)['占净值比例'].sum()
+    summary['前五大重仓'] = rows[rank.to_numpy() < TOP_HOLDINGS_N].groupby('基金代码', observed=True)['股票名称'].agg(lambda s: '、'.join(s.astype(str)))
+    # Net assets ~ equity market value / equity ratio (持仓市值 in 万元 -> 亿元)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        summary['估算规模(亿)'] = np.where(summary['披露仓位'] > 0, summary['持仓市值合计'] / summary['披露仓位'] * 100 / 1e4, np.nan)
+    summary = summary.reset_index()
+    summary['基金代码'] = summary['基金代码'].astype(str)
+    return summary.drop(columns=['持仓市值合计'])
+
+def build_screener_table() -> dict:
+    """
+    Joins the fund list, NAV metrics and the latest-quarter holdings summary
+    into a columnar table: {'n', 'columns': {name: ndarray}, 'categories': {name: ndarray}}.
+    Category columns hold int32 codes (-1 = missing) into 'categories'.
+    """
+    funds = pd.read_csv(FUNDS_LIST_PATH, dtype={'基金代码': str}, encoding='utf-8-sig') if os.path.exists(FUNDS_LIST_PATH) else pd.DataFrame(columns=['基金代码', '基金简称', '基金类型'])
+    funds = funds.drop_duplicates('基金代码')[['基金代码', '基金简称', '基金类型']]
+
+    metrics = compute_universe_metrics()[['基金代码', '年化收益率', '年化波动率', '最大回撤', '夏普比率', '卡玛比率']]
+    last_year = compute_universe_metrics(lookback_days=365)[['基金代码', '区间收益']].rename(columns={'区间收益': '近1年收益'})
+    summary = _holdings_summary(load_holdings_store())
+
+    df = funds.merge(metrics, on='基金代码', how='left').merge(last_year, on='基金代码', how='left').merge(summary, on='基金代码', how='left')
+
+    columns, categories = {}, {}
+    for col in TEXT_COLUMNS:
+        columns[col] = df[col].fillna('').astype(str).to_numpy(dtype=object)
+    for col in NUMERIC_COLUMNS:
+        columns[col] = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=np.float64)
+    for col in CATEGORY_COLUMNS:
+        codes, cats = pd.factorize(df[col], sort=True)
+        columns[col] = codes.astype(np.int32)
+        categories[col] = np.asarray(cats, dtype=object)
+    return {'n': len(df), 'columns': columns, 'categories': categories}
+
+def _screener_key() -> tuple:
+    funds_mtime = os.path.getmtime(FUNDS_LIST_PATH) if os.path.exists(FUNDS_LIST_PATH) else 0
+    return (funds_mtime, get_nav_store_version(), tuple(sorted(quarter_signatures().items())))
+
+def get_screener_table(refresh: bool = False) -> dict:
+    """
+    Returns the columnar screener table. The in-process copy is reused as-is
+    unless `refresh` is set, which re-checks the fund list / NAV / holdings
+    versions and rebuilds only if one of them changed.
+    """
+    if _SCREENER_MEMO['table'] is not None and not refresh:
+        return _SCREENER_MEMO['table']
+
+    key = _screener_key()
+    if _SCREENER_MEMO['key'] == key:
+        return _SCREENER_MEMO['table']
+    stored = load_table_from_cache(SCREENER_PATH)
+    if stored and stored.get('key') == key:
+        table = stored['table']
+    else:
+        print("Building screener table...")
+        table = build_screener_table()
+        save_table_to_cache({'key': key, 'table': table}, SCREENER_PATH)
+    _SCREENER_MEMO.update({'key': key, 'table': table})
+    return table
+
+# --- Query ---
+
+def _predicate_mask(table: dict, column: str, op: str, value, rows: np.ndarray) -> np.ndarray:
+    """Evaluates one predicate on the surviving row ids only. Returns a bool mask over `rows`."""
+    data = table['columns'][column]
+    if column in table['categories']:
+        # Compare integer codes instead of strings; categories are sorted, so ranges map to code ranges
+        cats = table['categories'][column]
+        codes = data[rows]
+        if op == 'contains':
+            wanted = np.flatnonzero(pd.Series(cats, dtype=object).astype(str).str.contains(str(value), regex=False).to_numpy())
+        elif op in ('==', '!=', 'in'):
+            values = set(value) if op == 'in' else {value}
+            wanted = np.array([i for i, c in enumerate(cats) if c in values], dtype=np.int32)
+        else:
+            lo, hi = 0, len(cats)
+            if op == 'between':
+                lo, hi = np.searchsorted(cats, value[0], 'left'), np.searchsorted(cats, value[1], 'right')
+            elif op in ('>', '>='):
+                lo = np.searchsorted(cats, value, 'right' if op == '>' else 'left')
+            else:
+                hi = np.searchsorted(cats, value, 'left' if op == '<' else 'right')
+            return (codes >= lo) & (codes < hi)
+        hit = np.isin(codes, wanted)
+        return ~hit if op == '!=' else hit
+
+    col = data[rows]
+    if op == 'contains':
+        return pd.Series(col, dtype=object).str.contains(str(value), regex=False).to_numpy(dtype=bool)
+    if op == 'in':
+        return np.isin(col, list(value))
+    if op == 'between':
+        low, high = value
+        return (col >= low) & (col <= high)
+    if op == '==':
+        return col == value
+    if op == '!=':
+        return col != value
+    if op == '>':
+        return col > value
+    if op == '>=':
+        return col >= value
+    if op == '<':
+        return col < value
+    if op == '<=':
+        return col <= value
+    raise ValueError(f"Unsupported operator: {op}")
+
+def screen_funds(filters: list[tuple] = None, sort_by: str = None, ascending: bool = False,
+                 offset: int = 0, limit: int = 20, columns: list[str] = None, table: dict = None) -> tuple[pd.DataFrame, int]:
+    """
+    Multi-predicate fund screen over the columnar table.
+
+    Predicates are applied one after another to a shrinking selection vector
+    (cheapest first), each touching only its own column. Sorting uses a partial
+    top-k (argpartition) for the requested page, and only `columns` are
+    materialized for the returned rows.
+
+    Args:
+        filters: [(column, op, value)], op in ==, !=, >, >=, <, <=, between (value=(low, high)), in, contains.
+        sort_by: Column to sort by (NaN always last).
+        offset, limit: Page slice of the sorted result.
+        columns: Columns to return (default SCREENER_COLUMNS).
+
+    Returns: (page DataFrame, total matching rows)
+    """
+    if table is None:
+        table = get_screener_table()
+    columns = columns or SCREENER_COLUMNS
+    rows = np.arange(table['n'])
+
+    for column, op, value in sorted(filters or [], key=lambda f: _OP_COST.get(f[1], 3)):
+        if column not in table['columns'] or rows.size == 0:
+            continue
+        rows = rows[_predicate_mask(table, column, op, value, rows)]
+    total = int(rows.size)
+
+    end = min(offset + limit, total)
+    if sort_by and sort_by in table['columns'] and total > 0 and offset < total:
+        key = table['columns'][sort_by][rows]
+        if sort_by in table['categories']:
+            key = np.where(key < 0, np.nan, key).astype(np.float64)
+        elif key.dtype == object:
+            key = pd.factorize(key, sort=True)[0].astype(np.float64)
+        key = key if ascending else -key
+        key = np.where(np.isnan(key), np.inf, key)
+        if end < total:
+            head = np.argpartition(key, end - 1)[:end]
+        else:
+            head = np.arange(total)
+        page_rows = rows[head[np.argsort(key[head], kind='stable')]][offset:end]
+    else:
+        page_rows = rows[offset:end]
+
+    page = {}
+    for col in columns:
+        data = table['columns'][col][page_rows]
+        if col in table['categories']:
+            cats = table['categories'][col]
+            data = np.where(data >= 0, cats[np.clip(data, 0, None)] if len(cats) else None, None)
+        page[col] = data
+    return pd.DataFrame(page, columns=columns), total
+
+def get_screener_categories(column: str, table: dict = None) -> list[str]:
+    """Distinct values of a dictionary-encoded column (e.g. for a type dropdown)."""
+    if table is None:
+        table = get_screener_table()
+    return [str(c) for c in table['categories'].get(column, [])]
@@ -0,0 +1,113 @@
+import os
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from src.data_manager import DATA_DIR, load_holdings_store, save_table_to_cache, load_table_from_cache
+from src.holdings_matrix import get_quarter_weight_matrix, quarter_signature
+
+SIMILARITY_DIR = os.path.join(DATA_DIR, 'similarity')
+
+# Rows per block of the all-pairs product. A block's dense score slice is
+# block_size x n_funds float32 (~50 MB at 512 x 25k).
+DEFAULT_BLOCK_SIZE = 512
+DEFAULT_TOP_K = 20
+
+def compute_top_similar(matrix: sparse.csr_matrix, k: int = DEFAULT_TOP_K, block_size: int = DEFAULT_BLOCK_SIZE, progress_callback=None):
+    """
+    All-pairs cosine similarity of portfolio weight vectors, keeping only the
+    top-k neighbours per fund. Rows are L2-normalized once, then processed in
+    blocks of `block_size` with a sparse-sparse product X[block] @ X.T, so the
+    full n x n similarity matrix is never materialized.
+
+    Returns: (neighbors int32 (n, k), scores float32 (n, k)); missing slots are -1 / 0.
+    """
+    n = matrix.shape[0]
+    k = min(k, max(n - 1, 0))
+    neighbors = np.full((n, k), -1, dtype=np.int32)
+    scores = np.zeros((n, k), dtype=np.float32)
+    if n == 0 or k == 0:
+        return neighbors, scores
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    normalized = sparse.diags(1.0 / norms).dot(matrix).astype(np.float32).tocsr()
+    normalized_t = normalized.T.tocsc()
+
+    for start in range(0, n, block_size):
+        end = min(start + block_size, n)
+        block = (normalized[start:end] @ normalized_t).toarray()
+        # Exclude self-similarity
+        block[np.arange(end - start), np.arange(start, end)] = -1.0
+
+        top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(block, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        valid = top_scores > 0
+        neighbors[start:end] = np.where(valid, top, -1)
+        scores[start:end] = np.where(valid, top_scores, 0)
+
+        if progress_callback:
+            progress_callback(end, n)
+
+    return neighbors, scores
+
+def get_similarity_table(quarter: str, k: int = DEFAULT_TOP_K, holdings: pd.DataFrame = None) -> dict:
+    """
+    Returns the cached top-k similarity table for a 'YYYYQn' quarter, computing
+    it if missing or if the quarter's holdings changed since it was built.
+    Structure: {'signature': ..., 'k': 20, 'funds': ndarray, 'neighbors': ndarray, 'scores': ndarray}
+    """
+    if holdings is None:
+        holdings = load_holdings_store()
+    signature = quarter_signature(quarter, holdings)
+    file_path = os.path.join(SIMILARITY_DIR, f'{quarter}.pkl')
+
+    cached = load_table_from_cache(file_path)
+    if cached and cached.get('signature') == signature and cached.get('k', 0) >= k:
+        return cached
+
+    print(f"Computing fund similarity for {quarter}...")
+    matrix, fund_codes, _ = get_quarter_weight_matrix(quarter, holdings)
+    neighbors, scores = compute_top_similar(matrix, k=k)
+    table = {'signature': signature, 'k': k, 'funds': fund_codes, 'neighbors': neighbors, 'scores': scores}
+    save_table_to_cache(table, file_path)
+    print(f"Saved similarity table for {quarter}: {len(fund_codes)} funds.")
+    return table
+
+def get_similar_funds(fund_code: str, quarter: str, k: int = 10) -> pd.DataFrame:
+    """
+    Top-k funds whose portfolios resemble `fund_code` in the given quarter.
+    Columns: ['基金代码', '相似度', '共同持仓数', '重叠比例']
+    where 重叠比例 is the weighted overlap sum(min(w_a, w_b)) in % of NAV.
+    """
+    holdings = load_holdings_store()
+    table = get_similarity_table(quarter, k=max(k, DEFAULT_TOP_K), holdings=holdings)
+    funds = table['funds']
+    pos = np.searchsorted(funds, fund_code)
+    if pos >= len(funds) or funds[pos] != fund_code:
+        return pd.DataFrame()
+
+    ids = table['neighbors'][pos][:k]
+    sims = table['scores'][pos][:k]
+    keep = ids >= 0
+    ids, sims = ids[keep], sims[keep]
+    if ids.size == 0:
+        return pd.DataFrame()
+
+    # Overlap details only for the selected fund's neighbours
+    matrix, _, _ = get_quarter_weight_matrix(quarter, holdings)
+    base = matrix[pos]
+    others = matrix[ids]
+    shared = (others.multiply(base) > 0).sum(axis=1)
+    overlap = others.minimum(sparse.vstack([base] * len(ids))).sum(axis=1)
+
+    return pd.DataFrame({
+        '基金代码': funds[ids],
+        '相似度': np.round(sims, 4),
+        '共同持仓数': np.asarray(shared).ravel(),
+        '重叠比例': np.round(np.asarray(overlap).ravel(), 2)
+    })
@@ -0,0 +1,212 @@
+import collections
+import threading
+import time
+from datetime import datetime, time as dtime
+import numpy as np
+import pandas as pd
+
+from src.stocks.stocks import get_spot_snapshot
+from src.trade_calendar import is_trading_day
+
+# Columns kept per snapshot; a row is stored in a delta only when price or volume changed
+POLL_COLUMNS = ['最新价', '涨跌幅', '成交量', '成交额', '换手率']
+CHANGE_COLUMNS = ['最新价', '成交量']
+
+DEFAULT_INTERVAL_SECONDS = 30
+# Ring buffer capacity: a full session at the default interval
+DEFAULT_MAX_FRAMES = 500
+
+# Continuous trading sessions (the call auction from 09:15 has no trades)
+SESSIONS = ((dtime(9, 30), dtime(11, 30)), (dtime(13, 0), dtime(15, 0)))
+
+def is_market_open(now: datetime = None) -> bool:
+    now = now or datetime.now()
+    return is_trading_day(now) and any(start <= now.time() <= end for start, end in SESSIONS)
+
+class SpotPoller:
+    """
+    Background poller of the A-share spot table.
+
+    Every `interval` seconds during market hours it refreshes the shared spot
+    snapshot (get_spot_snapshot), so other features read the poller's data instead
+    of downloading their own. Each poll is stored as a delta: the positions and
+    POLL_COLUMNS values (float32) of the rows whose price or volume changed. Deltas
+    live in a ring buffer of `max_frames`; evicted deltas are folded into a base
+    frame, so any buffered time can be rebuilt as base + deltas up to it.
+    """
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL_SECONDS, max_frames: int = DEFAULT_MAX_FRAMES,
+                 market_hours_only: bool = True):
+        self.interval = interval
+        self.market_hours_only = market_hours_only
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._codes = []
+        self._code_pos = {}
+        self._names = []
+        self._base = np.empty((0, len(POLL_COLUMNS)), dtype=np.float32)
+        self._base_time = None
+        self._latest = self._base.copy()
+        self._frames = collections.deque(maxlen=max_frames)
+        self._last_error = None
+        self._thread = threading.Thread(target=self._run, name='spot-poller', daemon=True)
+        self._thread.start()
+
+    # --- Control ---
+
+    def stop(self):
+        self._stop.set()
+
+    def is_running(self) -> bool:
+        return self._thread.is_alive() and not self._stop.is_set()
+
+    def set_interval(self, interval: float):
+        self.interval = max(float(interval), 1.0)
+
+    def status(self) -> dict:
+        """{'running', 'interval', 'frames', 'stocks', 'first', 'last', 'bytes', 'error'}"""
+        with self._lock:
+            frames = list(self._frames)
+            return {
+                'running': self.is_running(),
+                'interval': self.interval,
+                'frames': len(frames),
+                'stocks': len(self._codes),
+                'first': self._base_time,
+                'last': frames[-1]['time'] if frames else self._base_time,
+                'bytes': self._base.nbytes + self._latest.nbytes + sum(f['rows'].nbytes + f['values'].nbytes for f in frames),
+                'error': self._last_error,
+            }
+
+    # --- Polling ---
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            if not self.market_hours_only or is_market_open():
+                try:
+                    self.poll()
+                    self._last_error = None
+                except Exception as e:
+                    print(f"Spot poller failed: {e}")
+                    self._last_error = str(e)
+            self._stop.wait(max(self.interval - (time.monotonic() - started), 1.0))
+
+    def poll(self) -> int:
+        """Takes one snapshot now. Returns the number of changed rows stored."""
+        # Fresh download, unless another caller refreshed the shared snapshot just now
+        spot = get_spot_snapshot(max_age=1.0)
+        if spot.empty:
+            return 0
+        now = datetime.now()
+        codes = spot['代码'].astype(str).to_numpy()
+        values = spot.reindex(columns=POLL_COLUMNS).apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float32)
+
+        with self._lock:
+            new = [c for c in dict.fromkeys(codes) if c not in self._code_pos]
+            if new:
+                names = spot.drop_duplicates('代码').set_index('代码')['名称'].reindex(new).astype(str).tolist() if '名称' in spot.columns else [''] * len(new)
+                self._code_pos.update({c: len(self._codes) + i for i, c in enumerate(new)})
+                self._codes.extend(new)
+                self._names.extend(names)
+                pad = np.full((len(new), len(POLL_COLUMNS)), np.nan, dtype=np.float32)
+                self._base = np.vstack([self._base, pad])
+                self._latest = np.vstack([self._latest, pad])
+            rows = np.fromiter((self._code_pos[c] for c in codes), dtype=np.int32, count=len(codes))
+
+            if self._base_time is None:
+                # First poll: the full table is the base frame
+                self._base[rows] = values
+                self._latest = self._base.copy()
+                self._base_time = now
+                return len(rows)
+
+            check = [POLL_COLUMNS.index(c) for c in CHANGE_COLUMNS]
+            old, cur = self._latest[rows][:, check], values[:, check]
+            changed = ((old != cur) & ~(np.isnan(old) & np.isnan(cur))).any(axis=1)
+            frame = {'time': now, 'rows': rows[changed], 'values': values[changed]}
+            if len(self._frames) == self._frames.maxlen:
+                evicted = self._frames.popleft()
+                self._base[evicted['rows']] = evicted['values']
+                self._base_time = evicted['time']
+            self._frames.append(frame)
+            self._latest[frame['rows']] = frame['values']
+            return int(changed.sum())
+
+    # --- Reads ---
+
+    def _frame_to_df(self, values: np.ndarray) -> pd.DataFrame:
+        df = pd.DataFrame(values, columns=POLL_COLUMNS)
+        df.insert(0, '名称', self._names)
+        df.insert(0, '代码', self._codes)
+        return df[df['最新价'].notna()].reset_index(drop=True)
+
+    def latest(self) -> pd.DataFrame:
+        """Latest polled values: ['代码', '名称'] + POLL_COLUMNS."""
+        with self._lock:
+            return self._frame_to_df(self._latest.copy())
+
+    def snapshot_at(self, at: datetime) -> pd.DataFrame:
+        """Values as of the last poll at or before `at` (the oldest buffered state if earlier)."""
+        with self._lock:
+            values = self._base.copy()
+            for frame in self._frames:
+                if frame['time'] > at:
+                    break
+                values[frame['rows']] = frame['values']
+            return self._frame_to_df(values)
+
+    def price_history(self, code: str) -> pd.Series:
+        """最新价 of one stock at every buffered poll where it changed (plus the base frame)."""
+        with self._lock:
+            pos = self._code_pos.get(str(code))
+            if pos is None or self._base_time is None:
+                return pd.Series(dtype=np.float32)
+            price = POLL_COLUMNS.index('最新价')
+            times, prices = [self._base_time], [self._base[pos, price]]
+            for frame in self._frames:
+                hit = np.flatnonzero(frame['rows'] == pos)
+                if hit.size:
+                    times.append(frame['time'])
+                    prices.append(frame['values'][hit[0], price])
+            return pd.Series(prices, index=pd.DatetimeIndex(times), name=str(code))
+
+    def price_speed(self, minutes: float = 5) -> pd.DataFrame:
+        """
+        Change of 最新价 (%) over the last `minutes`, from the buffered snapshots:
+        ['代码', '名称', '最新价', '涨跌幅', '涨速'], fastest first.
+        """
+        past = self.snapshot_at(datetime.now() - pd.Timedelta(minutes=minutes))
+        result = self.latest()
+        if result.empty or past.empty:
+            return pd.DataFrame(columns=['代码', '名称', '最新价', '涨跌幅', '涨速'])
+        before = past.set_index('代码')['最新价'].reindex(result['代码']).to_numpy(dtype=np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            result['涨速'] = np.where(before > 0, (result['最新价'].to_numpy(dtype=np.float64) / before - 1) * 100, np.nan)
+        return result[['代码', '名称', '最新价', '涨跌幅', '涨速']].sort_values('涨速', ascending=False).reset_index(drop=True)
+
+
+_POLLER = None
+_POLLER_LOCK = threading.Lock()
+
+def start_spot_poller(interval: float = None) -> SpotPoller:
+    """Starts the process-wide SpotPoller (or updates the interval of the running one)."""
+    global _POLLER
+    with _POLLER_LOCK:
+        if _POLLER is None or not _POLLER.is_running():
+            _POLLER = SpotPoller(interval or DEFAULT_INTERVAL_SECONDS)
+        elif interval:
+            _POLLER.set_interval(interval)
+        return _POLLER
+
+def get_spot_poller():
+    """The running process-wide SpotPoller shared by all sessions, or None. Never starts one."""
+    with _POLLER_LOCK:
+        return _POLLER if _POLLER is not None and _POLLER.is_running() else None
+
+def stop_spot_poller():
+    global _POLLER
+    with _POLLER_LOCK:
+        if _POLLER is not None:
+            _POLLER.stop()
+            _POLLER = None
@@ -0,0 +1,69 @@
+import os
+import threading
+import concurrent.futures
+from datetime import datetime, timedelta
+import pandas as pd
+
+from src.data_manager import DATA_DIR, save_table_to_cache, load_table_from_cache
+
+# Per-stock industry / concepts from EastMoney, shared by all features
+CLASSIFICATION_PATH = os.path.join(DATA_DIR, 'stock_classification.pkl')
+CLASSIFICATION_COLUMNS = ['所属行业', '所属概念', '更新时间']
+CLASSIFICATION_MAX_AGE_DAYS = 30
+UNCLASSIFIED = '未分类'
+
+_CLASSIFICATION_MEMO = {'mtime': None, 'table': None}
+# Enrichment may run from several sessions at once
+_SAVE_LOCK = threading.Lock()
+
+def load_stock_classification() -> pd.DataFrame:
+    """Classification cache indexed by 代码: ['所属行业', '所属概念' (';'-joined), '更新时间']."""
+    mtime = os.path.getmtime(CLASSIFICATION_PATH) if os.path.exists(CLASSIFICATION_PATH) else None
+    if _CLASSIFICATION_MEMO['table'] is not None and _CLASSIFICATION_MEMO['mtime'] == mtime:
+        return _CLASSIFICATION_MEMO['table']
+    table = load_table_from_cache(CLASSIFICATION_PATH, default=pd.DataFrame(columns=CLASSIFICATION_COLUMNS).rename_axis('代码'))
+    _CLASSIFICATION_MEMO.update({'mtime': mtime, 'table': table})
+    return table
+
+def get_classification_version():
+    """Changes whenever the classification cache is written."""
+    return os.path.getmtime(CLASSIFICATION_PATH) if os.path.exists(CLASSIFICATION_PATH) else None
+
+def save_stock_classification(records: list[tuple]):
+    """Upserts (代码, 所属行业, 所属概念) records. Empty results (failed lookups) are skipped."""
+    records = [r for r in records if r[1] or r[2]]
+    if not records:
+        return
+    updates = pd.DataFrame(records, columns=['代码', '所属行业', '所属概念']).drop_duplicates('代码', keep='last').set_index('代码')
+    updates['更新时间'] = pd.Timestamp(datetime.now())
+    with _SAVE_LOCK:
+        table = load_stock_classification()
+        table = pd.concat([table[~table.index.isin(updates.index)], updates]).sort_index()
+        save_table_to_cache(table, CLASSIFICATION_PATH)
+
+def update_stock_classification(codes: list[str], max_age_days: int = CLASSIFICATION_MAX_AGE_DAYS,
+                                max_workers: int = 20, progress_callback=None) -> int:
+    """
+    Fetches industry / concepts for A-share codes that are missing or older than
+    `max_age_days`. Returns the number of stocks fetched.
+    """
+    from src.stocks.stocks import get_stock_concepts_eastmoney
+
+    table = load_stock_classification()
+    cutoff = pd.Timestamp(datetime.now() - timedelta(days=max_age_days))
+    fresh = set(table.index[table['更新时间'] >= cutoff]) if not table.empty else set()
+    todo = [c for c in dict.fromkeys(map(str, codes)) if len(c) == 6 and c.isdigit() and c not in fresh]
+    if not todo:
+        return 0
+
+    print(f"Fetching classification for {len(todo)} stocks...")
+    records = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(get_stock_concepts_eastmoney, code): code for code in todo}
+        for i, future in enumerate(concurrent.futures.as_completed(futures), 1):
+            industry, concepts = future.result()
+            records.append((futures[future], industry, concepts))
+            if progress_callback:
+                progress_callback(i, len(todo))
+    save_stock_classification(records)
+    return len(todo)
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+from src.bitset import BitsetIndex, bitmap_from_mask, full_bitmap, popcount_rows
+
+# '所属概念' is a ';'-joined list of board names (see get_stock_concepts_eastmoney)
+CONCEPT_SEPARATOR = ';'
+
+# Index of the last stock list seen, keyed by the list object (the list lives in session state across reruns)
+_CONCEPT_MEMO = {'df': None, 'index': None}
+
+# --- Index ---
+
+def build_concept_index(concepts: pd.Series) -> BitsetIndex:
+    """Concept -> bitmap of row positions, one exact token per ';'-separated concept."""
+    tokens = concepts.fillna('').astype(str).str.split(CONCEPT_SEPARATOR).explode()
+    tokens = tokens.str.strip()
+    positions = pd.Series(np.arange(len(concepts)), index=concepts.index).reindex(tokens.index).to_numpy()
+    valid = (tokens != '').to_numpy()
+    pairs = pd.DataFrame({'concept': tokens.to_numpy()[valid], 'row': positions[valid]}).drop_duplicates()
+    postings = pairs.groupby('concept', sort=False)['row'].agg(list).to_dict()
+    return BitsetIndex(postings, len(concepts))
+
+def get_concept_index(df: pd.DataFrame) -> BitsetIndex:
+    """build_concept_index of df['所属概念'], built once per loaded list."""
+    if _CONCEPT_MEMO['df'] is not df:
+        _CONCEPT_MEMO.update({'df': df, 'index': build_concept_index(df['所属概念'])})
+    return _CONCEPT_MEMO['index']
+
+# --- Facets ---
+
+def rows_bitmap(mask=None, n_rows: int = 0) -> np.ndarray:
+    """Bitmap of the rows selected by a boolean mask (all rows if no mask)."""
+    if mask is None:
+        return full_bitmap(n_rows)
+    return bitmap_from_mask(np.asarray(mask, dtype=bool))
+
+def concept_facet_counts(index: BitsetIndex, rows: np.ndarray) -> pd.Series:
+    """Number of `rows` carrying each concept, largest first (concepts absent from `rows` dropped)."""
+    if len(index) == 0:
+        return pd.Series(dtype=np.int64)
+    counts = pd.Series(popcount_rows(index.stack(index.keys) & rows[None, :]), index=index.keys)
+    return counts[counts > 0].sort_values(ascending=False, kind='stable')
+
+def filter_by_concepts(index: BitsetIndex, rows: np.ndarray, selected: list) -> np.ndarray:
+    """Bitmap of `rows` carrying ANY of the `selected` concepts (exact match); `rows` itself if none selected."""
+    if not selected:
+        return rows
+    return rows & index.any_of(selected)
@@ -0,0 +1,246 @@
+import os
+from datetime import datetime, time
+import akshare as ak
+import numpy as np
+import pandas as pd
+
+from src.data_manager import DATA_DIR, save_table_to_cache, load_table_from_cache
+from src.trade_calendar import previous_trading_day, trading_days_between
+
+# Daily pools: data/limit_up/{zt|zb}/{YYYYMMDD}.pkl (涨停池 / 炸板池); ladder state: data/limit_up/ladder.pkl
+LIMIT_UP_DIR = os.path.join(DATA_DIR, 'limit_up')
+LADDER_PATH = os.path.join(LIMIT_UP_DIR, 'ladder.pkl')
+
+POOL_FETCHERS = {'zt': ak.stock_zt_pool_em, 'zb': ak.stock_zt_pool_zbgc_em}
+HISTORY_COLUMNS = ['日期', '代码', '名称', '所属行业', '连板数']
+LADDER_COLUMNS = ['日期', '连板数', '个股数', '晋级数', '炸板数', '晋级率']
+DAILY_COLUMNS = ['日期', '涨停数', '炸板数', '封板率', '最高连板', '连板股数', '晋级率']
+SECTOR_COLUMNS = ['日期', '所属行业', '涨停数', '连板股数']
+
+# Pools are final after the close
+MARKET_CLOSE = time(15, 0)
+# Ladder heights above this are pooled (few stocks get there)
+MAX_LADDER_LEVEL = 7
+CONTEXT_DAYS = 10
+PROMOTION_LOOKBACK_DAYS = 60
+
+_LADDER_MEMO = {'mtime': None, 'state': None}
+
+# --- Daily Pools ---
+
+def _pool_path(kind: str, date_str: str) -> str:
+    return os.path.join(LIMIT_UP_DIR, kind, f'{date_str}.pkl')
+
+def get_stored_pool_dates(kind: str = 'zt') -> list[str]:
+    kind_dir = os.path.join(LIMIT_UP_DIR, kind)
+    if not os.path.isdir(kind_dir):
+        return []
+    return sorted(f[:-4] for f in os.listdir(kind_dir) if f.endswith('.pkl'))
+
+def _has_stored_pool(kind: str, date_str: str) -> bool:
+    file_path = _pool_path(kind, date_str)
+    return os.path.exists(file_path) and not load_table_from_cache(file_path, default=pd.DataFrame()).empty
+
+def _is_final(date_str: str) -> bool:
+    now = datetime.now()
+    today = now.strftime("%Y%m%d")
+    return date_str < today or (date_str == today and now.time() >= MARKET_CLOSE)
+
+def fetch_limit_up_pool(date_str: str, kind: str = 'zt', force: bool = False) -> pd.DataFrame:
+    """
+    One day's 涨停池 ('zt') or 炸板池 ('zb'), from the local store when present.
+    Fetched pools are stored once the day is closed (intraday pools keep changing).
+    Empty results are not stored (the API only serves recent dates, so older days
+    come back empty), except a 炸板池 of a day whose 涨停池 is stored non-empty.
+    """
+    file_path = _pool_path(kind, date_str)
+    if not force and os.path.exists(file_path):
+        return load_table_from_cache(file_path, default=pd.DataFrame())
+    try:
+        df = POOL_FETCHERS[kind](date=date_str)
+    except Exception as e:
+        print(f"Failed to fetch {kind} pool for {date_str}: {e}")
+        return pd.DataFrame()
+    if df is None:
+        df = pd.DataFrame()
+    if not df.empty:
+        df['代码'] = df['代码'].astype(str)
+        if '连板数' not in df.columns:
+            df['连板数'] = 0
+    if _is_final(date_str) and (not df.empty or (kind == 'zb' and _has_stored_pool('zt', date_str))):
+        save_table_to_cache(df, file_path)
+    return df
+
+def backfill_limit_up_pools(start_date: str, end_date: str = None, progress_callback=None) -> int:
+    """
+    Stores the 涨停 / 炸板 pools of every closed trading day in [start_date, end_date],
+    each kind checked on its own (a day may have only one of them, e.g. from get_limit_up_model).
+    Days the API returned nothing for stay unstored and are retried by the next backfill.
+    Returns the number of days with at least one pool fetched.
+    """
+    end_date = end_date or datetime.now().strftime("%Y%m%d")
+    days = [d.strftime("%Y%m%d") for d in trading_days_between(start_date, end_date)]
+    days = [d for d in days if _is_final(d)]
+    todo = {kind: set(days) - set(get_stored_pool_dates(kind)) for kind in POOL_FETCHERS}
+    todo_days = sorted(set().union(*todo.values()))
+    for i, date_str in enumerate(todo_days, 1):
+        for kind in POOL_FETCHERS:
+            if date_str in todo[kind]:
+                fetch_limit_up_pool(date_str, kind)
+        if progress_callback:
+            progress_callback(i, len(todo_days))
+    return len(todo_days)
+
+# --- Ladder Engine ---
+
+def _empty_state() -> dict:
+    return {
+        'last_date': '',
+        'processed': set(),
+        'history': pd.DataFrame(columns=HISTORY_COLUMNS),
+        'ladder': pd.DataFrame(columns=LADDER_COLUMNS),
+        'daily': pd.DataFrame(columns=DAILY_COLUMNS),
+        'sectors': pd.DataFrame(columns=SECTOR_COLUMNS),
+    }
+
+def load_ladder_state() -> dict:
+    mtime = os.path.getmtime(LADDER_PATH) if os.path.exists(LADDER_PATH) else None
+    if _LADDER_MEMO['state'] is not None and _LADDER_MEMO['mtime'] == mtime:
+        return _LADDER_MEMO['state']
+    state = load_table_from_cache(LADDER_PATH, default=_empty_state())
+    if 'processed' not in state:
+        # States saved before processed days were tracked
+        state['processed'] = set(state['daily']['日期'])
+    _LADDER_MEMO.update({'mtime': mtime, 'state': state})
+    return state
+
+def process_limit_up_day(state: dict, date_str: str, zt: pd.DataFrame, zb: pd.DataFrame) -> dict:
+    """
+    Folds one new day into the ladder state: promotion of the previous trading
+    day's limit-up stocks by height (N -> N+1 boards), 炸板 failures, daily breadth
+    and per-industry counts. Only the two days involved are touched.
+    """
+    zt = zt if zt is not None else pd.DataFrame()
+    zb = zb if zb is not None else pd.DataFrame()
+    today = pd.DataFrame({
+        '日期': date_str,
+        '代码': zt['代码'].astype(str) if not zt.empty else pd.Series(dtype=str),
+        '名称': zt['名称'] if not zt.empty else pd.Series(dtype=str),
+        '所属行业': zt['所属行业'] if '所属行业' in zt.columns else '',
+        '连板数': pd.to_numeric(zt['连板数'], errors='coerce').fillna(1).astype(int) if not zt.empty else pd.Series(dtype=int),
+    })[HISTORY_COLUMNS]
+
+    # Promotion from the previous trading day (only when that day is in the history)
+    prev_day = previous_trading_day(pd.Timestamp(date_str), inclusive=False).strftime("%Y%m%d")
+    prev = state['history'][state['history']['日期'] == prev_day]
+    ladder_rows = pd.DataFrame(columns=LADDER_COLUMNS)
+    promotion = np.nan
+    if not prev.empty:
+        today_level = today.set_index('代码')['连板数'].reindex(prev['代码']).to_numpy()
+        failed_codes = set(zb['代码'].astype(str)) if not zb.empty else set()
+        events = pd.DataFrame({
+            '连板数': prev['连板数'].clip(upper=MAX_LADDER_LEVEL).to_numpy(),
+            '晋级': today_level > prev['连板数'].to_numpy(),
+            '炸板': prev['代码'].isin(failed_codes).to_numpy(),
+        })
+        ladder_rows = events.groupby('连板数').agg(个股数=('晋级', 'size'), 晋级数=('晋级', 'sum'), 炸板数=('炸板', 'sum')).reset_index()
+        ladder_rows['晋级率'] = ladder_rows['晋级数'] / ladder_rows['个股数']
+        ladder_rows.insert(0, '日期', date_str)
+        promotion = events['晋级'].mean()
+
+    n_zt, n_zb = len(today), len(zb)
+    daily_row = pd.DataFrame([{
+        '日期': date_str,
+        '涨停数': n_zt,
+        '炸板数': n_zb,
+        '封板率': n_zt / (n_zt + n_zb) if n_zt + n_zb else np.nan,
+        '最高连板': int(today['连板数'].max()) if n_zt else 0,
+        '连板股数': int((today['连板数'] >= 2).sum()),
+        '晋级率': promotion,
+    }])
+    sectors = today.assign(连板=today['连板数'] >= 2).groupby('所属行业').agg(涨停数=('代码', 'size'), 连板股数=('连板', 'sum')).reset_index()
+    sectors.insert(0, '日期', date_str)
+
+    def _append(table, rows, columns):
+        table = table[table['日期'] != date_str]
+        frames = [f for f in (table, rows[columns]) if not f.empty]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+
+    return {
+        'last_date': max(state['last_date'], date_str),
+        'processed': state['processed'] | {date_str},
+        'history': _append(state['history'], today, HISTORY_COLUMNS),
+        'ladder': _append(state['ladder'], ladder_rows, LADDER_COLUMNS),
+        'daily': _append(state['daily'], daily_row, DAILY_COLUMNS),
+        'sectors': _append(state['sectors'], sectors, SECTOR_COLUMNS),
+    }
+
+def _truncate_state(state: dict, date_str: str) -> dict:
+    """State with every day from `date_str` on removed."""
+    kept = {k: state[k][state[k]['日期'] < date_str].reset_index(drop=True) for k in ('history', 'ladder', 'daily', 'sectors')}
+    processed = {d for d in state['processed'] if d < date_str}
+    return {'last_date': max(processed, default=''), 'processed': processed, **kept}
+
+def update_limit_up_ladder() -> dict:
+    """
+    Processes stored days (both pools present) not yet in the ladder state and saves the state.
+    New days after the last processed one are appended; if an earlier day arrives
+    (e.g. a later backfill), the state is recomputed from that day on.
+    """
+    state = load_ladder_state()
+    complete = sorted(set(get_stored_pool_dates('zt')) & set(get_stored_pool_dates('zb')))
+    new_days = [d for d in complete if d not in state['processed']]
+    if not new_days:
+        return state
+    if new_days[0] < state['last_date']:
+        state = _truncate_state(state, new_days[0])
+        new_days = [d for d in complete if d >= new_days[0]]
+    for date_str in new_days:
+        zt = load_table_from_cache(_pool_path('zt', date_str), default=pd.DataFrame())
+        zb = load_table_from_cache(_pool_path('zb', date_str), default=pd.DataFrame())
+        state = process_limit_up_day(state, date_str, zt, zb)
+    save_table_to_cache(state, LADDER_PATH)
+    _LADDER_MEMO.update({'mtime': os.path.getmtime(LADDER_PATH), 'state': state})
+    print(f"Limit-up ladder updated through {state['last_date']} ({len(new_days)} days processed).")
+    return state
+
+# --- Views ---
+
+def get_promotion_rates(lookback_days: int = PROMOTION_LOOKBACK_DAYS) -> pd.DataFrame:
+    """Promotion rate by height over the last `lookback_days` processed days: ['连板数', '个股数', '晋级数', '炸板数', '晋级率']."""
+    ladder = load_ladder_state()['ladder']
+    if ladder.empty:
+        return pd.DataFrame(columns=LADDER_COLUMNS[1:])
+    days = sorted(ladder['日期'].unique())[-lookback_days:]
+    rates = ladder[ladder['日期'].isin(days)].groupby('连板数')[['个股数', '晋级数', '炸板数']].sum().reset_index()
+    rates['晋级率'] = rates['晋级数'] / rates['个股数']
+    return rates
+
+def get_sector_rotation(last_n: int = 5) -> pd.DataFrame:
+    """Industries x last `last_n` days of limit-up counts, most active in the latest day first."""
+    sectors = load_ladder_state()['sectors']
+    if sectors.empty:
+        return pd.DataFrame()
+    days = sorted(sectors['日期'].unique())[-last_n:]
+    pivot = sectors[sectors['日期'].isin(days)].pivot_table(index='所属行业', columns='日期', values='涨停数', aggfunc='sum', fill_value=0)
+    return pivot.sort_values(list(pivot.columns[::-1]), ascending=False)
+
+def add_ladder_context(df: pd.DataFrame, as_of: str = None) -> pd.DataFrame:
+    """
+    Adds multi-day context to a stock list (by 代码) from the processed history:
+    '近10日涨停' (limit-up days in the last CONTEXT_DAYS stored days up to `as_of`)
+    and '晋级率(历史)' (historical promotion rate at the stock's current height).
+    """
+    state = load_ladder_state()
+    history = state['history']
+    if df.empty or history.empty:
+        return df.copy()
+    days = sorted(d for d in history['日期'].unique() if as_of is None or d <= as_of)[-CONTEXT_DAYS:]
+    counts = history[history['日期'].isin(days)].groupby('代码').size()
+    result = df.copy()
+    result[f'近{CONTEXT_DAYS}日涨停'] = counts.reindex(result['代码'].astype(str)).fillna(0).astype(int).to_numpy()
+    if '连板数' in result.columns:
+        rates = get_promotion_rates().set_index('连板数')['晋级率']
+        level = pd.to_numeric(result['连板数'], errors='coerce').clip(upper=MAX_LADDER_LEVEL)
+        result['晋级率(历史)'] = rates.reindex(level).to_numpy()
+    return result
@@ -1,9 +1,19 @@
 import akshare as ak
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime
+import time
+import threading
 import requests
 import concurrent.futures
 
+# Spot snapshots are shared by every session in the process for this long
+SPOT_TTL_SECONDS = 30
+
+# {'time': monotonic fetch time, 'df': snapshot sorted by 涨跌幅 ascending (NaN last), 'gains': float64 涨跌幅 without NaN}
+_SPOT_MEMO = {'time': None, 'df': None, 'gains': None}
+_SPOT_LOCK = threading.Lock()
+
 def get_stock_concepts_eastmoney(symbol):
     """
     Fetch concepts for a single stock from EastMoney.
@@ -36,35 +46,58 @@ def get_stock_concepts_eastmoney(symbol):
     return "", ""
 
 def enrich_with_concepts(df: pd.DataFrame) -> pd.DataFrame:
-    """Helper to fetch concepts concurrently and update the dataframe."""
-    print("正在抓取个股概念数据 (多线程)...")
-    
+    """Helper to fill concepts (and missing industries), from the shared classification cache where fresh, else fetched concurrently."""
+    from src.stocks.classification import load_stock_classification, save_stock_classification, CLASSIFICATION_MAX_AGE_DAYS
+
     # Initialize columns if not present
     if '所属概念' not in df.columns:
         df['所属概念'] = ""
-    # We might overwrite '所属行业' if the source didn't provide it (e.g. spot data)
-    # If source provided it (limit up data), we can keep it or prefer EastMoney's result?
-    # Let's prefer EastMoney result for consistency if '所属行业' is missing or we want to ensure Concept matches Block.
-    # But Limit Up API '所属行业' is usually good.
-    # Let's fill '所属行业' only if missing/empty.
-    
+    # Limit Up API '所属行业' is usually good: fill '所属行业' only if missing/empty.
+    if '所属行业' not in df.columns:
+        df['所属行业'] = ""
+
+    # 1. Shared cache (also filled by exposure / attribution / other lists)
+    codes = df['代码'].astype(str)
+    table = load_stock_classification()
+    cutoff = pd.Timestamp(datetime.now()) - pd.Timedelta(days=CLASSIFICATION_MAX_AGE_DAYS)
+    fresh = table[table['更新时间'] >= cutoff] if not table.empty else table
+    cached = codes.isin(fresh.index).to_numpy()
+    if cached.any():
+        hits = fresh.reindex(codes[cached])
+        df.loc[cached, '所属概念'] = hits['所属概念'].to_numpy()
+        no_industry = cached & (df['所属行业'].isna() | (df['所属行业'] == "")).to_numpy()
+        df.loc[no_industry, '所属行业'] = fresh['所属行业'].reindex(codes[no_industry]).to_numpy()
+
+    # 2. Fetch the rest
+    todo = df.index[~cached]
+    if len(todo) == 0:
+        return df
+    print(f"正在抓取个股概念数据 (多线程, {len(todo)} 只, 缓存命中 {int(cached.sum())} 只)...")
+    fetched = []
     with concurrent.futures.ThreadPoolExecutor(max_workers=20) as executor:
         future_to_index = {
-            executor.submit(get_stock_concepts_eastmoney, row['代码']): index 
-            for index, row in df.iterrows()
+            executor.submit(get_stock_concepts_eastmoney, df.at[index, '代码']): index
+            for index in todo
         }
         
         for future in concurrent.futures.as_completed(future_to_index):
             index = future_to_index[future]
             try:
                 industry, concepts = future.result()
+                fetched.append((str(df.at[index, '代码']), industry, concepts))
                 df.at[index, '所属概念'] = concepts
                 
-                # If Industry is missing or we want to enforce it from Concept source
-                if '所属行业' not in df.columns or pd.isna(df.at[index, '所属行业']) or df.at[index, '所属行业'] == "":
+                # If Industry is missing, take it from the concept source
+                if pd.isna(df.at[index, '所属行业']) or df.at[index, '所属行业'] == "":
                     df.at[index, '所属行业'] = industry
             except Exception:
                 pass
+
+    # Keep the lookups in the shared classification cache
+    try:
+        save_stock_classification(fetched)
+    except Exception as e:
+        print(f"Failed to update stock classification cache: {e}")
     return df
 
 def get_limit_up_model(date: str = None):
@@ -72,31 +105,20 @@ def get_limit_up_model(date: str = None):
     df = pd.DataFrame()
     used_date = None
 
+    # 涨停池按日存储 (收盘后的池子直接读本地)
+    from src.stocks.limit_up import fetch_limit_up_pool
+
     if date:
         print(f"正在抓取东财 {date} 涨停板池数据...")
-        try:
-            df = ak.stock_zt_pool_em(date=date)
-            used_date = date
-        except Exception as e:
-            print(f"抓取指定日期数据失败: {e}")
+        df = fetch_limit_up_pool(date, 'zt')
+        used_date = date
     else:
-        # 自动回溯查找最近10天的数据
-        curr_time = datetime.now()
-        print("正在寻找最近一个交易日的涨停数据...")
-        
-        for i in range(10):
-            check_date = curr_time - timedelta(days=i)
-            date_str = check_date.strftime("%Y%m%d")
-            
-            try:
-                temp_df = ak.stock_zt_pool_em(date=date_str)
-                if not temp_df.empty:
-                    df = temp_df
-                    used_date = date_str
-                    print(f"成功获取 {date_str} 的数据")
-                    break
-            except Exception:
-                continue
+        # 由交易日历直接确定最近一个已开盘的交易日 (一次请求)
+        from src.trade_calendar import latest_session_day
+        date_str = latest_session_day().strftime("%Y%m%d")
+        print(f"正在抓取最近交易日 {date_str} 的涨停数据...")
+        df = fetch_limit_up_pool(date_str, 'zt')
+        used_date = date_str
     
     if df.empty:
         print("未获取到任何近期涨停板数据。")
@@ -141,24 +163,65 @@ def get_limit_up_model(date: str = None):
     final_cols = ['日期'] + required_columns + ['所属概念']
     return result[final_cols]
 
-def get_stocks_by_gain(min_gain: float):
+def fetch_spot_snapshot() -> pd.DataFrame:
     """
-    获取涨幅大于等于 min_gain 的个股清单。
-    返回格式与 get_limit_up_model 保持一致。
+    获取沪深京A股实时行情快照 (ak.stock_zh_a_spot_em)。
+    '代码' 为字符串, '最新价' / '涨跌幅' / '换手率' 转为数值。失败时返回空表。
     """
-    print(f"正在获取涨幅 >= {min_gain}% 的实时数据...")
     try:
         df = ak.stock_zh_a_spot_em()
     except Exception as e:
         print(f"获取实时数据失败: {e}")
         return pd.DataFrame()
-    
+
     if df.empty:
         return pd.DataFrame()
-        
-    # Filter by gain
-    df['涨跌幅'] = pd.to_numeric(df['涨跌幅'], errors='coerce')
-    result = df[df['涨跌幅'] >= min_gain].copy()
+
+    df['代码'] = df['代码'].astype(str)
+    for col in ['最新价', '涨跌幅', '换手率']:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+def _shared_spot(max_age: float) -> tuple[pd.DataFrame, np.ndarray]:
+    with _SPOT_LOCK:
+        fetched_at = _SPOT_MEMO['time']
+        if fetched_at is not None and time.monotonic() - fetched_at < max_age:
+            return _SPOT_MEMO['df'], _SPOT_MEMO['gains']
+        df = fetch_spot_snapshot()
+        if df.empty:
+            # 下载失败不缓存, 下次调用重试
+            return df, np.empty(0)
+        df = df.sort_values('涨跌幅', na_position='last', kind='stable').reset_index(drop=True)
+        gains = df['涨跌幅'].to_numpy(dtype=np.float64)
+        gains = gains[~np.isnan(gains)]
+        _SPOT_MEMO.update({'time': time.monotonic(), 'df': df, 'gains': gains})
+        return df, gains
+
+def get_spot_snapshot(max_age: float = SPOT_TTL_SECONDS) -> pd.DataFrame:
+    """
+    进程内共享的实时行情快照: 超过 max_age 秒才重新下载, 并发请求只下载一次。
+    返回按 '涨跌幅' 升序排列的共享表 (NaN 在最后), 调用方不要原地修改。
+    """
+    return _shared_spot(max_age)[0]
+
+def query_spot_by_gain(min_gain: float, max_gain: float = None) -> pd.DataFrame:
+    """快照中 min_gain <= 涨跌幅 (<= max_gain) 的个股, 涨幅降序; 在有序索引上二分查找。"""
+    df, gains = _shared_spot(SPOT_TTL_SECONDS)
+    if df.empty:
+        return df
+    lo = np.searchsorted(gains, min_gain, side='left')
+    hi = np.searchsorted(gains, max_gain, side='right') if max_gain is not None else len(gains)
+    return df.iloc[lo:hi].iloc[::-1]
+
+def get_stocks_by_gain(min_gain: float):
+    """
+    获取涨幅大于等于 min_gain 的个股清单。
+    返回格式与 get_limit_up_model 保持一致。
+    """
+    print(f"正在获取涨幅 >= {min_gain}% 的实时数据...")
+    # Filter by gain (shared snapshot, re-downloaded only after SPOT_TTL_SECONDS)
+    result = query_spot_by_gain(min_gain).copy()
     
     if result.empty:
         print("无满足条件的个股。")
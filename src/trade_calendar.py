@@ -0,0 +1,92 @@
+import os
+from datetime import datetime, date, time
+import akshare as ak
+import numpy as np
+import pandas as pd
+
+from src.data_manager import DATA_DIR, save_table_to_cache, load_table_from_cache
+
+# SSE / SZSE trading days (ak.tool_trade_date_hist_sina covers history up to the end of the current year)
+TRADE_CALENDAR_PATH = os.path.join(DATA_DIR, 'trade_calendar.pkl')
+
+# Intraday pools (e.g. limit-up) have data from the call auction on
+MARKET_OPEN = time(9, 25)
+
+_CALENDAR_MEMO = {'days': None}
+
+# --- Calendar ---
+
+def _fetch_trade_calendar() -> np.ndarray:
+    df = ak.tool_trade_date_hist_sina()
+    return np.sort(pd.to_datetime(df['trade_date']).to_numpy().astype('datetime64[D]'))
+
+def load_trade_calendar(refresh: bool = False) -> np.ndarray:
+    """
+    Sorted trading days (datetime64[D]). Fetched once and cached locally; refreshed
+    when the cache does not reach the current year (the exchanges publish a year at a time).
+    Falls back to weekdays if the calendar cannot be fetched.
+    """
+    days = _CALENDAR_MEMO['days']
+    if days is None:
+        days = load_table_from_cache(TRADE_CALENDAR_PATH)
+    this_year = datetime.now().year
+    if refresh or days is None or len(days) == 0 or days[-1].astype(object).year < this_year:
+        try:
+            print("Fetching trading calendar...")
+            days = _fetch_trade_calendar()
+            save_table_to_cache(days, TRADE_CALENDAR_PATH)
+        except Exception as e:
+            print(f"Failed to fetch trading calendar: {e}")
+            if days is None or len(days) == 0:
+                # Weekdays only (holidays unknown); kept in memory only, so the next process retries
+                days = pd.bdate_range('2000-01-01', f'{this_year}-12-31').to_numpy().astype('datetime64[D]')
+    _CALENDAR_MEMO['days'] = days
+    return days
+
+def _to_day(d) -> np.datetime64:
+    return np.datetime64(pd.Timestamp(d).date(), 'D')
+
+def is_trading_day(d) -> bool:
+    days = load_trade_calendar()
+    day = _to_day(d)
+    i = np.searchsorted(days, day)
+    return bool(i < len(days) and days[i] == day)
+
+def previous_trading_day(d=None, inclusive: bool = True) -> date:
+    """Latest trading day on or before `d` (strictly before if not inclusive). Default d: today."""
+    days = load_trade_calendar()
+    day = _to_day(d if d is not None else datetime.now())
+    i = np.searchsorted(days, day, side='right' if inclusive else 'left') - 1
+    return days[max(i, 0)].astype(object)
+
+def next_trading_day(d=None, inclusive: bool = False) -> date:
+    """First trading day after `d` (on or after if inclusive). Default d: today."""
+    days = load_trade_calendar()
+    day = _to_day(d if d is not None else datetime.now())
+    i = np.searchsorted(days, day, side='left' if inclusive else 'right')
+    return days[min(i, len(days) - 1)].astype(object)
+
+def trading_days_between(start, end) -> pd.DatetimeIndex:
+    """Trading days in [start, end]."""
+    days = load_trade_calendar()
+    lo, hi = np.searchsorted(days, _to_day(start), side='left'), np.searchsorted(days, _to_day(end), side='right')
+    return pd.DatetimeIndex(days[lo:hi])
+
+def latest_session_day(now: datetime = None) -> date:
+    """Latest trading day whose session has started: today after the open on a trading day, else the previous one."""
+    now = now or datetime.now()
+    if is_trading_day(now) and now.time() >= MARKET_OPEN:
+        return now.date()
+    return previous_trading_day(now, inclusive=False)
+
+def expected_nav_date(end_date=None, now: datetime = None) -> date:
+    """
+    Latest NAV date a fund can have for a request ending on `end_date`.
+    A day's NAV is published in the evening, so for today (or later) it is the
+    previous trading day; for past end dates it is the last trading day on/before it.
+    """
+    now = now or datetime.now()
+    end = pd.Timestamp(end_date).date() if end_date is not None else now.date()
+    if end >= now.date():
+        return previous_trading_day(now, inclusive=False)
+    return previous_trading_day(end, inclusive=True)
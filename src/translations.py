@@ -19,15 +19,31 @@ TRANS = {
         'header_perf': "业绩指标",
         'header_portfolio': "持仓变动分析",
         'header_changes': "持仓变动明细",
+        'header_similar_funds': "相似持仓基金",
+        'header_screener': "🔎 基金筛选 (业绩 / 持仓 / 规模)",
+        'btn_refresh_screener': "刷新筛选数据",
         
         # Metrics
         'metric_max_dd': "最大回撤",
         'metric_ann_ret': "年化收益率",
+        'metric_volatility': "年化波动率",
+        'metric_sharpe': "夏普比率",
+        'metric_sortino': "索提诺比率",
+        'metric_calmar': "卡玛比率",
+        'text_drawdown_range': "最大回撤区间: {peak} → {trough}",
         'metric_success_rate': "预估调仓成功率",
-        'help_success_rate': "模拟数据 - 需要股价信息",
+        'help_success_rate': "本季度新进/增持个股在下一季度跑赢中证全指的比例 (基于本地股价库，仅统计股价数据完整的个股)",
+        'text_success_rate_detail': "评估个股 {n} 只，平均超额收益 {excess}",
+        'btn_backfill_prices': "📥 下载相关个股及基准指数股价",
+        'msg_backfill_prices': "正在下载个股日线数据...",
         
         # Charts
         'chart_nav_title': "历史净值趋势",
+        'label_nav_view': "图表",
+        'view_unit_nav': "单位净值",
+        'view_rolling_return': "滚动收益 (1M/3M/1Y)",
+        'view_rolling_vol': "滚动波动率 (1M/3M/1Y)",
+        'view_rolling_dd': "滚动回撤 (1M/3M/1Y)",
         
         # Messages
         'text_quarters': "可用季度: {quarters}",
@@ -46,12 +62,92 @@ TRANS = {
         'label_enter_code': "输入基金代码",
         'warn_no_funds_file': "未找到基金列表文件，请手动输入基金代码。",
         'info_no_changes': "未检测到持仓变动或数据不匹配。",
+        'info_no_similar_funds': "本季度暂无可比较的持仓数据。",
+        'msg_computing_similarity': "正在计算持仓相似度 (首次计算本季度需要一些时间)...",
+        'header_industry_exposure': "行业暴露变化",
+        'msg_computing_exposure': "正在计算行业暴露 (首次计算需要一些时间)...",
+        'label_exposure_share': "占股票持仓比例 (%)",
+        'metric_style_drift': "风格漂移 (环比)",
+        'help_style_drift': "本季度与上季度行业配置的差异: 0.5 × Σ|行业占比变化|，0 表示配置不变，100% 表示完全不同",
+        'metric_top_industry': "第一大行业",
+        'info_no_exposure': "暂无行业分类数据，可点击下方按钮获取持仓个股的行业信息。",
+        'btn_update_classification': "🏷️ 更新持仓个股行业分类",
+        'msg_update_classification': "正在获取个股行业 / 概念...",
+        'label_attribution': "📐 行业归因 (Brinson) / Attribution",
+        'msg_computing_attribution': "正在计算全市场行业归因 (首次计算本季度需要一些时间)...",
+        'metric_excess_return': "超额收益",
+        'metric_allocation': "行业配置效应",
+        'metric_selection': "个股选择效应",
+        'metric_interaction': "交互效应",
+        'help_attribution': "本季度持仓在下一季度的表现，对比全部股票型基金合计持仓 (按持仓市值加权)，基于本地股价库",
+        'text_attribution_detail': "持仓组合收益 {fund}，基准收益 {bench}，股价覆盖率 {coverage}",
+        'info_no_attribution': "缺少下一季度的个股股价或持仓数据，无法计算归因。",
+        'header_correlated_funds': "走势相关基金 (近250个交易日)",
+        'label_fav_correlation': "📉 自选基金相关性 / Correlation",
+        'msg_computing_correlation': "正在计算收益相关性 (首次计算需要一些时间)...",
+        'info_no_correlation': "净值数据不足，无法计算相关性。",
+        'btn_lookthrough_est': "🧮 穿透估值 / Look-through",
+        'msg_lookthrough_est': "正在获取A股实时行情并按持仓估算...",
+        'label_estimation_report': "📏 估值误差跟踪 / Estimation Accuracy",
+        'info_no_estimation_report': "暂无可对比的估值记录 (需要估值当日的实际净值，并已运行误差统计更新)。",
+        'btn_update_estimation_accuracy': "🔁 更新误差统计",
+        'msg_update_estimation_accuracy': "正在对比历史估值与实际净值...",
+        'text_estimation_accuracy': "自选基金的历史估值误差 (单位: 百分点)，近期绝对误差按指数加权，越小越可信",
+        'label_fav_backtest': "📊 组合回测 / Backtest",
+        'label_backtest_funds': "回测基金",
+        'label_rebalance': "再平衡",
+        'rebalance_M': "每月",
+        'rebalance_Q': "每季度",
+        'rebalance_Y': "每年",
+        'rebalance_none': "不再平衡 (买入持有)",
+        'label_contribution': "每次再平衡追加资金 (初始=1)",
+        'label_fee_rate': "交易费率 (%)",
+        'btn_weight_grid': "🔍 权重网格搜索",
+        'text_redundant_pair': "⚠️ {a} 与 {b} 高度相关 ({corr})，持仓可能重复",
         
         # Search Feature
         'tab_overview': "概览",
         'tab_analysis': "基金分析",
         'tab_search': "重仓股反查",
         'tab_lhb': "龙虎榜",
+        'header_lhb_history': "📚 龙虎榜历史 (本地) / LHB History",
+        'text_lhb_stored': "本地已存 {n} 个交易日 ({first} ~ {last})",
+        'label_lhb_backfill_start': "补齐起始日期",
+        'btn_lhb_backfill': "📥 补齐历史龙虎榜",
+        'msg_lhb_backfill_done': "补齐完成: 新抓取 {n} 个交易日",
+        'label_lhb_query_kind': "查询对象",
+        'lhb_query_stock': "个股",
+        'lhb_query_department': "营业部",
+        'label_lhb_query': "股票代码/名称 或 营业部关键字",
+        'label_lhb_days': "最近交易日数",
+        'info_no_lhb_history': "本地历史中没有匹配记录 (可先补齐历史数据)。",
+        'label_limit_up_ladder': "🪜 连板梯队 / Limit-up Ladder",
+        'btn_update_ladder': "📥 更新近期涨停池",
+        'msg_update_ladder': "正在下载近期涨停 / 炸板池...",
+        'text_ladder_daily': "**每日涨停概况**",
+        'text_ladder_promotion': "**各高度晋级率 (近60个交易日)**",
+        'text_sector_rotation': "**行业涨停数轮动 (近5个交易日)**",
+        'info_no_ladder': "本地暂无涨停池历史，请先更新近期涨停池。",
+        'label_spot_poller': "⏱️ 盘中行情轮询 / Intraday Polling",
+        'label_poll_interval': "轮询间隔 (秒)",
+        'text_poller_status': "轮询中: {frames} 个快照, {stocks} 只个股, 占用 {mb:.1f} MB, 最近 {last}",
+        'text_price_speed': "**5分钟涨速榜**",
+        'info_poller_waiting': "轮询已启动，开盘时段内采集行情快照。",
+        'btn_stop_poller': "⏹️ 停止轮询",
+        'btn_start_poller': "▶️ 开始轮询",
+        'info_poller_stopped': "轮询未运行。开始后在开盘时段按间隔采集行情快照 (所有会话共享)。",
+        'label_fund_heat': "🌡️ 基金热度 / Fund Heat",
+        'label_heat_live': "使用实时行情 (涨幅≥阈值, 随快照刷新)",
+        'help_fund_heat': "热度 = 强势股占净值比例 + 0.5 × 龙虎榜净买入个股占净值比例 (基于各基金最新一期持仓)",
+        'info_no_fund_heat': "暂无命中强势股的基金 (请先获取强势股池或更新持仓数据)。",
+        'label_lhb_department': "营业部",
+        'metric_dept_events': "买入上榜次数",
+        'metric_dept_win_rate': "次日胜率",
+        'help_dept_win_rate': "买入上榜后下一交易日个股上涨的比例 (基于本地股价库)",
+        'metric_dept_follow_3d': "3日平均收益",
+        'metric_dept_follow_5d': "5日平均收益",
+        'text_stock_departments': "历史买入该股的营业部:",
+        'label_dept_ranking': "🏆 营业部胜率排行 (至少5次买入)",
         'label_search_stocks': "输入股票名称或代码 (逗号分隔)",
         'btn_search': "查询持仓基金",
         'col_match_count': "匹配数量",
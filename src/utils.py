@@ -1,6 +1,7 @@
 from datetime import datetime, date
 import asyncio
 import concurrent.futures
+import re
 
 def run_async_loop(coro):
     """
@@ -70,3 +71,32 @@ def get_latest_report_quarter(current_date: date = None) -> tuple[int, int]:
         return year, 3
         
     return year, 3 # Fallback
+
+def parse_report_quarter(quarter_str: str) -> str:
+    """
+    Normalizes a holdings '季度' value to a sortable 'YYYYQn' label.
+    Example: '2025年1季度股票投资明细' -> '2025Q1'. Returns None if it cannot be parsed.
+    """
+    match = re.search(r'(\d{4})年(\d)季度', str(quarter_str))
+    if not match:
+        match = re.fullmatch(r'(\d{4})Q(\d)', str(quarter_str))
+    if not match:
+        return None
+    return f"{match.group(1)}Q{match.group(2)}"
+
+def shift_quarter(quarter_label: str, n: int = -1) -> str:
+    """
+    Moves a 'YYYYQn' label by n quarters.
+    Example: shift_quarter('2025Q1', -1) -> '2024Q4'
+    """
+    year, q = int(quarter_label[:4]), int(quarter_label[-1])
+    idx = year * 4 + (q - 1) + n
+    return f"{idx // 4}Q{idx % 4 + 1}"
+
+def quarter_end_date(quarter_label: str) -> date:
+    """
+    Last calendar day of a 'YYYYQn' quarter.
+    Example: quarter_end_date('2025Q3') -> date(2025, 9, 30)
+    """
+    year, q = int(quarter_label[:4]), int(quarter_label[-1])
+    return date(year, q * 3, 31 if q in (1, 4) else 30)